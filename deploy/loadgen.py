@@ -0,0 +1,102 @@
+"""
+추론 서버 부하 생성기
+concurrency개 스레드가 keep-alive 연결로 POST /predict를 보내고 p50/p99 지연과 초당 요청 수를 출력한다.
+
+    uv run deploy/loadgen.py --url http://127.0.0.1:8080/predict --images sample.zip --requests 2000 --concurrency 32
+"""
+# --- image_pipeline 모듈 경로 ---
+# image_pipeline의 평평한 모듈(config, metrics ...)을 쓴다. `uv pip install -e image_pipeline`으로 설치되어 있으면
+# 설치본을 쓰고, 저장소에서 바로 실행할 때만 image_pipeline 디렉토리를 경로 맨 앞에 추가 (다른 import보다 먼저)
+import importlib.util
+import sys
+from pathlib import Path
+if importlib.util.find_spec("metrics") is None:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "image_pipeline"))
+
+import argparse
+import http.client
+import itertools
+import json
+import threading
+import time
+import zipfile
+from urllib.parse import urlsplit
+from metrics import Histogram
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+def load_payloads(path: Path, limit: int | None = None) -> list[bytes]:
+    """zip 멤버 또는 디렉토리의 이미지 파일 bytes"""
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as z:
+            names = [name for name in z.namelist() if Path(name).suffix.lower() in IMAGE_SUFFIXES]
+            return [z.read(name) for name in names[:limit]]
+    files = sorted(file for file in path.rglob("*") if file.suffix.lower() in IMAGE_SUFFIXES)
+    return [file.read_bytes() for file in files[:limit]]
+
+def run_load(url: str,
+             payloads: list[bytes],
+             requests: int,
+             concurrency: int) -> dict:
+    """
+    요청 requests건을 concurrency개 연결로 나눠 보내고 결과 요약 반환
+    (지연은 요청 전송 ~ 응답 본문 수신, 실패(200 이외/연결 오류)는 지연 집계에서 제외)
+    """
+    target = urlsplit(url)
+    counter = itertools.count()
+    latencies = Histogram()
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+        try:
+            while (i := next(counter)) < requests:
+                start = time.perf_counter()
+                try:
+                    conn.request("POST", target.path, body=payloads[i % len(payloads)],
+                                 headers={"Content-Type": "application/octet-stream"})
+                    response = conn.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()  # 다음 요청에서 다시 연결
+                    status = repr(e)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if status == 200:
+                        latencies.observe(elapsed)
+                    else:
+                        errors.append(status)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "seconds": round(seconds, 3),
+        "requests_per_sec": round(latencies.count / seconds, 3),
+        "p50_ms": round(latencies.percentile(50) * 1000, 3),
+        "p99_ms": round(latencies.percentile(99) * 1000, 3),
+        "mean_ms": round(latencies.sum / latencies.count * 1000, 3) if latencies.count else 0.0,
+    }
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="추론 서버 부하 생성기 (p50/p99 지연, 초당 요청 수)")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/predict")
+    parser.add_argument("--images", type=Path, required=True, help="요청 본문으로 쓸 이미지 zip 또는 디렉토리")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_load(args.url, load_payloads(args.images), args.requests, args.concurrency), indent=2))
+
+if __name__ == "__main__":
+    main()
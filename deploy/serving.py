@@ -0,0 +1,321 @@
+"""
+CPU 추론 서버 (동적 마이크로 배칭)
+- 요청 bytes를 preprocessor.load_resized로 변환 스테이지와 같은 디코딩/리사이즈(축소 디코딩 + INTER_AREA)
+- 동시에 들어온 요청을 최대 max_batch_size개, 첫 요청 후 최대 max_wait_ms까지 모아 forward 한 번으로 처리
+- 모델: ONNX Runtime(.onnx, 없으면 OpenCV DNN), CI/벤치마크용 numpy 선형 모델(.npz)
+- HTTP: POST /predict (본문 = 인코딩된 이미지), GET /healthz, GET /metrics (Prometheus)
+
+    uv run deploy/serving.py --model model.onnx --max-batch-size 16 --max-wait-ms 5
+"""
+# --- image_pipeline 모듈 경로 ---
+# image_pipeline의 평평한 모듈(config, preprocessor ...)을 쓴다. `uv pip install -e image_pipeline`으로 설치되어 있으면
+# 설치본을 쓰고, 저장소에서 바로 실행할 때만 image_pipeline 디렉토리를 경로 맨 앞에 추가 (다른 import보다 먼저)
+import importlib.util
+import sys
+from pathlib import Path
+if importlib.util.find_spec("preprocessor") is None:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "image_pipeline"))
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+import preprocessor
+from config import TARGET_SIZE, FAST_DECODE
+from logger import pipeline_logger, setup_pipeline_logger
+from metrics import MetricsRegistry
+
+# ======================================================================
+# --- 서빙 설정 ---
+# ======================================================================
+SERVING_HOST = os.getenv("SERVING_HOST", "127.0.0.1")
+SERVING_PORT = int(os.getenv("SERVING_PORT", "8080"))
+SERVING_INPUT_SIZE = TARGET_SIZE    # 학습 데이터와 같은 해상도
+SERVING_MAX_BATCH_SIZE = 16         # forward 1회에 묶는 최대 요청 수
+SERVING_MAX_WAIT_MS = 5.0           # 첫 요청 이후 배치를 채우려고 기다리는 최대 시간
+SERVING_THREADS = os.cpu_count() or 1  # ONNX Runtime intra-op 스레드 수
+SERVING_TIMEOUT_SECONDS = 30.0      # 요청 1건이 배치 결과를 기다리는 최대 시간
+SERVING_TOP_K = 5
+# EfficientNet(ImageNet) 입력 정규화
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# ====================================================
+# --- 모델 ---
+# ====================================================
+def to_blob(batch: np.ndarray,
+            mean: tuple[float, ...] = IMAGENET_MEAN,
+            std: tuple[float, ...] = IMAGENET_STD) -> np.ndarray:
+    """(N, H, W, 3) BGR uint8 -> (N, 3, H, W) RGB float32 (0~1 스케일 후 mean/std 정규화)"""
+    blob = cv2.dnn.blobFromImages(list(batch), scalefactor=1 / 255, swapRB=True)
+    blob -= np.asarray(mean, np.float32)[:, None, None]
+    blob /= np.asarray(std, np.float32)[:, None, None]
+    return blob
+
+class OnnxModel:
+    """ONNX Runtime CPU 세션 (입력 1개, 출력 첫 번째를 logits로 사용)"""
+    def __init__(self, model_path: Path, threads: int = SERVING_THREADS):
+        import onnxruntime  # 서빙에서만 필요한 의존성
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: to_blob(batch)})[0]
+
+class DnnModel:
+    """OpenCV DNN CPU 백엔드 (onnxruntime이 없는 환경용)"""
+    def __init__(self, model_path: Path, threads: int = SERVING_THREADS):
+        cv2.setNumThreads(threads)
+        self.net = cv2.dnn.readNet(str(model_path))
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        self.net.setInput(to_blob(batch))
+        return self.net.forward()
+
+class LinearModel:
+    """CI/벤치마크용 초소형 모델: pool x pool 평균 풀링 특징 -> 선형 분류 (numpy만 사용)"""
+    def __init__(self, weight: np.ndarray, bias: np.ndarray, pool: int = 8):
+        self.weight = weight.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.pool = pool
+
+    @classmethod
+    def random(cls, num_classes: int, pool: int = 8, seed: int = 0) -> "LinearModel":
+        rng = np.random.default_rng(seed)
+        return cls(rng.normal(0, 0.1, size=(pool * pool * 3, num_classes)), np.zeros(num_classes), pool)
+
+    @classmethod
+    def load(cls, model_path: Path) -> "LinearModel":
+        with np.load(model_path) as npz:
+            return cls(npz["weight"], npz["bias"], int(npz["pool"]))
+
+    def save(self, model_path: Path):
+        np.savez(model_path, weight=self.weight, bias=self.bias, pool=self.pool)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        features = np.stack([cv2.resize(img, (self.pool, self.pool), interpolation=cv2.INTER_AREA) for img in batch])
+        return features.reshape(len(batch), -1).astype(np.float32) / 255 @ self.weight + self.bias
+
+def load_model(model_path: Path, threads: int = SERVING_THREADS):
+    """확장자로 모델 선택 (.onnx: ONNX Runtime -> 없으면 OpenCV DNN, .npz: LinearModel)"""
+    model_path = Path(model_path)
+    if model_path.suffix == ".npz":
+        return LinearModel.load(model_path)
+    if model_path.suffix != ".onnx":
+        raise ValueError(f"Unsupported model format: {model_path.suffix}")
+    try:
+        return OnnxModel(model_path, threads)
+    except ImportError:
+        pipeline_logger.warning("onnxruntime is not installed, falling back to OpenCV DNN")
+        return DnnModel(model_path, threads)
+
+# ====================================================
+# --- 마이크로 배칭 ---
+# ====================================================
+class MicroBatcher:
+    """
+    submit()으로 들어온 이미지를 배치 스레드 하나가 모아 model.predict를 한 번 호출하고 결과를 Future로 나눠준다.
+    첫 요청을 받은 뒤 max_batch_size개가 차거나 max_wait_ms가 지나면 바로 forward (부하가 낮으면 지연 증가는 max_wait_ms 이내)
+    """
+    def __init__(self,
+                 model,
+                 max_batch_size: int = SERVING_MAX_BATCH_SIZE,
+                 max_wait_ms: float = SERVING_MAX_WAIT_MS,
+                 metrics: MetricsRegistry | None = None):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or MetricsRegistry("serving")
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image: np.ndarray) -> Future:
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def _next_batch(self) -> list[tuple[np.ndarray, Future]] | None:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # 지금 배치를 처리한 뒤 종료
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            images, futures = zip(*batch)
+            start = time.perf_counter()
+            try:
+                scores = self.model.predict(np.stack(images))
+            except Exception as e:
+                self.metrics.inc("errors_total", stage="forward")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            self.metrics.observe("forward_seconds", time.perf_counter() - start)
+            self.metrics.inc("batches_total")
+            self.metrics.inc("batched_requests_total", len(futures))
+            for future, score in zip(futures, scores):
+                future.set_result(score)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+# ====================================================
+# --- 서비스/HTTP ---
+# ====================================================
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+class InferenceService:
+    """요청 bytes -> 전처리(요청 스레드) -> 마이크로 배치 forward -> top-k 결과"""
+    def __init__(self,
+                 model,
+                 input_size: int = SERVING_INPUT_SIZE,
+                 max_batch_size: int = SERVING_MAX_BATCH_SIZE,
+                 max_wait_ms: float = SERVING_MAX_WAIT_MS,
+                 fast_decode: bool = FAST_DECODE,
+                 class_names: list[str] | None = None,
+                 top_k: int = SERVING_TOP_K,
+                 timeout: float = SERVING_TIMEOUT_SECONDS):
+        if class_names:
+            # 라벨 수가 모델 출력과 다르면 요청마다 IndexError(500)가 나므로 시작할 때 한 번 forward로 확인
+            num_outputs = np.asarray(model.predict(np.zeros((1, input_size, input_size, 3), np.uint8))).size
+            if len(class_names) != num_outputs:
+                raise ValueError(f"{len(class_names)} class names for a model with {num_outputs} outputs")
+        self.input_size = input_size
+        self.fast_decode = fast_decode
+        self.class_names = class_names
+        self.top_k = top_k
+        self.timeout = timeout
+        self.metrics = MetricsRegistry("serving")
+        self.batcher = MicroBatcher(model, max_batch_size, max_wait_ms, self.metrics)
+
+    def predict(self, data: bytes) -> dict:
+        """ValueError: 빈 본문/디코딩 실패 (HTTP 400)"""
+        start = time.perf_counter()
+        image = preprocessor.load_resized(data, self.input_size, self.fast_decode)
+        probs = _softmax(np.asarray(self.batcher.submit(image).result(self.timeout), np.float32).ravel())
+        top = np.argsort(probs)[::-1][:self.top_k]
+        self.metrics.observe("request_seconds", time.perf_counter() - start)
+        self.metrics.inc("requests_total")
+        return {
+            "class_id": int(top[0]),
+            "score": float(probs[top[0]]),
+            "top_k": [{"class_id": int(i), "score": float(probs[i]),
+                       **({"label": self.class_names[i]} if self.class_names else {})} for i in top],
+        }
+
+    def close(self):
+        self.batcher.close()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive (부하 생성기가 연결을 재사용)
+    disable_nagle_algorithm = True  # 헤더/본문을 따로 쓸 때 Nagle + delayed ACK로 생기는 ~40ms 지연 방지
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send(200, self.server.service.metrics.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"not found: {self.path}"})
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"not found: {self.path}"})
+            return
+        try:
+            self._send_json(200, self.server.service.predict(data))
+        except ValueError as e:
+            self.server.service.metrics.inc("errors_total", stage="decode")
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            pipeline_logger.error(f"Inference failed: {e}")
+            self._send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pipeline_logger.debug(f"{self.address_string()} {format % args}")
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog (기본 5면 동시 연결이 몰릴 때 연결이 거부됨)
+
+def make_server(service: InferenceService,
+                host: str = SERVING_HOST,
+                port: int = SERVING_PORT) -> ThreadingHTTPServer:
+    """요청마다 스레드 (전처리는 cv2가 GIL을 풀어서 병렬, forward는 배치 스레드 하나). port=0이면 임의 포트"""
+    server = _Server((host, port), _Handler)
+    server.service = service
+    return server
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="음식 분류 CPU 추론 서버 (동적 마이크로 배칭)")
+    parser.add_argument("--model", type=Path, required=True, help=".onnx 또는 .npz(LinearModel)")
+    parser.add_argument("--labels", type=Path, help="클래스 이름 파일 (한 줄에 하나, class id 순서)")
+    parser.add_argument("--host", default=SERVING_HOST)
+    parser.add_argument("--port", type=int, default=SERVING_PORT)
+    parser.add_argument("--input-size", type=int, default=SERVING_INPUT_SIZE)
+    parser.add_argument("--max-batch-size", type=int, default=SERVING_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=SERVING_MAX_WAIT_MS)
+    parser.add_argument("--threads", type=int, default=SERVING_THREADS)
+    args = parser.parse_args(argv)
+
+    setup_pipeline_logger()
+    class_names = args.labels.read_text(encoding="utf-8").splitlines() if args.labels else None
+    service = InferenceService(load_model(args.model, args.threads), args.input_size,
+                               args.max_batch_size, args.max_wait_ms, class_names=class_names)
+    server = make_server(service, args.host, args.port)
+    pipeline_logger.info(f"Serving {args.model} on http://{args.host}:{server.server_address[1]} "
+                         f"(max_batch_size={args.max_batch_size}, max_wait_ms={args.max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+콘텐츠 주소 기반 변환 결과 캐시
+키 = hash(원본 bytes, target_size, extension, quality, interpolation, fast_decode)
+변경 없는 재실행이나 겹치는 아카이브 재처리 시 디코딩/리사이즈/인코딩 대신 캐시 파일을 복사한다.
+크기 상한을 넘으면 가장 오래 사용되지 않은(mtime 기준) 항목부터 삭제(LRU)한다.
+워커는 put으로 항목만 쓰고, 메인 프로세스가 결과를 회수하면서 track으로 쓴 bytes를 누적해 상한을 넘는 시점에 삭제한다.
+(큰 아카이브 하나를 처리하는 동안에도 상한을 지키면서, 디렉토리 스캔은 메인 프로세스에서만 한다)
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from config import TRANSFORM_CACHE_DIR, TRANSFORM_CACHE_MAX_BYTES, TRANSFORM_CACHE_EVICT_RATIO
+
+class TransformCache:
+    def __init__(self,
+                 cache_dir: Path = TRANSFORM_CACHE_DIR,
+                 max_bytes: int = TRANSFORM_CACHE_MAX_BYTES,
+                 evict_ratio: float = TRANSFORM_CACHE_EVICT_RATIO):
+        # 경로/상한만 가지므로 워커 프로세스로 pickle해서 넘겨도 가볍다
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.evict_ratio = evict_ratio
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # 메인 프로세스가 추정하는 캐시 총 크기 (sync에서 스캔, track으로 쓴 bytes만큼 증가, evict에서 다시 맞춤)
+        self.size = None
+        self.evicted = (0, 0)  # 누적 (삭제 수, 확보 bytes)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """원본 bytes 해시 (spec이 여러 개여도 원본은 한 번만 해시)"""
+        return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+    @staticmethod
+    def make_key(data_hash: str, **params) -> str:
+        """원본 해시와 변환 파라미터로 캐시 키 생성"""
+        h = hashlib.blake2b(data_hash.encode(), digest_size=20)
+        h.update(repr(sorted(params.items())).encode())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        # 한 디렉토리에 파일이 몰리지 않도록 키 앞 2자리로 분산
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # LRU: 최근 사용 시각 갱신
+        return data
+
+    def put(self, key: str, data: bytes):
+        """임시 파일에 쓴 뒤 rename해서 여러 워커가 동시에 써도 깨진 항목이 보이지 않도록 함"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def sync(self):
+        """디렉토리를 스캔해 size를 실제 크기로 맞춤 (스테이지 시작 시 메인 프로세스에서 한 번)"""
+        self.size = sum(size for _, size, _ in self._entries())
+
+    def track(self, nbytes: int) -> tuple[int, int]:
+        """
+        메인 프로세스에서 워커가 put한 bytes를 누적하고, 상한을 넘으면 상한의 evict_ratio까지 삭제해 (삭제 수, 확보 bytes) 반환
+        (상한보다 조금 더 비워서 결과마다 전체 스캔하지 않도록)
+        """
+        if self.size is None:
+            self.sync()
+        self.size += nbytes
+        if self.size <= self.max_bytes:
+            return 0, 0
+        return self.evict(int(self.max_bytes * self.evict_ratio))
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """(mtime, 크기, 경로) 리스트 (다른 워커가 쓰는 중인 .tmp 제외)"""
+        entries = []
+        for path in self.cache_dir.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # 다른 워커가 먼저 삭제
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, target_bytes: int | None = None) -> tuple[int, int]:
+        """총 크기가 target_bytes(기본 max_bytes) 이하가 될 때까지 오래된 항목부터 삭제하고 (삭제 수, 확보 bytes) 반환"""
+        target_bytes = self.max_bytes if target_bytes is None else target_bytes
+        entries = self._entries()
+        total_bytes = sum(size for _, size, _ in entries)
+
+        removed, freed = 0, 0
+        for _, size, path in sorted(entries):
+            if total_bytes - freed <= target_bytes:
+                break
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed += size
+        self.size = total_bytes - freed
+        self.evicted = (self.evicted[0] + removed, self.evicted[1] + freed)
+        return removed, freed
@@ -0,0 +1,192 @@
+"""
+food-pipeline 명령행 진입점 (pyproject.toml [project.scripts])
+    food-pipeline run [FILE_KEY ...]        # 다운로드 -> 변환 -> 검증 -> 중복 검출 -> 적재 -> 업로드 -> 정리
+    food-pipeline download FILE_KEY ...
+    food-pipeline process FILE_KEY ...      # 받아둔 파일로 다운로드 이후 스테이지 실행
+    food-pipeline validate FILE_KEY ...     # 결과 재검증 (스테이지 완료 여부와 무관)
+    food-pipeline dedup FILE_KEY ... [--action report|drop]
+    food-pipeline reset FILE_KEY ...        # 진행 기록 삭제
+    food-pipeline manifest refresh [--fetch] # 파일 목록 카탈로그 갱신 (추가/변경/삭제 출력, download_list.csv 재생성)
+    food-pipeline run --category 음식001 --split Val   # 카탈로그에서 고른 파일 중 새로 추가/변경된 것만
+- 스테이지 모듈(cv2/numpy 포함)은 서브커맨드 안에서만 import해서 --help/reset은 바로 끝난다.
+- --mode/--workers 같은 옵션은 스테이지 모듈 import 전에 config에 한 번 반영한다.
+  (스테이지 함수의 기본 인자가 import 시점의 config 값으로 고정되므로 순서가 중요)
+"""
+import argparse
+import sys
+from pathlib import Path
+import config
+
+def _apply_overrides(args: argparse.Namespace):
+    """명령행 옵션을 config에 반영 (스테이지 모듈 import 전에 호출)"""
+    if args.mode:
+        config.PIPELINE_MODE = args.mode
+    if args.workers:
+        config.TRANSFORM_WORKERS = config.ARCHIVE_WORKERS = config.VALIDATION_WORKERS = args.workers
+    if args.upload_backend:
+        config.UPLOAD_BACKEND = args.upload_backend
+    if args.no_upload:
+        config.UPLOAD_ENABLED = False
+
+def _key_map() -> dict[str, tuple[str, str]]:
+    import main
+    return main.make_key_map_from_manifest()
+
+def _downloaded_path(file_key: str, file_name: str, state):
+    """다운로드 스테이지 기록 또는 기본 다운로드 경로에서 받아둔 파일 찾기"""
+    for path in (state.stage_detail(file_key, "download"), config.DOWNLOAD_DST_DIR / file_name):
+        if path and Path(path).is_file():
+            return Path(path)
+    raise FileNotFoundError(f"[{file_key}] {file_name} is not downloaded (run `food-pipeline download {file_key}`)")
+
+# ====================================================
+# --- 서브커맨드 ---
+# ====================================================
+def _selected(args: argparse.Namespace) -> bool:
+    return bool(args.category or args.split or args.kind)
+
+def cmd_run(args: argparse.Namespace) -> int:
+    """파일키를 주면 그대로, 카테고리/분할/종류를 주면 카탈로그에서 새로 추가/변경된 파일키만 실행"""
+    import main
+    import manifest
+    from state import PipelineState
+    with PipelineState() as state, manifest.ManifestCatalog() as catalog:
+        if _selected(args):
+            if not catalog.entries():
+                catalog.refresh(manifest.read_tree(), state)
+            entries = manifest.schedule(catalog, state, args.category, args.split, args.kind or config.MANIFEST_KINDS)
+            file_keys = [entry.file_key for entry in entries]
+            key_map = catalog.key_map()
+        else:
+            file_keys = args.file_keys or config.AIHUB_FILE_KEYS
+            key_map = _key_map()
+        try:
+            results = main.run_all(file_keys, key_map, state)
+        finally:
+            main.write_run_report()
+        catalog.mark_processed([file_key for file_key, result in results.items() if result == "done"])
+    return int(any(result != "done" for result in results.values()))
+
+def cmd_download(args: argparse.Namespace) -> int:
+    import main
+    from state import PipelineState
+    key_map = _key_map()
+    with PipelineState() as state:
+        for file_key in args.file_keys:
+            print(main.download_archive(file_key, key_map[file_key][0], state))
+    return 0
+
+def cmd_process(args: argparse.Namespace) -> int:
+    import main
+    from state import PipelineState
+    key_map = _key_map()
+    main._upload_backend()
+    with PipelineState() as state:
+        try:
+            for file_key in args.file_keys:
+                file_name = key_map[file_key][0]
+                main.process_archive(file_key, file_name, _downloaded_path(file_key, file_name, state), state)
+        finally:
+            main.write_run_report()
+    return 0
+
+def cmd_validate(args: argparse.Namespace) -> int:
+    import validation
+    from state import PipelineState
+    key_map = _key_map()
+    failed = 0
+    with PipelineState() as state:
+        for file_key in args.file_keys:
+            file_name = key_map[file_key][0]
+            failures = validation.validate_and_requeue(file_key, file_name, _downloaded_path(file_key, file_name, state),
+                                                       streaming=config.PIPELINE_MODE == "streaming", state=state)
+            failed += sum(failure.hard for failure in failures)
+    return int(failed > 0)
+
+def cmd_dedup(args: argparse.Namespace) -> int:
+    import dedup
+    key_map = _key_map()
+    with dedup.DedupIndex() as index:
+        for file_key in args.file_keys:
+            duplicates = dedup.dedup_archive(file_key, key_map[file_key][0], index,
+                                             streaming=config.PIPELINE_MODE == "streaming", action=args.action)
+            for duplicate in duplicates:
+                print(f"{duplicate.member}\t{duplicate.other_file_key}\t{duplicate.other_member}\t"
+                      f"{duplicate.distance}\t{'leakage' if duplicate.leakage else ''}")
+    return 0
+
+def cmd_reset(args: argparse.Namespace) -> int:
+    from state import PipelineState
+    with PipelineState() as state:
+        for file_key in args.file_keys:
+            state.reset(file_key)
+    return 0
+
+def cmd_manifest(args: argparse.Namespace) -> int:
+    import manifest
+    from state import PipelineState
+    with PipelineState() as state, manifest.ManifestCatalog() as catalog:
+        if args.action == "refresh":
+            entries = manifest.fetch_tree() if args.fetch else manifest.read_tree(args.raw)
+            diff = catalog.refresh(entries, state)
+            manifest.write_manifest_csv(entries)
+            for sign, items in (("+", diff.added), ("~", diff.changed), ("-", diff.removed)):
+                for entry in items:
+                    print(f"{sign}\t{entry.file_key}\t{entry.path}\t{entry.size}")
+        else:
+            kinds = args.kind or config.MANIFEST_KINDS
+            entries = catalog.select(args.category, args.split, kinds)
+            if args.pending:
+                entries = catalog.pending(state, entries)
+            for entry in entries:
+                print(f"{entry.file_key}\t{entry.split}\t{entry.category}\t{entry.kind}\t{entry.size}\t{entry.file_name}")
+    return 0
+
+def _add_selection(parser: argparse.ArgumentParser):
+    parser.add_argument("--category", action="append", help="카테고리 (예: 음식001, 여러 번 지정 가능)")
+    parser.add_argument("--split", action="append", choices=["Tra", "Val"])
+    parser.add_argument("--kind", action="append", choices=["image", "label", "other"],
+                        help="기본값: config.MANIFEST_KINDS")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="food-pipeline", description="AIHub 음식 이미지 전처리 파이프라인")
+    parser.add_argument("--mode", choices=["streaming", "disk"], help="PIPELINE_MODE")
+    parser.add_argument("--workers", type=int, help="변환/적재/검증 워커 수")
+    parser.add_argument("--upload-backend", choices=["gcs", "local"], help="UPLOAD_BACKEND")
+    parser.add_argument("--no-upload", action="store_true", help="업로드 스테이지 건너뛰기")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="전체 파이프라인 (다음 아카이브 다운로드와 현재 아카이브 변환을 겹쳐서 실행)")
+    run.add_argument("file_keys", nargs="*", help="기본값: config.AIHUB_FILE_KEYS (선택 옵션이 없을 때)")
+    _add_selection(run)
+    run.set_defaults(func=cmd_run)
+    for name, func, help_text in [("download", cmd_download, "다운로드만"),
+                                  ("process", cmd_process, "받아둔 파일로 다운로드 이후 스테이지 실행"),
+                                  ("validate", cmd_validate, "변환 결과 재검증 (실패 시 재변환)"),
+                                  ("dedup", cmd_dedup, "중복 검출 리포트"),
+                                  ("reset", cmd_reset, "진행 기록 삭제")]:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("file_keys", nargs="+")
+        command.set_defaults(func=func)
+        if name == "dedup":
+            command.add_argument("--action", choices=["report", "drop"], default=config.DEDUP_ACTION)
+
+    catalog = commands.add_parser("manifest", help="파일 목록 카탈로그 (manifests/download_list_raw.txt)")
+    catalog.add_argument("action", choices=["refresh", "list"])
+    catalog.add_argument("--fetch", action="store_true", help="aihubshell로 최신 목록을 받아서 갱신")
+    catalog.add_argument("--raw", type=Path, default=config.AIHUB_MANIFEST_RAW_PATH, help="트리 출력 파일")
+    catalog.add_argument("--pending", action="store_true", help="list: 새로 추가/변경되어 처리할 항목만")
+    _add_selection(catalog)
+    catalog.set_defaults(func=cmd_manifest)
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    _apply_overrides(args)
+    config.init_directories()
+    from logger import setup_pipeline_logger
+    setup_pipeline_logger()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,12 @@
 import os
 from pathlib import Path
+from typing import NamedTuple
 from dotenv import load_dotenv
-load_dotenv()
+
+# .env는 최초 프로세스에서 한 번만 읽음. 워커 프로세스(spawn/forkserver)는 환경변수를 그대로 물려받으므로 다시 읽지 않는다.
+if not os.environ.get("IMAGE_PIPELINE_ENV_LOADED"):
+    load_dotenv()
+    os.environ["IMAGE_PIPELINE_ENV_LOADED"] = "1"
 
 # ======================================================================
 # --- 공통 경로 설정 ---
@@ -23,6 +28,13 @@ AIHUB_FILE_KEYS = [
     "49589", "49590", "49591", "49592", "49593", "49594", "49595", "49596", "49597", "49598", "49599", "49600", "49601"  # 라벨(Json)
 ]
 AIHUB_MANIFEST_CSV_PATH = BASE_DIR / "manifests" / "download_list.csv"
+AIHUB_MANIFEST_RAW_PATH = BASE_DIR / "manifests" / "download_list_raw.txt" # aihubshell -mode l 트리 출력 원본
+MANIFEST_DB_PATH = DATA_DIR / "manifest.db" # 파일 목록 카탈로그 + 처리 당시 파일명/크기 (manifest.py)
+MANIFEST_KINDS = ["image", "label"]         # 카탈로그 기반 실행 대상 종류 (원천/라벨, InfoTable 등 "other" 제외)
+AIHUB_SHELL = os.getenv("AIHUB_SHELL", "aihubshell") # aihubshell 실행 파일 경로 (테스트에서는 가짜 스크립트)
+DOWNLOAD_RETRIES = 3              # 실패/검사 불통과 시 재시도 횟수
+DOWNLOAD_BACKOFF_SECONDS = 30     # 재시도 대기 (30s, 60s, 120s ...)
+DOWNLOAD_TIMEOUT_SECONDS = None   # aihubshell 1회 실행 제한 시간 (None이면 무제한)
 
 # ======================================================================
 # --- 압축파일 경로 설정 ---
@@ -37,14 +49,111 @@ EXTRACT_DST_DIR = DATA_DIR / "tmp" / "extracted"
 TRANSFORM_SRC_DIR = EXTRACT_DST_DIR
 TARGET_SIZE = 384
 TRANSFORM_EXTENSION = "webp"
-TRANSFORM_DST_DIR = DATA_DIR / "tmp" / f"{TRANSFORM_EXTENSION}_{TARGET_SIZE}"
+TRANSFORM_DST_ROOT = DATA_DIR / "tmp"
+TRANSFORM_DST_DIR = TRANSFORM_DST_ROOT / f"{TRANSFORM_EXTENSION}_{TARGET_SIZE}"
 IMAGE_QUALITY = 90
+
+class OutputSpec(NamedTuple):
+    """출력 변형 1개 (해상도, 포맷, 품질). 결과는 {extension}_{target_size} 디렉토리/아카이브로 분리"""
+    target_size: int
+    extension: str
+    quality: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.extension}_{self.target_size}"
+
+# 한 번의 디코딩으로 모든 변형을 생성 (예: EfficientNet-B0/B3 실험용)
+# OUTPUT_SPECS = [OutputSpec(384, "webp", 90), OutputSpec(224, "webp", 90), OutputSpec(384, "jpg", 95)]
+OUTPUT_SPECS = [OutputSpec(TARGET_SIZE, TRANSFORM_EXTENSION, IMAGE_QUALITY)]
+# JPEG 헤더의 해상도를 보고 IMREAD_REDUCED_COLOR_2/4/8로 축소 디코딩 (TARGET_SIZE 이상 유지)
+FAST_DECODE = True
+
+# ======================================================================
+# --- 병렬 처리 설정 ---
+# ======================================================================
+TRANSFORM_WORKERS = os.cpu_count() or 1 # 1이면 단일 프로세스 순차 처리
+TRANSFORM_CHUNKSIZE = 32                # 프로세스 풀에 한 번에 넘기는 이미지 수
+TRANSFORM_EXECUTOR = "process"          # "process" | "thread" (cv2는 GIL 해제)
+WORKER_START_METHOD = os.getenv("WORKER_START_METHOD") # "fork" | "spawn" | "forkserver" (None이면 플랫폼 기본값)
+# 제출했지만 결과를 회수하지 않은 이미지의 추정 메모리(원본 + 디코딩 프레임 + 결과) 합 상한
+# 4000x3000 원본은 축소 디코딩 없이 장당 ~36MB. 상한에 닿으면 원본 읽기/제출을 멈추고 결과부터 기록(backpressure)
+TRANSFORM_MEMORY_BUDGET_BYTES = 2 * 1024 ** 3
+EXTRACT_WORKERS = min(8, os.cpu_count() or 1)  # 멤버 묶음 단위 병렬 압축 해제 (워커마다 ZipFile 핸들)
+EXTRACT_EXECUTOR = "thread"                     # zlib 해제/파일 쓰기는 GIL 해제
+EXTRACT_BUFFER_SIZE = 1024 * 1024               # 멤버 스트리밍 버퍼 (멤버 전체를 메모리에 올리지 않음)
+
+# "streaming": 원본 zip -> 결과 zip 인메모리 변환 (extracted/, webp_384/ 디스크 왕복 없음)
+# "disk": 압축 해제 -> 이미지 변환 -> 재압축 (기존 방식)
+PIPELINE_MODE = "streaming"
+
+# ======================================================================
+# --- 작업 재개(Resume) 설정 ---
+# ======================================================================
+STATE_DB_PATH = DATA_DIR / "state.db" # tmp/ 정리 대상이 아닌 위치에 보관
+CHECKPOINT_INTERVAL = 1000            # 완료 이미지를 state에 기록하는 단위
+
+# ======================================================================
+# --- 변환 결과 캐시 설정 ---
+# ======================================================================
+TRANSFORM_CACHE_ENABLED = True
+TRANSFORM_CACHE_DIR = DATA_DIR / "cache" / "transform" # tmp/ 정리 대상이 아닌 위치에 보관
+TRANSFORM_CACHE_MAX_BYTES = 20 * 1024 ** 3             # 초과 시 오래 사용되지 않은 항목부터 삭제(LRU)
+TRANSFORM_CACHE_EVICT_RATIO = 0.9                      # 변환 중 상한을 넘으면 상한의 90%까지 삭제
+
+# ======================================================================
+# --- 다운로드/처리 오버랩 스케줄러 설정 ---
+# ======================================================================
+PREFETCH_ARCHIVES = 2                 # 현재 변환 중인 아카이브 외에 미리 받아둘 아카이브 수
+DISK_BUDGET_BYTES = 100 * 1024 ** 3   # 미리 받아둔 아카이브 + 처리 중 산출물이 차지할 수 있는 디스크 상한
+# 아카이브 1개가 처리 중 차지하는 디스크 = manifest size x 계수 (disk 모드는 압축 해제본까지 포함)
+DISK_FOOTPRINT_FACTOR = {"streaming": 1.2, "disk": 2.5}
+
+# ======================================================================
+# --- 결과 검증 설정 (validation.py) ---
+# ======================================================================
+VALIDATION_ENABLED = True
+VALIDATION_DIR = DATA_DIR / "validation" # {stem}.failures.jsonl (재변환 후에도 실패한 이미지 목록)
+VALIDATION_WORKERS = TRANSFORM_WORKERS
+VALIDATION_CHUNKSIZE = TRANSFORM_CHUNKSIZE
+VALIDATION_EXECUTOR = "thread"           # 디코딩(cv2)/NumPy 통계는 GIL 해제, 결과 bytes를 프로세스로 복사하지 않음
+VALIDATION_MIN_STD = 2.0                 # 픽셀 표준편차가 이보다 작으면 거의 단색(빈 이미지)
+VALIDATION_FLAT_ROW_STD = 1.0            # 행 표준편차가 이보다 작으면 평탄한 행
+VALIDATION_MAX_FLAT_FRACTION = 0.2       # 맨 아래부터 연속된 평탄 행 비율 상한 (잘린 원본은 아래쪽이 단색)
+
+# ======================================================================
+# --- 중복 검출 설정 (dedup.py) ---
+# ======================================================================
+DEDUP_ENABLED = True
+DEDUP_DB_PATH = DATA_DIR / "dedup.db" # 전체 파일키의 dHash 인덱스 (tmp/ 정리 대상이 아닌 위치에 보관)
+DEDUP_DIR = DATA_DIR / "dedup"        # {stem}.duplicates.jsonl (중복/Train-Val 누수 리포트)
+DHASH_SIZE = 8                        # dHash 64bit (SQLite INTEGER에 저장, 16bit x 4 청크로 인덱싱)
+DEDUP_MAX_DISTANCE = 6                # 해밍 거리 이하면 중복 (3 이하는 청크 일치, 4~7은 청크당 1bit 이웃까지 검색)
+DEDUP_ACTION = "report"               # "report" | "drop" (중복 이미지를 결과에서 제외)
+
+# ======================================================================
+# --- 메트릭/프로파일링 설정 ---
+# ======================================================================
+METRICS_DIR = DATA_DIR / "metrics" # run_report_*.json, metrics.prom (node_exporter textfile collector)
+PROFILE_STAGE = os.getenv("PROFILE_STAGE") # 예: "transform_archive" -> 해당 스테이지만 cProfile, METRICS_DIR/{stage}_{시각}.prof
+
 # ======================================================================
 # --- 압축파일 경로 설정 ---
 # ======================================================================
 """전처리 이후 압축파일 경로 설정"""
 ARCHIVE_SRC_DIR = TRANSFORM_DST_DIR
 ARCHIVE_DST_DIR = DATA_DIR / "tmp" / "archive"
+ARCHIVE_COMPRESSION = "stored" # "stored" | "deflated" | "parallel" (WebP는 이미 압축되어 stored 권장)
+                               # parallel: disk 모드는 make_archive 워커, streaming 모드는 변환 워커가 인코딩 직후 deflate
+ARCHIVE_SHARD_SIZE = 0         # 0이면 단일 zip, N이면 N개 이미지 단위로 zip 분할
+ARCHIVE_WORKERS = TRANSFORM_WORKERS
+ARCHIVE_EXECUTOR = "process"
+# 학습용 packed shard (.rec + .idx.npz)를 결과 zip과 함께 생성 (shards.py)
+# 결과 zip과 같은 이미지를 한 번 더 쓰므로 로컬 디스크/업로드 용량이 2배가 된다. 학습 노드에서 샤드를 읽을 때만 켤 것
+SHARD_ENABLED = False
+SHARD_MAX_BYTES = 256 * 1024 ** 2 # 샤드 파일 1개 상한
+SHARD_CLASS_TABLE = "classes.json" # ARCHIVE_DST_DIR 아래 샤드 공통 클래스명 목록 (추가만 하므로 번호 유지)
+LABEL_INDEX_DIR = ARCHIVE_DST_DIR / "labels" # 라벨 JSON 아카이브별 컬럼형 인덱스 파트 (labels.py)
 
 # ====================================================================== 
 # --- GCS 버킷 설정 ---
@@ -53,6 +162,15 @@ GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 BUCKET_NAME = "lee_modelcamp"
 UPLOAD_SRC_DIR = DATA_DIR / "tmp" / "rdtupload"
 # UPLOAD_DST_DIR
+UPLOAD_ENABLED = os.getenv("UPLOAD_ENABLED", "1") != "0"
+UPLOAD_BACKEND = os.getenv("UPLOAD_BACKEND", "local") # "local" (로컬 디렉토리를 버킷처럼 사용) | "gcs" (pip install .[gcs] 필요)
+UPLOAD_LOCAL_DIR = DATA_DIR / "bucket"   # UPLOAD_BACKEND = "local"일 때 업로드 위치
+UPLOAD_PREFIX = "image_pipeline"         # 객체 이름 = {UPLOAD_PREFIX}/{ARCHIVE_DST_DIR 기준 상대경로}
+UPLOAD_WORKERS = 4
+UPLOAD_MAX_INFLIGHT_BYTES = 2 * 1024 ** 3 # 동시에 업로드 중인 파일 크기 합 상한
+UPLOAD_CHUNK_SIZE = 32 * 1024 ** 2        # resumable upload 청크 (256KB 배수)
+UPLOAD_RETRIES = 3
+UPLOAD_BACKOFF_SECONDS = 10
 
 # ====================================================================== 
 # --- 폴더 생성 함수 ---
@@ -61,8 +179,10 @@ def init_directories():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     DOWNLOAD_DST_DIR.mkdir(parents=True, exist_ok=True)
     EXTRACT_DST_DIR.mkdir(parents=True, exist_ok=True)
-    TRANSFORM_DST_DIR.mkdir(parents=True, exist_ok=True)
+    for spec in OUTPUT_SPECS:
+        (TRANSFORM_DST_ROOT / spec.name).mkdir(parents=True, exist_ok=True)
     ARCHIVE_DST_DIR.mkdir(parents=True, exist_ok=True)
     LOG_DIR.mkdir(parents=True, exist_ok=True)
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
 
     dict().get
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+dHash 기반 중복 이미지 검출 인덱스
+- 변환 스테이지가 기준 다운스케일 이미지에서 계산한 64bit dHash(preprocessor.dhash)를 전체 파일키에 걸쳐 SQLite에 누적
+- multi-index hashing: 해시를 16bit x 4 청크로 나눠 청크마다 인덱스를 두고, 청크 하나라도 가까운 후보만 해밍 거리 계산
+  (해밍 거리 d 이하인 쌍은 비둘기집 원리로 반드시 한 청크가 d // 4 비트 이내로 같으므로 누락 없음)
+- 중복 리포트(JSONL), Train/Val 누수 표시, DEDUP_ACTION="drop"이면 나중에 처리된 쪽을 결과에서 제외
+"""
+import itertools
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, NamedTuple
+from config import (
+    ARCHIVE_DST_DIR,
+    TRANSFORM_DST_ROOT,
+    OUTPUT_SPECS,
+    OutputSpec,
+    DEDUP_DB_PATH,
+    DEDUP_DIR,
+    DEDUP_MAX_DISTANCE,
+    DEDUP_ACTION
+)
+from logger import time_logger, pipeline_logger
+from metrics import pipeline_metrics
+import shards
+import validation
+
+HASH_BITS = 64
+CHUNKS = 4
+_CHUNK_BITS = HASH_BITS // CHUNKS
+_CHUNK_COLUMNS = [f"c{i}" for i in range(CHUNKS)]
+
+class Duplicate(NamedTuple):
+    member: str          # 중복으로 판정된(나중에 처리된) 이미지
+    other_file_key: str  # 먼저 처리된 가장 가까운 이미지의 파일키
+    other_member: str
+    distance: int        # dHash 해밍 거리
+    leakage: bool        # Train/Val 아카이브에 걸친 중복
+    cross_category: bool # 카테고리(디렉토리)가 다른 중복
+
+def split_of(file_name: str) -> str:
+    """AIHub 파일명의 분할 (음식302_Val.zip -> Val, 음식110_Tra_json.zip -> Tra, 없으면 빈 문자열)"""
+    match = re.search(r"_(Tra|Val)(?=[_.]|$)", file_name)
+    return match.group(1) if match else ""
+
+def hash_chunks(image_hash: int) -> list[int]:
+    return [(image_hash >> (_CHUNK_BITS * i)) & ((1 << _CHUNK_BITS) - 1) for i in range(CHUNKS)]
+
+def _to_signed(image_hash: int) -> int:
+    """SQLite INTEGER(부호 있는 64bit)에 넣을 수 있도록 변환"""
+    return image_hash - (1 << HASH_BITS) if image_hash >= 1 << (HASH_BITS - 1) else image_hash
+
+def _distance(a: int, b: int) -> int:
+    return ((a ^ b) & ((1 << HASH_BITS) - 1)).bit_count()
+
+def chunk_masks(max_distance: int) -> list[int]:
+    """거리 max_distance 이하 검색 시 청크마다 확인할 XOR 마스크 (청크 내 max_distance // CHUNKS 비트 이하 반전)"""
+    radius = max_distance // CHUNKS
+    return [sum(1 << bit for bit in bits)
+            for flips in range(radius + 1)
+            for bits in itertools.combinations(range(_CHUNK_BITS), flips)]
+
+def _xor_sql(column: str, mask: int) -> str:
+    # SQLite에는 XOR 연산자가 없으므로 (a | m) - (a & m)
+    return f"({column} | {mask}) - ({column} & {mask})" if mask else column
+
+class DedupIndex:
+    def __init__(self, db_path: Path = DEDUP_DB_PATH):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS archives (
+                file_key TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                split TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS hashes (
+                file_key TEXT NOT NULL,
+                member TEXT NOT NULL,
+                hash INTEGER NOT NULL,
+                {", ".join(f"{column} INTEGER NOT NULL" for column in _CHUNK_COLUMNS)},
+                PRIMARY KEY (file_key, member)
+            );
+            {"".join(f"CREATE INDEX IF NOT EXISTS hashes_{column} ON hashes ({column});" for column in _CHUNK_COLUMNS)}
+        """)
+        self.conn.commit()
+
+    def register_archive(self, file_key: str, file_name: str):
+        """
+        파일키의 파일명/분할 기록 (누수 판정용). 처음 등록된 순서(rowid)가 아카이브 간 원본 판정 기준이 되므로
+        재처리 시에도 순서를 유지한다.
+        """
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO archives VALUES (?, ?, ?)",
+                              (file_key, file_name, split_of(file_name)))
+
+    def add(self, file_key: str, entries: Iterable[tuple[str, int]]):
+        """(멤버명, dHash) 기록. 같은 멤버를 다시 변환하면 덮어씀"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(file_key, member, _to_signed(image_hash), *hash_chunks(image_hash))
+                 for member, image_hash in entries]
+            )
+
+    def remove(self, file_key: str, members: Iterable[str]):
+        """결과에서 빠진(검증 실패/중복 제거) 이미지를 인덱스에서도 삭제"""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM hashes WHERE file_key = ? AND member = ?",
+                                  [(file_key, member) for member in members])
+
+    def count(self, file_key: str | None = None) -> int:
+        with self.lock:
+            if file_key is None:
+                return self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+            return self.conn.execute("SELECT COUNT(*) FROM hashes WHERE file_key = ?", (file_key,)).fetchone()[0]
+
+    def neighbors(self, image_hash: int, max_distance: int = DEDUP_MAX_DISTANCE) -> list[tuple[str, str, int]]:
+        """해밍 거리 max_distance 이하인 (파일키, 멤버명, 거리) 리스트 (거리순)"""
+        masks = chunk_masks(max_distance)
+        probes = [(column, chunk ^ mask) for column, chunk in zip(_CHUNK_COLUMNS, hash_chunks(image_hash))
+                  for mask in masks]
+        condition = " OR ".join(f"{column} = ?" for column, _ in probes)
+        with self.lock:
+            rows = self.conn.execute(f"SELECT file_key, member, hash FROM hashes WHERE {condition}",
+                                     [value for _, value in probes]).fetchall()
+        found = [(file_key, member, _distance(image_hash, other)) for file_key, member, other in rows]
+        return sorted((item for item in found if item[2] <= max_distance), key=lambda item: item[2])
+
+    def find_duplicates(self, file_key: str, max_distance: int = DEDUP_MAX_DISTANCE) -> list[Duplicate]:
+        """
+        file_key의 이미지마다 먼저 기록된 가장 가까운 이미지를 찾아 Duplicate 리스트 반환
+        같은 아카이브 안에서는 멤버명이 앞선 쪽을, 다른 아카이브는 file_key보다 먼저 등록된 아카이브만 원본 후보로 본다.
+        청크별 인덱스 조인 4번으로 끝나므로 수백만 건에서도 후보(가까운 청크 버킷)만 비교한다.
+        """
+        masks = chunk_masks(max_distance)
+        best = {}
+        with self.lock:
+            splits = dict(self.conn.execute("SELECT file_key, split FROM archives").fetchall())
+            for column in _CHUNK_COLUMNS:
+                rows = self.conn.execute(f"""
+                    SELECT a.member, a.hash, b.file_key, b.member, b.hash
+                    FROM hashes a JOIN hashes b
+                      ON b.{column} IN ({", ".join(_xor_sql(f"a.{column}", mask) for mask in masks)})
+                    WHERE a.file_key = :file_key AND (
+                        (b.file_key = a.file_key AND b.member < a.member)
+                        OR b.file_key IN (SELECT file_key FROM archives
+                                          WHERE rowid < (SELECT rowid FROM archives WHERE file_key = :file_key)))
+                """, {"file_key": file_key})
+                for member, image_hash, other_file_key, other_member, other_hash in rows:
+                    distance = _distance(image_hash, other_hash)
+                    if distance <= max_distance:
+                        candidate = (distance, other_file_key, other_member)
+                        best[member] = min(best.get(member, candidate), candidate)
+
+        split = splits.get(file_key, "")
+        return [Duplicate(member, other_file_key, other_member, distance,
+                          leakage=bool(split and splits.get(other_file_key, "") not in ("", split)),
+                          cross_category=shards.member_label(member) != shards.member_label(other_member))
+                for member, (distance, other_file_key, other_member) in sorted(best.items())]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_duplicate_report(file_name: str,
+                           duplicates: list[Duplicate],
+                           dst_root: Path = DEDUP_DIR) -> Path:
+    """중복 목록을 {dst_root}/{stem}.duplicates.jsonl로 기록 (중복이 없으면 이전 리포트 삭제)"""
+    report_path = dst_root / f"{Path(file_name).stem}.duplicates.jsonl"
+    if not duplicates:
+        report_path.unlink(missing_ok=True)
+        return report_path
+    dst_root.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        for duplicate in duplicates:
+            f.write(json.dumps(duplicate._asdict(), ensure_ascii=False) + "\n")
+    return report_path
+
+@time_logger
+def dedup_archive(file_key: str,
+                  file_name: str,
+                  index: DedupIndex,
+                  streaming: bool,
+                  action: str = DEDUP_ACTION,
+                  max_distance: int = DEDUP_MAX_DISTANCE,
+                  specs: list[OutputSpec] = OUTPUT_SPECS,
+                  transform_root: Path = TRANSFORM_DST_ROOT,
+                  archive_root: Path = ARCHIVE_DST_DIR,
+                  report_root: Path = DEDUP_DIR) -> list[Duplicate]:
+    """
+    중복 검출 스테이지: 변환 중 기록된 file_key의 dHash를 인덱스 전체와 비교해 리포트를 남기고,
+    action="drop"이면 중복 이미지를 결과(zip 또는 spec 디렉토리)와 인덱스에서 제외
+    """
+    if action not in ("report", "drop"):
+        raise ValueError(f"Unknown dedup action: {action}")
+    index.register_archive(file_key, file_name)
+    total_images = index.count(file_key)
+    duplicates = index.find_duplicates(file_key, max_distance)
+    leakage = [duplicate for duplicate in duplicates if duplicate.leakage]
+    pipeline_metrics.inc("duplicates_total", len(duplicates), stage="dedup_archive")
+    pipeline_metrics.inc("leakage_total", len(leakage), stage="dedup_archive")
+    for duplicate in leakage:
+        pipeline_logger.warning(f"[{file_key}] Train/Val leakage: {duplicate.member} ~ "
+                                f"[{duplicate.other_file_key}] {duplicate.other_member} (distance={duplicate.distance})")
+    write_duplicate_report(file_name, duplicates, report_root)
+
+    if action == "drop" and duplicates:
+        removals = {spec: {validation.output_member(duplicate.member, spec): None for duplicate in duplicates}
+                    for spec in specs}
+        if streaming:
+            validation.replace_archive_outputs(file_name, removals, archive_root)
+        else:
+            validation.replace_dir_outputs(removals, transform_root)
+        index.remove(file_key, [duplicate.member for duplicate in duplicates])
+
+    pipeline_logger.info(f"[{file_key}] {len(duplicates)}/{total_images} "
+                         f"images are near-duplicates (distance<={max_distance}, leakage={len(leakage)}, action={action})")
+    return duplicates
@@ -1,35 +1,147 @@
 '''
 aihubshell 이용 가이드: https://www.aihub.or.kr/devsport/apishell/list.do
 '''
+import math
+import random
+import re
+import shutil
+import struct
 import subprocess
+import time
+import zipfile
 from config import (
     AIHUB_API_KEY,
+    AIHUB_SHELL,
     DOWNLOAD_DST_DIR,
-    EXTRACT_DST_DIR,
     AIHUB_PROJECT_KEY,
-    AIHUB_FILE_KEYS,
-    AIHUB_MANIFEST_CSV_PATH
+    AIHUB_MANIFEST_CSV_PATH,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_BACKOFF_SECONDS,
+    DOWNLOAD_TIMEOUT_SECONDS
 )
 from pathlib import Path
-from logger import time_logger
+from logger import time_logger, pipeline_logger
+from metrics import pipeline_metrics
+from scheduler import parse_size
+from manifest import read_manifest_csv
+
+class DownloadValidationError(ValueError):
+    """다운로드된 파일이 manifest 크기/zip 구조 검사를 통과하지 못함"""
+
+def manifest_size(file_key: str, manifest_csv_path: Path = AIHUB_MANIFEST_CSV_PATH) -> str | None:
+    """download_list.csv에서 file_key의 size 컬럼("15 MB") 조회"""
+    _, size = read_manifest_csv(manifest_csv_path).get(str(file_key), (None, None))
+    return size
+
+def size_tolerance(size: str) -> tuple[int, int]:
+    """
+    manifest 표시 크기("15 MB", "1.2 GB")가 허용하는 실제 bytes 범위
+    표시 단위가 10진(1 GB = 10^9)인지 2진(1 GB = 2^30)인지 알 수 없으므로 두 해석을 모두 허용하고,
+    표시 자릿수 아래는 반올림/버림되므로 마지막 자리 1만큼의 오차를 허용 ("29 GB" -> 28e9 ~ 30 GiB)
+    """
+    parse_size(size)  # 형식 검사
+    number, unit = re.fullmatch(r"\s*([0-9.]+)\s*([KMGT]?B)\s*", size.upper()).groups()
+    step = 10 ** -len(number.partition(".")[2])
+    binary_unit = parse_size(f"1 {unit}")
+    decimal_unit = 1000 ** round(math.log(binary_unit, 1024))
+    return max(0, round((float(number) - step) * decimal_unit)), round((float(number) + step) * binary_unit)
+
+def validate_archive(file_path: Path, expected_size: str | None = None):
+    """
+    manifest 크기와 zip central directory로 다운로드 완료 여부 검사 (멤버 데이터는 읽지 않음)
+    잘린 파일은 EOCD가 없어서 열리지 않고, EOCD만 남은 경우도 마지막 멤버가 central directory를 넘는지로 확인
+    """
+    actual_size = file_path.stat().st_size
+    if expected_size:
+        low, high = size_tolerance(expected_size)
+        if not low <= actual_size <= high:
+            raise DownloadValidationError(f"{file_path.name}: size {actual_size} bytes does not match manifest {expected_size}")
+    if file_path.suffix.lower() != ".zip":
+        return
+    try:
+        with zipfile.ZipFile(file_path, 'r') as z:
+            infos = z.infolist()
+            if infos:
+                last = max(infos, key=lambda info: info.header_offset)
+                z.fp.seek(last.header_offset)
+                header = z.fp.read(zipfile.sizeFileHeader)
+                if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+                    raise DownloadValidationError(f"{file_path.name}: broken local header of {last.filename}")
+                name_length, extra_length = struct.unpack("<HH", header[26:30])
+                data_end = last.header_offset + zipfile.sizeFileHeader + name_length + extra_length + last.compress_size
+                if data_end > actual_size:
+                    raise DownloadValidationError(f"{file_path.name}: truncated member {last.filename}")
+    except zipfile.BadZipFile as e:
+        raise DownloadValidationError(f"{file_path.name}: {e}") from e
+
+def _staging_dir(file_key: str, download_dir: Path) -> Path:
+    """파일키별 작업 디렉토리. aihubshell이 만드는 데이터셋 디렉토리 트리/임시 파일을 여기에 가둔다"""
+    return download_dir / ".staging" / file_key
+
+def _run_aihubshell(file_key: str, staging_dir: Path, timeout: float | None):
+    command = [AIHUB_SHELL, "-mode", "d",
+               "-datasetkey", AIHUB_PROJECT_KEY,
+               "-filekey", file_key,
+               "-aihubapikey", AIHUB_API_KEY or ""]
+    subprocess.run(command, cwd=staging_dir, check=True, timeout=timeout)
+
+def _find_in_staging(staging_dir: Path, file_name: str) -> Path:
+    """이번 파일키의 결과만 있는 staging 디렉토리에서 파일 찾기 (전체 다운로드 트리를 훑지 않음)"""
+    try:
+        return next(path for path in staging_dir.rglob(file_name) if path.is_file())
+    except StopIteration:
+        raise FileNotFoundError(f"{file_name} not found in aihubshell output")
 
 @time_logger
 def download_file(
         file_key: str | int,
         file_name: str,
         download_dir: Path = DOWNLOAD_DST_DIR,
-        manifest_csv_path: Path = AIHUB_MANIFEST_CSV_PATH) -> Path:
+        manifest_csv_path: Path = AIHUB_MANIFEST_CSV_PATH,
+        expected_size: str | None = None,
+        retries: int = DOWNLOAD_RETRIES,
+        backoff: float = DOWNLOAD_BACKOFF_SECONDS,
+        timeout: float | None = DOWNLOAD_TIMEOUT_SECONDS) -> Path:
+    """
+    file_key를 aihubshell로 받아 {download_dir}/{file_name}에 두고 경로 반환
+    이미 받아둔 파일이 검사를 통과하면 재다운로드하지 않음. 실패/검사 불통과 시 지수 backoff로 재시도
+    반환 시점에 zip은 완전하므로 바로 압축 해제/변환 스테이지로 넘길 수 있다.
+    """
     file_key = str(file_key)
+    if expected_size is None and manifest_csv_path.is_file():
+        expected_size = manifest_size(file_key, manifest_csv_path)
+    dst_path = download_dir / file_name
 
-    command = f"aihubshell -mode d -datasetkey {AIHUB_PROJECT_KEY} -filekey {file_key} -aihubapikey {AIHUB_API_KEY}"
-    subprocess.run(command, cwd=download_dir, shell=True, check=True)
+    if dst_path.is_file():
+        try:
+            validate_archive(dst_path, expected_size)
+            pipeline_logger.info(f"[{file_key}] {file_name} already downloaded, skip")
+            return dst_path
+        except DownloadValidationError as e:
+            pipeline_logger.warning(f"[{file_key}] existing file is invalid, re-downloading: {e}")
+            dst_path.unlink()
 
-    # 해당 키로 다운로드된 .zip 파일을 찾습니다.
-    try:
-        downloaded_file_path = next(download_dir.rglob(file_name))
-        return downloaded_file_path
-    except StopIteration:
-        raise FileNotFoundError(f"Download failed for key: {file_key}")
+    staging_dir = _staging_dir(file_key, download_dir)
+    for attempt in range(1, retries + 2):
+        shutil.rmtree(staging_dir, ignore_errors=True)  # 이전 시도의 부분 파일 제거
+        staging_dir.mkdir(parents=True)
+        try:
+            _run_aihubshell(file_key, staging_dir, timeout)
+            downloaded_path = _find_in_staging(staging_dir, file_name)
+            validate_archive(downloaded_path, expected_size)
+            downloaded_path.replace(dst_path)
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            pipeline_metrics.inc("bytes_written_total", dst_path.stat().st_size, stage="download_file")
+            return dst_path
+        except (subprocess.SubprocessError, OSError, DownloadValidationError) as e:
+            pipeline_metrics.inc("errors_total", stage="download_file")
+            if attempt > retries:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                raise
+            delay = backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            pipeline_logger.warning(f"[{file_key}] download attempt {attempt}/{retries + 1} failed: {e} "
+                                    f"(retry in {delay:.1f}s)")
+            time.sleep(delay)
 
 # if __name__ == "__main__":
-# 	print(download_file("49525", "음식302_Val.zip"))
\ No newline at end of file
+# 	print(download_file("49525", "음식302_Val.zip"))
@@ -0,0 +1,196 @@
+"""
+라벨 JSON 아카이브(*_json.zip) -> 컬럼형 라벨 인덱스
+- JSON 멤버를 압축 해제 없이 하나씩 읽어 (이미지 키, 클래스명, bbox 리스트)로 파싱
+- 아카이브마다 {LABEL_INDEX_DIR}/{stem}.npz 파트를 만들고(증분), 학습 시 load_label_index로 합쳐서 로드
+- 이미지 키 = 카테고리 디렉토리/파일명(확장자 제외). 변환 결과(webp) 멤버명과 확장자 무관하게 조인된다.
+AIHub JSON 스키마가 아카이브마다 조금씩 달라서 클래스는 카테고리 디렉토리 기준, bbox는 알려진 키 패턴을 관대하게 탐색한다.
+"""
+import json
+import zipfile
+from pathlib import Path
+from typing import Iterator, NamedTuple
+import numpy as np
+from config import LABEL_INDEX_DIR
+from logger import time_logger, pipeline_logger
+from metrics import pipeline_metrics
+from preprocessor import _fix_filename
+
+_BOX_LIST_KEYS = {"bbox", "box", "bounding_box", "boundingbox", "bndbox"}
+_BOX_XYWH_KEYS = ("x", "y", "w", "h")
+_BOX_XYWH_ALIASES = {"width": "w", "height": "h"}
+
+class Label(NamedTuple):
+    key: str
+    class_name: str
+    boxes: list[tuple[float, float, float, float]]  # (x, y, w, h)
+
+def image_key(member: str) -> str:
+    """멤버 경로에서 확장자를 뗀 조인 키 (닭강정/B120211XX_00084.json -> 닭강정/B120211XX_00084)"""
+    path = Path(member)
+    return (path.parent / path.stem).as_posix()
+
+def _decode_json(data: bytes):
+    for encoding in ("utf-8-sig", "cp949"):
+        try:
+            return json.loads(data.decode(encoding))
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("unknown encoding")
+
+def _as_box(value) -> tuple[float, float, float, float] | None:
+    """[x, y, w, h] 리스트 또는 {x, y, w(idth), h(eight)} dict를 bbox로 변환 (숫자 문자열 허용)"""
+    try:
+        if isinstance(value, (list, tuple)) and len(value) == 4:
+            return tuple(float(v) for v in value)
+        if isinstance(value, dict):
+            lowered = {_BOX_XYWH_ALIASES.get(k.lower(), k.lower()): v for k, v in value.items()}
+            if all(k in lowered for k in _BOX_XYWH_KEYS):
+                return tuple(float(lowered[k]) for k in _BOX_XYWH_KEYS)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def find_boxes(node) -> list[tuple[float, float, float, float]]:
+    """JSON 트리를 재귀 탐색해서 bbox로 보이는 값을 모두 수집"""
+    boxes = []
+    if isinstance(node, dict):
+        box = _as_box(node)
+        if box is not None:
+            return [box]
+        for key, value in node.items():
+            if key.lower() in _BOX_LIST_KEYS:
+                box = _as_box(value)
+                if box is not None:
+                    boxes.append(box)
+                    continue
+            boxes.extend(find_boxes(value))
+    elif isinstance(node, list):
+        for value in node:
+            boxes.extend(find_boxes(value))
+    return boxes
+
+def parse_label(member: str, data: bytes) -> Label:
+    """JSON 멤버 1개를 Label로 파싱 (클래스는 카테고리 디렉토리명)"""
+    return Label(image_key(member), Path(member).parent.name, find_boxes(_decode_json(data)))
+
+def iter_labels(src_path: Path, file_key: str = "") -> Iterator[Label]:
+    """zip의 JSON 멤버를 하나씩 읽어 파싱 (파싱 실패는 로깅 후 건너뜀)"""
+    with zipfile.ZipFile(src_path, 'r') as z:
+        for info in z.infolist():
+            member = _fix_filename(info)
+            if info.is_dir() or not member.lower().endswith(".json"):
+                continue
+            try:
+                yield parse_label(member, z.read(info))
+            except Exception as e:
+                pipeline_metrics.inc("errors_total", stage="build_label_index")
+                pipeline_logger.error(f"[{file_key}] {member} label parsing error: {e}")
+
+# ====================================================
+# --- 라벨 인덱스 쓰기/읽기 ---
+# ====================================================
+def label_part_path(file_name: str, dst_root: Path = LABEL_INDEX_DIR) -> Path:
+    return dst_root / f"{Path(file_name).stem}.npz"
+
+@time_logger
+def build_label_index(file_key: str,
+                      src_path: Path,
+                      file_name: str,
+                      dst_root: Path = LABEL_INDEX_DIR) -> Path:
+    """
+    라벨 JSON 아카이브 1개를 파트 파일로 변환하고 경로 반환
+    컬럼: keys, class_names, box_offsets(len+1, CSR 형식), boxes(N x 4 float32)
+    """
+    keys, class_names, box_offsets, boxes = [], [], [0], []
+    for label in iter_labels(src_path, file_key):
+        keys.append(label.key)
+        class_names.append(label.class_name)
+        boxes.extend(label.boxes)
+        box_offsets.append(len(boxes))
+
+    dst_root.mkdir(parents=True, exist_ok=True)
+    part_path = label_part_path(file_name, dst_root)
+    tmp_path = part_path.with_name(f"{part_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f,
+                 keys=np.array(keys, dtype=str),
+                 class_names=np.array(class_names, dtype=str),
+                 box_offsets=np.array(box_offsets, dtype="<u4"),
+                 boxes=np.array(boxes, dtype="<f4").reshape(-1, 4))
+    tmp_path.replace(part_path)
+
+    pipeline_metrics.inc("images_total", len(keys), stage="build_label_index")
+    pipeline_logger.info(f"[{file_key}] {len(keys)} labels indexed ({len(boxes)} boxes, "
+                         f"{len(set(class_names))} classes) -> {part_path.name}")
+    return part_path
+
+def _gather_boxes(box_offsets: np.ndarray, boxes: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """CSR 형식 bbox에서 rows 순서대로 구간을 골라 (새 box_offsets, 새 boxes) 반환"""
+    counts = np.diff(box_offsets)[rows].astype(np.int64)
+    new_offsets = np.concatenate([[0], np.cumsum(counts)]).astype("<u4")
+    starts = box_offsets[:-1][rows].astype(np.int64)
+    idx = np.repeat(starts - new_offsets[:-1], counts) + np.arange(int(counts.sum()))
+    return new_offsets, boxes.reshape(-1, 4)[idx]
+
+class LabelIndex:
+    """
+    파트 파일들을 합친 라벨 인덱스. 키는 정렬되어 있어 join은 np.searchsorted로 벡터화
+    class_ids는 전체 클래스명 정렬 순서 기준 (아카이브가 추가되어도 같은 구성이면 번호 유지)
+    """
+    def __init__(self, keys: np.ndarray, class_names: np.ndarray, box_offsets: np.ndarray, boxes: np.ndarray):
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.classes, class_ids = np.unique(class_names, return_inverse=True)
+        self.class_ids = class_ids[order].astype("<i4")
+        self.box_offsets, self.boxes = _gather_boxes(box_offsets, boxes, order)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def positions(self, members) -> np.ndarray:
+        """멤버명(이미지 경로, 확장자 무관) 배열에 대응하는 인덱스 위치. 라벨이 없으면 -1"""
+        query = np.array([image_key(str(member)) for member in members], dtype=str)
+        if not len(self.keys):
+            return np.full(len(query), -1, dtype=np.int64)
+        pos = np.searchsorted(self.keys, query)
+        pos = np.minimum(pos, len(self.keys) - 1)
+        return np.where(self.keys[pos] == query, pos, -1)
+
+    def join(self, members) -> np.ndarray:
+        """멤버명 순서대로 class id 배열 반환 (라벨 없는 이미지는 -1)"""
+        pos = self.positions(members)
+        if not len(self.keys):
+            return pos.astype("<i4")
+        return np.where(pos >= 0, self.class_ids[pos], -1).astype("<i4")
+
+    def boxes_of(self, member: str) -> np.ndarray:
+        pos = int(self.positions([member])[0])
+        if pos < 0:
+            return np.empty((0, 4), dtype="<f4")
+        return self.boxes[self.box_offsets[pos]:self.box_offsets[pos + 1]]
+
+def load_label_index(dst_root: Path = LABEL_INDEX_DIR) -> LabelIndex:
+    """지금까지 만들어진 모든 라벨 파트를 합쳐서 로드 (같은 키는 나중 파트 기준)"""
+    columns = {"keys": [], "class_names": [], "counts": [], "boxes": []}
+    for part_path in sorted(dst_root.glob("*.npz")):
+        with np.load(part_path) as part:
+            columns["keys"].append(part["keys"])
+            columns["class_names"].append(part["class_names"])
+            columns["counts"].append(np.diff(part["box_offsets"]))
+            columns["boxes"].append(part["boxes"])
+    if not columns["keys"]:
+        return LabelIndex(np.array([], dtype=str), np.array([], dtype=str),
+                          np.zeros(1, dtype="<u4"), np.empty((0, 4), dtype="<f4"))
+
+    keys = np.concatenate(columns["keys"])
+    class_names = np.concatenate(columns["class_names"])
+    box_offsets = np.concatenate([[0], np.cumsum(np.concatenate(columns["counts"]))])
+    boxes = np.concatenate(columns["boxes"]).reshape(-1, 4)
+
+    # 중복 키는 마지막 등장만 남김
+    _, last = np.unique(keys[::-1], return_index=True)
+    keep = np.sort(len(keys) - 1 - last)
+    if len(keep) != len(keys):
+        box_offsets, boxes = _gather_boxes(box_offsets, boxes, keep)
+        keys, class_names = keys[keep], class_names[keep]
+    return LabelIndex(keys, class_names, box_offsets, boxes)
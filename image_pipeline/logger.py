@@ -1,19 +1,35 @@
+"""
+파이프라인 로거
+- import 시점에는 핸들러를 만들지 않고, 첫 스테이지(time_logger) 또는 진입점(cli)에서 setup_pipeline_logger() 호출 시 세팅
+- 콘솔/파일(Rotating) 핸들러는 메인 프로세스의 QueueListener 스레드만 소유하고, 로거에는 QueueHandler만 부착
+  워커 프로세스는 setup_worker_logger(queue)로 같은 큐에 기록하므로 fork/spawn 어느 쪽이든 로그 파일을 공유하지 않는다.
+"""
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 import time
+import cProfile
 from functools import wraps
-from config import LOG_FILE
+from config import LOG_FILE, METRICS_DIR, PROFILE_STAGE
+from metrics import pipeline_metrics
+
+# 어디서든 import pipeline_logger 로 가져다 쓸 수 있도록 (핸들러는 setup_pipeline_logger에서 부착)
+pipeline_logger = logging.getLogger("PipelineLogger")
+_log_queue = None
 
 def setup_pipeline_logger(log_file: Path = LOG_FILE):
-    """파이프라인 전역에서 사용할 로거를 세팅하고 반환합니다."""
-    logger = logging.getLogger("PipelineLogger")
-    
+    """파이프라인 전역에서 사용할 로거를 세팅하고 반환합니다. (메인 프로세스에서 한 번)"""
+    global _log_queue
+    logger = pipeline_logger
+
     # 이미 핸들러가 추가되어 있다면 중복 추가 방지
-    if logger.hasHandlers():
+    if logger.handlers:
         return logger
 
     logger.setLevel(logging.DEBUG) # 전체 최소 레벨 설정
+    log_file.parent.mkdir(parents=True, exist_ok=True)
 
     # 1. 로그 포맷 정의
     formatter = logging.Formatter(
@@ -37,30 +53,61 @@ def setup_pipeline_logger(log_file: Path = LOG_FILE):
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
 
-    # 핸들러 부착
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # 핸들러는 리스너 스레드에서만 실행하고 로거(메인/워커)는 큐에만 기록
+    # fork 컨텍스트에서 만든 큐는 spawn/forkserver 워커에 넘길 수 없으므로 spawn 컨텍스트로 생성 (fork 워커에서도 사용 가능)
+    _log_queue = multiprocessing.get_context("spawn").Queue()
+    listener = QueueListener(_log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # 종료 시 큐에 남은 로그까지 기록
+    logger.addHandler(QueueHandler(_log_queue))
+    logger.propagate = False
 
     return logger
 
-# 싱글톤처럼 어디서든 import pipeline_logger 로 가져다 쓸 수 있도록 인스턴스화
-pipeline_logger = setup_pipeline_logger()
+def worker_log_queue():
+    """워커 프로세스 initializer에 넘길 로그 큐 (메인 로거가 아직 없으면 세팅)"""
+    setup_pipeline_logger()
+    return _log_queue
+
+def setup_worker_logger(log_queue):
+    """워커 프로세스 로거: fork로 물려받은 핸들러를 버리고 메인 프로세스의 큐에만 기록"""
+    for handler in list(pipeline_logger.handlers):
+        pipeline_logger.removeHandler(handler)
+    pipeline_logger.setLevel(logging.DEBUG)
+    pipeline_logger.addHandler(QueueHandler(log_queue))
+    pipeline_logger.propagate = False
+
+def _run_profiled(func, args, kwargs):
+    """PROFILE_STAGE로 지정된 스테이지만 cProfile로 실행하고 .prof 파일을 남김 (snakeviz 등으로 확인)"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        prof_path = METRICS_DIR / f"{func.__name__}_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+        profiler.dump_stats(prof_path)
+        pipeline_logger.info(f"🔬 [{func.__name__}] Profile saved: {prof_path}")
 
 def time_logger(func):
-    """실행 시간(elapsed time) 파악을 위한 데코레이터"""
+    """실행 시간(elapsed time) 파악 + 스테이지 메트릭 기록을 위한 데코레이터"""
     @wraps(func)
     def wrapper(*args, **kwargs):
+        setup_pipeline_logger()
         pipeline_logger.info(f"⏳ [{func.__name__}] Stage Start")
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            result = func(*args, **kwargs)
-            elapsed = time.time() - start_time
+            with pipeline_metrics.stage(func.__name__):
+                if PROFILE_STAGE == func.__name__:
+                    result = _run_profiled(func, args, kwargs)
+                else:
+                    result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start_time
             pipeline_logger.info(f"✅ [{func.__name__}] Stage Done ({elapsed:.2f}s)")
             return result
         except Exception as e:
-            elapsed = time.time() - start_time
+            elapsed = time.perf_counter() - start_time
             pipeline_logger.exception(f"❌ [{func.__name__}] Stage Failed ({elapsed:.2f}s) - ERROR: {e}")
             raise
             
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -1,58 +1,243 @@
 import config
-import dotenv
-dotenv.load_dotenv()
+import functools
 import preprocessor
 import downloader
+import scheduler
+import shards
+import labels
+import uploader
+import validation
+import dedup
+import manifest
 import shutil
+from contextlib import nullcontext
 from config import AIHUB_MANIFEST_CSV_PATH
 from pathlib import Path
 from logger import pipeline_logger, time_logger
+from metrics import pipeline_metrics
+from state import PipelineState
+from cache import TransformCache
 
 @time_logger
 def make_key_map_from_manifest(csv_path: Path = AIHUB_MANIFEST_CSV_PATH
 							) -> dict[str, tuple[str, str]]:
-	"""download_list.csv를 읽어 key: (name, size) 매핑 테이블 생성"""
-	import csv
-	key_map = {}
-	with open(csv_path, "r", encoding="utf-8") as f:
-		reader = csv.DictReader(f, fieldnames=["file_name", "size", "file_key"])
-		# skip header
-		next(reader)
-		for i in reader:
-			key_map[i["file_key"]] = (i["file_name"], i["size"])
-	return key_map
+	"""download_list.csv를 읽어 key: (name, size) 매핑 테이블 생성 (파일이 그대로면 캐시된 결과)"""
+	return dict(manifest.read_manifest_csv(csv_path))
 
-@time_logger
-def run_pipeline(file_key: str, key_map: dict[str, tuple[str, str]]):
-	"""파일별 다운로드 -> 압축 해제 -> 변환 -> 적재 -> 정리 루프"""
-	config.init_directories()
-	file_name, _ = key_map[file_key]
+def _transform_cache() -> TransformCache | None:
+	return TransformCache() if config.TRANSFORM_CACHE_ENABLED else None
+
+@functools.cache
+def _dedup_index() -> dedup.DedupIndex | None:
+	"""전체 파일키에 걸친 dHash 인덱스 (프로세스에서 한 번 열어서 재사용)"""
+	return dedup.DedupIndex() if config.DEDUP_ENABLED else None
+
+@functools.cache
+def _upload_backend() -> uploader.StorageBackend | None:
+	"""업로드 백엔드 (프로세스에서 한 번 생성, GCS 의존성/인증 오류는 첫 아카이브 처리 전에 드러나도록 실행 시작 시 호출)"""
+	return uploader.get_backend(config.UPLOAD_BACKEND) if config.UPLOAD_ENABLED else None
+
+def download_archive(file_key: str,
+					file_name: str,
+					state: PipelineState) -> Path:
+	"""다운로드 스테이지 (이전 실행에서 받아둔 파일이 남아 있으면 재사용)"""
+	file_path = Path(state.stage_detail(file_key, "download") or "")
+	if not (state.is_stage_done(file_key, "download") and file_path.is_file()):
+		file_path = downloader.download_file(file_key, file_name)
+		state.mark_stage_done(file_key, "download", str(file_path))
+	return file_path
+
+def validate_outputs(file_key: str,
+					file_name: str,
+					file_path: Path,
+					state: PipelineState):
+	"""검증 스테이지: 실패 이미지는 재변환/재검증하고, 남은 실패는 결과에서 빼고 VALIDATION_DIR에 목록 기록"""
+	if not config.VALIDATION_ENABLED or state.is_stage_done(file_key, "validate"):
+		return
+	failures = validation.validate_and_requeue(file_key, file_name, file_path,
+											streaming=config.PIPELINE_MODE == "streaming", state=state)
+	if _dedup_index() is not None:
+		# 결과에서 빠진 이미지가 이후 아카이브의 중복 원본으로 잡히지 않도록
+		_dedup_index().remove(file_key, [failure.member for failure in failures if failure.hard])
+	state.mark_stage_done(file_key, "validate", str(len(failures)))
+
+def dedup_outputs(file_key: str,
+				file_name: str,
+				state: PipelineState):
+	"""중복 검출 스테이지: 리포트/누수 경고를 남기고 DEDUP_ACTION="drop"이면 중복 이미지를 결과에서 제외"""
+	if _dedup_index() is None or state.is_stage_done(file_key, "dedup"):
+		return
+	duplicates = dedup.dedup_archive(file_key, file_name, _dedup_index(),
+									streaming=config.PIPELINE_MODE == "streaming")
+	state.mark_stage_done(file_key, "dedup", str(len(duplicates)))
 
-	# 1. 다운로드
-	file_path = downloader.download_file(file_key, file_name)
+def output_files(file_name: str) -> list[Path]:
+	"""이미지 아카이브 1개의 결과 파일 (spec별 결과 zip + packed shard)"""
+	files = []
+	for spec in config.OUTPUT_SPECS:
+		files += preprocessor.archive_paths(file_name, target_size=spec.target_size, extension=spec.extension)
+		files += shards.shard_files(shards.shard_prefix(file_name, target_size=spec.target_size, extension=spec.extension))
+	return files
 
-	# 2. 압축 해제 분기(json 파일일 경우, 이동만 하고 종료)
+def upload_outputs(file_key: str,
+				files: list[Path],
+				state: PipelineState,
+				keep: list[Path] | None = None):
+	"""
+	업로드 스테이지: ARCHIVE_DST_DIR 기준 상대경로로 업로드하고, 확인된 파일은 바로 로컬에서 삭제
+	keep의 파일은 업로드만 하고 로컬에 남김
+	"""
+	if _upload_backend() is None or state.is_stage_done(file_key, "upload"):
+		return
+	def objects(paths: list[Path]) -> dict[Path, str]:
+		return {path: f"{config.UPLOAD_PREFIX}/{path.relative_to(config.ARCHIVE_DST_DIR).as_posix()}"
+				for path in paths if path.exists()}
+	backend = _upload_backend()
+	failed = (uploader.upload_files(objects(files), backend, delete=True)
+			+ uploader.upload_files(objects(keep or []), backend, delete=False))
+	if failed:
+		raise RuntimeError(f"{len(failed)}/{len(files)} files failed to upload: {[path.name for path in failed]}")
+	state.mark_stage_done(file_key, "upload")
+
+def process_archive(file_key: str,
+					file_name: str,
+					file_path: Path,
+					state: PipelineState):
+	"""다운로드 이후 압축 해제 -> 변환 -> 검증 -> 중복 검출 -> 적재 -> 업로드 -> 정리 스테이지"""
+	config.init_directories()
+
+	# 2. 압축 해제 분기(json 파일일 경우, 라벨 인덱스만 만들고 원본은 이동)
 	if "json" in file_name:
-		json_file_path = preprocessor.move_file(file_path)
+		if not state.is_stage_done(file_key, "labels"):
+			labels.build_label_index(file_key, file_path, file_name)
+			state.mark_stage_done(file_key, "labels")
+		json_file_path = config.ARCHIVE_DST_DIR / file_path.name
+		if file_path.exists():
+			json_file_path = preprocessor.move_file(file_path)
+		# 라벨 인덱스 파트는 학습용 로컬 인덱스(labels.load_label_index)로도 쓰므로 업로드 후에도 남김
+		upload_outputs(file_key, [json_file_path], state, keep=[labels.label_part_path(file_name)])
+		state.mark_stage_done(file_key, "cleanup")
 		return
 	
-	# 2-1. 이미지 파일 압축 해제
-	image_path_list = preprocessor.extract_archive(file_path)
-	
-	# 3. 이미지 변환
-	preprocessor.transform_images(file_key, image_path_list)
-	
-	# 4. 전처리된 이미지 압축파일 로컬 저장
-	preprocessor.make_archive(file_name)
+	if config.PIPELINE_MODE == "streaming":
+		# 2~4. 압축 해제 없이 zip -> zip 인메모리 변환
+		if not state.is_stage_done(file_key, "archive"):
+			preprocessor.transform_archive(file_key, file_path, file_name, state=state, cache=_transform_cache(),
+										dedup=_dedup_index())
+			state.mark_stage_done(file_key, "archive")
+
+		# 3-1. 결과 검증 (누락/디코딩/빈 프레임/잘린 프레임)
+		validate_outputs(file_key, file_name, file_path, state)
+
+		# 3-2. 중복 검출 (전체 파일키 dHash 인덱스, Train/Val 누수)
+		dedup_outputs(file_key, file_name, state)
+
+		# 4-1. 결과 zip -> 학습용 packed shard
+		if config.SHARD_ENABLED and not state.is_stage_done(file_key, "shards"):
+			for spec in config.OUTPUT_SPECS:
+				zip_paths = preprocessor.archive_paths(file_name, target_size=spec.target_size, extension=spec.extension)
+				shards.write_shards(file_name, shards.iter_zip_members(zip_paths),
+									target_size=spec.target_size, extension=spec.extension)
+			state.mark_stage_done(file_key, "shards")
+	else:
+		# 2-1. 이미지 파일 압축 해제
+		digests = preprocessor.member_digests(file_path)
+		if not state.is_stage_done(file_key, "extract"):
+			image_path_list = preprocessor.extract_archive(file_path)
+			state.mark_stage_done(file_key, "extract")
+		else:
+			image_path_list = [config.EXTRACT_DST_DIR / member for member in digests]
+
+		# 3. 이미지 변환
+		if not state.is_stage_done(file_key, "transform"):
+			preprocessor.transform_images(file_key, image_path_list, state=state, digests=digests,
+										cache=_transform_cache(), dedup=_dedup_index())
+			state.mark_stage_done(file_key, "transform")
+
+		# 3-1. 결과 검증 (누락/디코딩/빈 프레임/잘린 프레임)
+		validate_outputs(file_key, file_name, file_path, state)
+
+		# 3-2. 중복 검출 (전체 파일키 dHash 인덱스, Train/Val 누수)
+		dedup_outputs(file_key, file_name, state)
+
+		# 4. 전처리된 이미지 압축파일 로컬 저장 (출력 spec별 아카이브)
+		if not state.is_stage_done(file_key, "archive"):
+			for spec in config.OUTPUT_SPECS:
+				preprocessor.make_archive(file_name,
+										src_root=preprocessor.spec_dir(spec),
+										target_size=spec.target_size,
+										extension=spec.extension)
+			state.mark_stage_done(file_key, "archive")
+
+		# 4-1. 전처리된 이미지 -> 학습용 packed shard
+		if config.SHARD_ENABLED and not state.is_stage_done(file_key, "shards"):
+			for spec in config.OUTPUT_SPECS:
+				shards.write_shards(file_name, shards.iter_dir_members(preprocessor.spec_dir(spec)),
+									target_size=spec.target_size, extension=spec.extension)
+			state.mark_stage_done(file_key, "shards")
 	
+	# 4-2. 결과 업로드 (업로드 확인된 파일은 로컬에서 삭제)
+	# 샤드 공통 클래스 목록은 다음 아카이브의 샤드도 쓰므로 업로드 후에도 남김
+	upload_outputs(file_key, output_files(file_name), state,
+				   keep=[shards.class_table_path()] if config.SHARD_ENABLED else None)
+
 	# 5. 원본 파일 삭제
-	shutil.rmtree(config.DOWNLOAD_DST_DIR) 	# 1. 다운로드 zip 경로
+	file_path.unlink(missing_ok=True) 		# 1. 다운로드 zip (미리 받아둔 다른 파일키 zip은 유지)
 	shutil.rmtree(config.EXTRACT_DST_DIR)  	# 2. 압축 해제 경로
-	shutil.rmtree(config.TRANSFORM_DST_DIR) # 3. 전처리된 이미지 경로
-	# shutil.rmtree(config.ARCHIVE_DST_DIR) 	# 4. 전처리된 이미지 압축파일 경로(GCS 업로드 후 삭제 예정)
+	for spec in config.OUTPUT_SPECS:		# 3. 전처리된 이미지 경로 (spec별)
+		shutil.rmtree(preprocessor.spec_dir(spec))
+	# 4. 전처리된 이미지 압축파일/샤드는 업로드 스테이지에서 삭제
+	state.mark_stage_done(file_key, "cleanup")
+
+@time_logger
+def run_pipeline(file_key: str,
+				key_map: dict[str, tuple[str, str]],
+				state: PipelineState | None = None):
+	"""
+	파일별 다운로드 -> 압축 해제 -> 변환 -> 적재 -> 정리 루프
+	state에 완료 기록이 있는 스테이지/이미지는 건너뛰고 이어서 실행 (state가 없으면 열었다가 닫음)
+	"""
+	with nullcontext(state) if state is not None else PipelineState() as state:
+		config.init_directories()
+		file_name, _ = key_map[file_key]
+
+		if state.is_stage_done(file_key, "cleanup"):
+			pipeline_logger.info(f"[{file_key}] {file_name} already processed, skip")
+			return
+
+		# 1. 다운로드
+		file_path = download_archive(file_key, file_name, state)
+
+		process_archive(file_key, file_name, file_path, state)
+
+@time_logger
+def run_all(file_keys: list[str],
+			key_map: dict[str, tuple[str, str]],
+			state: PipelineState) -> dict[str, str]:
+	"""다음 파일키 다운로드를 현재 파일키 변환과 겹쳐서 실행 (scheduler.run_scheduled)"""
+	config.init_directories()
+	_upload_backend()  # 업로드 설정 오류는 다운로드를 시작하기 전에 실패
+	pending = [file_key for file_key in file_keys if not state.is_stage_done(file_key, "cleanup")]
+	for file_key in set(file_keys) - set(pending):
+		pipeline_logger.info(f"[{file_key}] {key_map[file_key][0]} already processed, skip")
+	return scheduler.run_scheduled(
+		pending,
+		key_map,
+		download_fn=lambda file_key, file_name: download_archive(file_key, file_name, state),
+		process_fn=lambda file_key, file_name, file_path: process_archive(file_key, file_name, file_path, state),
+	)
+
+def write_run_report() -> tuple[Path, Path]:
+	"""스테이지 메트릭을 JSON 실행 리포트와 Prometheus 텍스트로 METRICS_DIR에 기록"""
+	json_path, prom_path = pipeline_metrics.write_report(config.METRICS_DIR)
+	pipeline_logger.info(f"Run report saved: {json_path} / {prom_path}")
+	return json_path, prom_path
 
 if __name__ == "__main__":
 	config.init_directories()
 	key_map = make_key_map_from_manifest()
-	for file_key in ["49589", "49526"]:
-		run_pipeline(file_key, key_map)
\ No newline at end of file
+	with PipelineState() as state:
+		try:
+			run_all(["49589", "49526"], key_map, state)
+		finally:
+			write_run_report()
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""
+AIHub 데이터셋 파일 목록(manifest) 카탈로그
+- aihubshell -mode l 트리 출력(download_list_raw.txt)을 (파일키, 파일명, 트리 경로, 분할, 카테고리, 종류, 크기)로 파싱
+- SQLite 카탈로그에 누적하고, 새로 받은 목록과 비교해 추가/변경/삭제된 파일키를 계산
+- 처리 완료 시점의 (파일명, 크기)를 함께 기록해 두고, 이후 목록이 바뀐 파일키만 다시 처리 대상으로 스케줄
+- 카테고리(음식001 ...)/분할(Tra, Val)/종류(image, label) 단위 부분 실행
+download_list.csv도 이 파서로 다시 생성한다 (write_manifest_csv).
+"""
+import csv
+import functools
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, NamedTuple
+from config import (
+    AIHUB_SHELL,
+    AIHUB_PROJECT_KEY,
+    AIHUB_MANIFEST_CSV_PATH,
+    AIHUB_MANIFEST_RAW_PATH,
+    MANIFEST_DB_PATH,
+    MANIFEST_KINDS
+)
+from logger import time_logger, pipeline_logger
+from scheduler import parse_size
+
+# 트리 한 줄: 들여쓰기/트리 기호 + 이름 [| 크기 | 파일키]
+_TREE_LINE = re.compile(r"^(?P<indent>[\s│├└─]*)(?P<name>[^│├└|]+?)\s*(?:\|\s*(?P<size>[0-9.]+\s*[KMGT]?B)\s*\|\s*(?P<key>[0-9]+))?\s*$")
+_FILE_NAME = re.compile(r"^(?P<category>.+?)_(?P<split>Tra|Val)(?P<label>_json)?\.zip$")
+
+class ManifestEntry(NamedTuple):
+    file_key: str
+    file_name: str
+    path: str       # 데이터셋 트리 경로 (052.건강관리를 위한 음식 이미지 데이터/01.데이터/1.Training/원천데이터/음식001_Tra.zip)
+    split: str      # "Tra" | "Val" | ""
+    category: str   # 파일명 앞부분 (음식001_Tra.zip -> 음식001)
+    kind: str       # "image"(원천) | "label"(라벨 JSON) | "other"
+    size: str       # 표시 크기 ("29 GB")
+
+    @property
+    def size_bytes(self) -> int:
+        return parse_size(self.size)
+
+    @property
+    def signature(self) -> str:
+        """같은 파일키의 내용이 바뀌었는지 판단하는 값 (목록에 보이는 파일명/크기)"""
+        return f"{self.file_name}|{self.size}"
+
+class ManifestDiff(NamedTuple):
+    added: list[ManifestEntry]
+    changed: list[ManifestEntry]  # 파일명/크기/경로가 바뀐 파일키 (새 값)
+    removed: list[ManifestEntry]  # 목록에서 사라진 파일키 (이전 값)
+
+def classify(file_name: str) -> tuple[str, str, str]:
+    """파일명 -> (분할, 카테고리, 종류). AIHub 규칙에 맞지 않는 파일(InfoTable 등)은 ("", stem, "other")"""
+    match = _FILE_NAME.match(file_name)
+    if match is None:
+        return "", Path(file_name).stem, "other"
+    return match.group("split"), match.group("category"), "label" if match.group("label") else "image"
+
+def parse_tree(text: str) -> list[ManifestEntry]:
+    """
+    aihubshell 트리 출력 파싱. 들여쓰기 폭(트리 기호 포함)으로 디렉토리 깊이를 판단해 트리 경로를 복원한다.
+    트리 밖의 배너/안내 문구는 무시 (트리는 첫 └─/├─ 줄부터 시작)
+    """
+    entries = []
+    stack = []  # (들여쓰기 폭, 디렉토리명)
+    in_tree = False
+    for line in text.splitlines():
+        in_tree = in_tree or "└─" in line or "├─" in line
+        match = _TREE_LINE.match(line) if in_tree else None
+        if match is None or not match.group("name").strip():
+            continue
+        indent, name = len(match.group("indent")), match.group("name").strip()
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        if match.group("key") is None:
+            stack.append((indent, name))
+            continue
+        split, category, kind = classify(name)
+        entries.append(ManifestEntry(match.group("key"), name, "/".join([*(d for _, d in stack), name]),
+                                     split, category, kind, " ".join(match.group("size").split())))
+    return entries
+
+def read_tree(raw_path: Path = AIHUB_MANIFEST_RAW_PATH) -> list[ManifestEntry]:
+    return parse_tree(raw_path.read_text(encoding="utf-8"))
+
+@time_logger
+def fetch_tree(raw_path: Path = AIHUB_MANIFEST_RAW_PATH,
+               project_key: str = AIHUB_PROJECT_KEY) -> list[ManifestEntry]:
+    """aihubshell로 최신 파일 목록을 받아 raw_path에 저장하고 파싱"""
+    result = subprocess.run([AIHUB_SHELL, "-mode", "l", "-datasetkey", project_key],
+                            capture_output=True, text=True, encoding="utf-8", check=True)
+    entries = parse_tree(result.stdout)
+    if not entries:
+        raise ValueError(f"No files found in aihubshell listing (datasetkey={project_key})")
+    raw_path.write_text(result.stdout, encoding="utf-8")
+    return entries
+
+def write_manifest_csv(entries: Iterable[ManifestEntry], csv_path: Path = AIHUB_MANIFEST_CSV_PATH) -> Path:
+    """download_list.csv(file_name, size, file_key) 재생성"""
+    tmp_path = csv_path.with_name(f"{csv_path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file_name", "size", "file_key"])
+        writer.writerows((entry.file_name, entry.size, entry.file_key) for entry in entries)
+    tmp_path.replace(csv_path)
+    return csv_path
+
+@functools.cache
+def _read_manifest_csv(csv_path: Path, mtime_ns: int) -> dict[str, tuple[str, str]]:
+    with open(csv_path, "r", encoding="utf-8-sig") as f:
+        return {row["file_key"]: (row["file_name"], row["size"]) for row in csv.DictReader(f)}
+
+def read_manifest_csv(csv_path: Path = AIHUB_MANIFEST_CSV_PATH) -> dict[str, tuple[str, str]]:
+    """download_list.csv -> {file_key: (file_name, size)}. 파일이 바뀌지 않았으면 이전에 읽은 결과 재사용"""
+    return _read_manifest_csv(Path(csv_path), Path(csv_path).stat().st_mtime_ns)
+
+# ====================================================
+# --- 카탈로그 ---
+# ====================================================
+class ManifestCatalog:
+    def __init__(self, db_path: Path = MANIFEST_DB_PATH):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                file_key TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                split TEXT NOT NULL,
+                category TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                size TEXT NOT NULL,
+                processed_signature TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_category ON entries (category, split);
+        """)
+        self.conn.commit()
+
+    def entries(self) -> list[ManifestEntry]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT file_key, file_name, path, split, category, kind, size FROM entries ORDER BY path"
+            ).fetchall()
+        return [ManifestEntry(*row) for row in rows]
+
+    def key_map(self) -> dict[str, tuple[str, str]]:
+        """make_key_map_from_manifest와 같은 {file_key: (file_name, size)}"""
+        return {entry.file_key: (entry.file_name, entry.size) for entry in self.entries()}
+
+    def refresh(self, entries: list[ManifestEntry], state=None) -> ManifestDiff:
+        """
+        새 목록으로 카탈로그를 갱신하고 이전 목록 대비 변경 사항 반환
+        state(PipelineState)가 주어지면 카탈로그 도입 전에 처리된 파일키(cleanup 완료, 처리 기록 없음)는
+        갱신 전 값으로 처리 기록을 채워서 이번 갱신에서 바뀐 파일키가 변경으로 잡히도록 한다.
+        """
+        current = {entry.file_key: entry for entry in self.entries()}
+        if state is not None:
+            self.mark_processed([file_key for file_key in current
+                                 if state.is_stage_done(file_key, "cleanup") and self.processed_signature(file_key) is None])
+        incoming = {entry.file_key: entry for entry in entries}
+        diff = ManifestDiff(
+            added=[entry for key, entry in incoming.items() if key not in current],
+            changed=[entry for key, entry in incoming.items() if key in current and current[key] != entry],
+            removed=[entry for key, entry in current.items() if key not in incoming],
+        )
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)
+                ON CONFLICT (file_key) DO UPDATE SET
+                    file_name = excluded.file_name, path = excluded.path, split = excluded.split,
+                    category = excluded.category, kind = excluded.kind, size = excluded.size,
+                    updated_at = excluded.updated_at
+            """, [(*entry, now) for entry in [*diff.added, *diff.changed]])
+            self.conn.executemany("DELETE FROM entries WHERE file_key = ?",
+                                  [(entry.file_key,) for entry in diff.removed])
+        pipeline_logger.info(f"Manifest refreshed: {len(incoming)} files "
+                             f"(+{len(diff.added)} ~{len(diff.changed)} -{len(diff.removed)})")
+        return diff
+
+    def processed_signature(self, file_key: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute("SELECT processed_signature FROM entries WHERE file_key = ?",
+                                    (file_key,)).fetchone()
+        return row[0] if row else None
+
+    def mark_processed(self, file_keys: list[str]):
+        """파일키를 현재 카탈로그 값(파일명/크기) 기준으로 처리 완료 기록"""
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE entries SET processed_signature = file_name || '|' || size WHERE file_key = ?",
+                                  [(file_key,) for file_key in file_keys])
+
+    def select(self,
+               categories: list[str] | None = None,
+               splits: list[str] | None = None,
+               kinds: list[str] | None = MANIFEST_KINDS) -> list[ManifestEntry]:
+        """카테고리/분할/종류로 거른 항목 (None이면 해당 조건 없음)"""
+        return [entry for entry in self.entries()
+                if (not categories or entry.category in categories)
+                and (not splits or entry.split in splits)
+                and (not kinds or entry.kind in kinds)]
+
+    def pending(self, state, entries: list[ManifestEntry]) -> list[ManifestEntry]:
+        """entries 중 처리해야 하는 항목: 처리된 적 없음(cleanup 미완료) 또는 처리 후 목록 값(파일명/크기)이 바뀜"""
+        return [entry for entry in entries
+                if not state.is_stage_done(entry.file_key, "cleanup")
+                or self.processed_signature(entry.file_key) not in (None, entry.signature)]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@time_logger
+def schedule(catalog: ManifestCatalog,
+             state,
+             categories: list[str] | None = None,
+             splits: list[str] | None = None,
+             kinds: list[str] | None = MANIFEST_KINDS) -> list[ManifestEntry]:
+    """
+    부분 실행 대상 선택: 조건에 맞는 항목 중 새로 추가되었거나 처리 후 바뀐 파일키만 반환
+    바뀐 파일키는 state의 진행 기록을 지워 처음부터 다시 처리되도록 한다.
+    """
+    selected = catalog.select(categories, splits, kinds)
+    entries = catalog.pending(state, selected)
+    for entry in entries:
+        if state.is_stage_done(entry.file_key, "cleanup"):
+            pipeline_logger.info(f"[{entry.file_key}] {entry.file_name} changed since last run "
+                                 f"({catalog.processed_signature(entry.file_key)} -> {entry.signature}), reprocessing")
+            state.reset(entry.file_key)
+    pipeline_logger.info(f"{len(entries)}/{len(selected)} selected files need processing "
+                         f"(categories={categories}, splits={splits}, kinds={kinds})")
+    return entries
@@ -0,0 +1,206 @@
+"""
+스테이지 단위 메트릭 수집 및 내보내기
+- counter: 처리 이미지 수, 읽기/쓰기 bytes, 에러 수
+- histogram: 스테이지 소요 시간, 이미지당 변환 지연 (p50/p95/p99)
+- gauge: RSS peak
+실행이 끝나면 JSON 실행 리포트와 Prometheus 텍스트 포맷(node_exporter textfile collector용)으로 내보낸다.
+"""
+import json
+import random
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# 초 단위 히스토그램 버킷 (이미지당 수 ms ~ 스테이지당 수 시간)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 300.0, 900.0, 3600.0, float("inf"))
+
+class Histogram:
+    """Prometheus 누적 버킷 + 백분위 계산용 reservoir 샘플 (메모리 상한 고정)"""
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, reservoir_size: int = 10000):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.reservoir_size = reservoir_size
+        self.samples = []
+        self._random = random.Random(0)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.bucket_counts[i] += 1
+                break
+        if len(self.samples) < self.reservoir_size:
+            self.samples.append(value)
+        else:
+            j = self._random.randrange(self.count)
+            if j < self.reservoir_size:
+                self.samples[j] = value
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+            "p99": round(self.percentile(99), 6),
+        }
+
+def _label_key(labels: dict[str, str]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(label_key: tuple[tuple[str, str], ...], **extra) -> str:
+    items = list(label_key) + [(k, str(v)) for k, v in extra.items()]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def _rss_peak_bytes(who: int) -> int:
+    # ru_maxrss 단위: Linux는 KB, macOS는 bytes
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "pipeline"):
+        self.prefix = prefix
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()  # 스케줄러 다운로드 스레드와 공유
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self.lock:
+            key = (name, _label_key(labels))
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self.lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        with self.lock:
+            key = (name, _label_key(labels))
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """
+        스테이지 wall time(perf_counter)과 CPU time(자식 프로세스 포함)을 기록.
+        wall - cpu는 I/O 대기(또는 워커 대기) 시간의 근사치로 남긴다.
+        """
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        try:
+            yield
+        except Exception:
+            self.inc("errors_total", stage=stage)
+            raise
+        finally:
+            wall = time.perf_counter() - start_wall
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu = (time.process_time() - start_cpu
+                   + (children.ru_utime - start_children.ru_utime)
+                   + (children.ru_stime - start_children.ru_stime))
+            self.observe("stage_seconds", wall, stage=stage)
+            self.inc("stage_cpu_seconds_total", cpu, stage=stage)
+            self.inc("stage_wait_seconds_total", max(0.0, wall - cpu), stage=stage)
+            self.inc("stage_runs_total", stage=stage)
+            self.set_gauge("rss_peak_bytes", _rss_peak_bytes(resource.RUSAGE_SELF), scope="self")
+            self.set_gauge("rss_peak_bytes", _rss_peak_bytes(resource.RUSAGE_CHILDREN), scope="children")
+
+    # ----------------------------------------------------
+    # 내보내기
+    # ----------------------------------------------------
+    def report(self) -> dict:
+        """JSON 실행 리포트. stage별 처리량(images/sec, MB/s)도 함께 계산"""
+        with self.lock:
+            def grouped(items, render):
+                result = {}
+                for (name, label_key), value in sorted(items, key=lambda item: (item[0][0], item[0][1])):
+                    result.setdefault(name, {})[_format_labels(label_key) or "total"] = render(value)
+                return result
+
+            report = {
+                "started_at": self.started_at,
+                "elapsed_seconds": round(time.time() - self.started_at, 3),
+                "counters": grouped(self.counters.items(), lambda v: round(v, 6)),
+                "gauges": grouped(self.gauges.items(), lambda v: v),
+                "histograms": grouped(self.histograms.items(), lambda h: h.summary()),
+            }
+            throughput = {}
+            for (name, label_key), histogram in self.histograms.items():
+                if name != "stage_seconds" or histogram.sum <= 0:
+                    continue
+                stage = dict(label_key)["stage"]
+                images = self.counters.get(("images_total", _label_key({"stage": stage})), 0)
+                written = self.counters.get(("bytes_written_total", _label_key({"stage": stage})), 0)
+                throughput[stage] = {
+                    "images_per_sec": round(images / histogram.sum, 3),
+                    "write_mb_per_sec": round(written / 1024 ** 2 / histogram.sum, 3),
+                }
+            report["throughput"] = throughput
+            return report
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for kind, items in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in items}):
+                    metric = f"{self.prefix}_{name}"
+                    lines.append(f"# TYPE {metric} {kind}")
+                    for (item_name, label_key), value in sorted(items.items()):
+                        if item_name == name:
+                            lines.append(f"{metric}{_format_labels(label_key)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (item_name, label_key), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if item_name != name:
+                        continue
+                    cumulative = 0
+                    for upper, count in zip(histogram.buckets, histogram.bucket_counts):
+                        cumulative += count
+                        le = "+Inf" if upper == float("inf") else repr(upper)
+                        lines.append(f"{metric}_bucket{_format_labels(label_key, le=le)} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(label_key)} {histogram.sum}")
+                    lines.append(f"{metric}_count{_format_labels(label_key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, report_dir: Path) -> tuple[Path, Path]:
+        """run_report_{시각}.json과 metrics.prom을 report_dir에 기록하고 경로 반환"""
+        report_dir.mkdir(parents=True, exist_ok=True)
+        json_path = report_dir / f"run_report_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        json_path.write_text(json.dumps(self.report(), ensure_ascii=False, indent=2), encoding="utf-8")
+        prom_path = report_dir / "metrics.prom"
+        tmp_path = prom_path.with_suffix(".prom.tmp")
+        tmp_path.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp_path.replace(prom_path)  # textfile collector가 쓰는 중인 파일을 읽지 않도록
+        return json_path, prom_path
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+# pipeline_logger처럼 어디서든 import해서 쓰는 전역 레지스트리
+pipeline_metrics = MetricsRegistry()
@@ -5,89 +5,976 @@ OpenCV 기반 이미지 변환 로직
 """
 import cv2
 import numpy as np
+import multiprocessing
 import os
+import shutil
+import struct
+import time
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
+from typing import NamedTuple
 from config import *
-from logger import time_logger, pipeline_logger
+from logger import time_logger, pipeline_logger, setup_worker_logger, worker_log_queue
+from metrics import pipeline_metrics
+from cache import TransformCache
+
+_INTERPOLATION = cv2.INTER_AREA
+
+class _ImageResult(NamedTuple):
+    """워커가 메인 프로세스로 돌려주는 이미지 1장의 결과 (에러/지연 시간/bytes는 메인에서 로깅·집계)"""
+    member: Path | str
+    outputs: list | None         # 스트리밍 모드의 spec별 변환 bytes 또는 (CRC32, 원본 크기, deflate bytes) (디스크 모드는 이미 저장되어 None)
+    error: str | None
+    cache_hit: bool
+    seconds: float
+    bytes_read: int
+    bytes_written: int
+    dhash: int | None = None     # 기준 다운스케일 이미지의 dHash (중복 검출용, dedup.py)
 
 def resize_image(image_src_path: Path,
                  src_root: Path = TRANSFORM_SRC_DIR,
                  dst_root: Path = TRANSFORM_DST_DIR,
                  target_size: int = TARGET_SIZE,
                  extension: str = TRANSFORM_EXTENSION,
-                 quality: int = IMAGE_QUALITY) -> Path:
-    img = cv2.imread(image_src_path)
-    if img is None:
-        raise ValueError(f"Image not found at {image_src_path}")
+                 quality: int = IMAGE_QUALITY,
+                 fast_decode: bool = FAST_DECODE,
+                 cache: TransformCache | None = None) -> Path:
+    spec = OutputSpec(target_size, extension, quality)
+    save_paths, *_ = _resize_file(image_src_path, src_root, [dst_root], [spec], fast_decode, cache)
+    return save_paths[0]
 
-    img = cv2.resize(img, (target_size, target_size), interpolation=cv2.INTER_AREA)
+def _resize_file(image_src_path: Path,
+                 src_root: Path,
+                 dst_roots: list[Path],
+                 specs: list[OutputSpec],
+                 fast_decode: bool,
+                 cache: TransformCache | None,
+                 with_dhash: bool = False) -> tuple[list[Path], bool, int, int, int | None]:
+    """
+    원본 파일을 specs별로 변환해 각 dst_root에 저장하고
+    (저장 경로 리스트, 캐시 적중 여부, 읽은 bytes, 쓴 bytes, dHash) 반환
+    """
+    data = image_src_path.read_bytes()
+    outputs, hit, image_hash = _transform_cached(data, specs, fast_decode, cache, with_dhash)
 
+    save_paths = []
+    for dst_root, spec, encoded in zip(dst_roots, specs, outputs):
+        save_path = _dst_path(image_src_path, src_root, dst_root, spec.extension)
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path.write_bytes(encoded)
+        save_paths.append(save_path)
+    return save_paths, hit, len(data), sum(map(len, outputs)), image_hash
+
+def _transform_cached(data: bytes,
+                      specs: list[OutputSpec],
+                      fast_decode: bool,
+                      cache: TransformCache | None,
+                      with_dhash: bool = False) -> tuple[list[bytes], bool, int | None]:
+    """
+    캐시에 모든 spec의 결과(with_dhash면 dHash까지)가 있으면 재사용하고 없으면 변환 후 저장.
+    (spec별 결과 bytes, 적중 여부, 기준 다운스케일 이미지의 dHash 또는 None) 반환
+    작은 spec은 가장 큰 spec의 리사이즈 결과에서 만들어지므로 기준 크기(base_size)도 키에 포함
+    """
+    if cache is None:
+        outputs, base = _transform_base(data, specs, fast_decode)
+        return outputs, False, dhash(base) if with_dhash else None
+    data_hash = cache.hash_bytes(data)
+    base_size = max(spec.target_size for spec in specs)
+    keys = [cache.make_key(data_hash,
+                           target_size=spec.target_size,
+                           extension=spec.extension,
+                           quality=spec.quality,
+                           base_size=base_size,
+                           interpolation=_INTERPOLATION,
+                           fast_decode=fast_decode) for spec in specs]
+    hash_key = cache.make_key(data_hash,
+                              dhash=DHASH_SIZE,
+                              base_size=base_size,
+                              interpolation=_INTERPOLATION,
+                              fast_decode=fast_decode)
+    cached = [cache.get(key) for key in keys]
+    cached_hash = cache.get(hash_key) if with_dhash else None
+    if all(encoded is not None for encoded in cached) and (cached_hash is not None or not with_dhash):
+        return cached, True, int.from_bytes(cached_hash, "big") if with_dhash else None
+    outputs, base = _transform_base(data, specs, fast_decode)
+    for key, encoded, hit in zip(keys, outputs, cached):
+        if hit is None:
+            cache.put(key, encoded)
+    if not with_dhash:
+        return outputs, False, None
+    image_hash = dhash(base)
+    if cached_hash is None:
+        cache.put(hash_key, image_hash.to_bytes(DHASH_SIZE ** 2 // 8, "big"))
+    return outputs, False, image_hash
+
+def _dst_path(image_src_path: Path, src_root: Path, dst_root: Path, extension: str) -> Path:
+    """원본 이미지 경로에 대응하는 변환 결과 경로"""
     relative_path = image_src_path.relative_to(src_root)
-    save_path = dst_root / relative_path
-    save_path = save_path.with_suffix(f".{extension}")
-    save_path.parent.mkdir(parents=True, exist_ok=True)
-    cv2.imwrite(save_path, img, [cv2.IMWRITE_WEBP_QUALITY, quality])
-    return save_path
+    return (dst_root / relative_path).with_suffix(f".{extension}")
+
+def spec_dir(spec: OutputSpec, dst_root: Path = TRANSFORM_DST_ROOT) -> Path:
+    """spec별 변환 결과 디렉토리 ({dst_root}/{extension}_{target_size})"""
+    return dst_root / spec.name
+
+def transform_bytes(data: bytes,
+                    target_size: int = TARGET_SIZE,
+                    extension: str = TRANSFORM_EXTENSION,
+                    quality: int = IMAGE_QUALITY,
+                    fast_decode: bool = FAST_DECODE) -> bytes:
+    """resize_image의 인메모리 버전: 인코딩된 이미지 bytes -> 변환된 이미지 bytes"""
+    return transform_variants(data, [OutputSpec(target_size, extension, quality)], fast_decode)[0]
+
+def transform_variants(data: bytes,
+                       specs: list[OutputSpec] = OUTPUT_SPECS,
+                       fast_decode: bool = FAST_DECODE) -> list[bytes]:
+    """
+    한 번 디코딩해서 specs별 변환 bytes 생성.
+    가장 큰 target_size로 먼저 리사이즈(기준 다운스케일)하고, 작은 spec은 그 결과에서 다시 줄인다.
+    """
+    return _transform_base(data, specs, fast_decode)[0]
+
+def _transform_base(data: bytes,
+                    specs: list[OutputSpec],
+                    fast_decode: bool) -> tuple[list[bytes], np.ndarray]:
+    """transform_variants + 기준 다운스케일 이미지 (dHash 계산용)"""
+    base_size = max(spec.target_size for spec in specs)
+    resized = {base_size: load_resized(data, base_size, fast_decode)}
+    outputs = []
+    for spec in specs:
+        if spec.target_size not in resized:
+            resized[spec.target_size] = cv2.resize(resized[base_size], (spec.target_size, spec.target_size),
+                                                   interpolation=_INTERPOLATION)
+        outputs.append(encode_image(resized[spec.target_size], spec.extension, spec.quality))
+    return outputs, resized[base_size]
+
+def load_resized(data: bytes,
+                 target_size: int = TARGET_SIZE,
+                 fast_decode: bool = FAST_DECODE) -> np.ndarray:
+    """
+    인코딩된 이미지 bytes -> target_size x target_size BGR uint8 (인코딩 전 단계)
+    변환 스테이지와 서빙(deploy/serving.py)이 같은 디코딩/리사이즈를 쓰도록 분리
+    """
+    if not data:
+        raise ValueError("Empty image data")  # cv2.imdecode는 빈 버퍼에서 None 대신 cv2.error를 던진다
+    img = decode_image(np.frombuffer(data, dtype=np.uint8), target_size, fast_decode)
+    if img is None:
+        raise ValueError("Image decode failed")
+    return cv2.resize(img, (target_size, target_size), interpolation=_INTERPOLATION)
+
+def dhash(img: np.ndarray, hash_size: int = DHASH_SIZE) -> int:
+    """
+    difference hash: 흑백 (hash_size+1) x hash_size로 줄인 뒤 가로로 인접한 픽셀의 밝기 대소를 비트로 (기본 64bit)
+    재인코딩/리사이즈/밝기 변화에는 거의 그대로이고, 다른 사진이면 평균 절반의 비트가 달라진다.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+_ENCODE_QUALITY_FLAGS = {
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "jpeg": cv2.IMWRITE_JPEG_QUALITY,
+}
+
+def encode_image(img: np.ndarray, extension: str, quality: int) -> bytes:
+    """확장자에 맞는 품질 옵션으로 인코딩"""
+    params = [_ENCODE_QUALITY_FLAGS[extension], quality] if extension in _ENCODE_QUALITY_FLAGS else []
+    ok, encoded = cv2.imencode(f".{extension}", img, params)
+    if not ok:
+        raise ValueError(f"Image encode failed (.{extension})")
+    return encoded.tobytes()
+
+# --- 디코딩 단계 다운스케일 (IMREAD_REDUCED_*) ---
+# ====================================================
+# JPEG SOF(Start Of Frame) 마커: 0xC0~0xCF 중 DHT(C4), JPG(C8), DAC(CC) 제외
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+def jpeg_size(data) -> tuple[int, int] | None:
+    """JPEG 헤더만 읽어 (width, height) 반환. JPEG가 아니거나 SOF를 찾지 못하면 None"""
+    data = memoryview(data).cast("B")
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 9 > len(data):
+                return None
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            return width, height
+        if marker == 0xD9 or marker == 0xDA:  # EOI / SOS 이후에는 SOF가 없음
+            return None
+        segment_length = (data[pos + 2] << 8) | data[pos + 3]
+        pos += 2 + segment_length
+    return None
+
+def reduced_decode_flag(width: int, height: int, target_size: int) -> int:
+    """축소 디코딩 결과가 target_size 이상으로 유지되는 가장 큰 IMREAD_REDUCED_COLOR_* 플래그"""
+    for factor, flag in _REDUCED_DECODE_FLAGS:
+        if width // factor >= target_size and height // factor >= target_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+_DECODE_SCALES = {flag: factor for factor, flag in _REDUCED_DECODE_FLAGS}
+_HEADER_PROBE_BYTES = 64 * 1024  # SOF는 보통 EXIF 뒤 앞부분에 있음
+_UNKNOWN_DECODE_EXPANSION = 12   # 헤더로 해상도를 알 수 없을 때 압축 대비 디코딩 프레임 크기 배수 (JPEG q90 기준)
+
+def estimate_image_bytes(data,
+                         target_size: int = TARGET_SIZE,
+                         fast_decode: bool = FAST_DECODE,
+                         file_size: int | None = None) -> int:
+    """
+    이미지 1장을 변환하는 동안 차지하는 메모리 추정 (원본 bytes + 디코딩 프레임 + 리사이즈 결과)
+    data는 원본 전체 또는 앞부분(헤더)만이어도 되고, 그 경우 file_size로 원본 크기를 넘긴다.
+    """
+    file_size = len(data) if file_size is None else file_size
+    size = jpeg_size(data)
+    if size is None:
+        decoded = file_size * _UNKNOWN_DECODE_EXPANSION
+    else:
+        factor = _DECODE_SCALES.get(reduced_decode_flag(*size, target_size), 1) if fast_decode else 1
+        decoded = (size[0] // factor) * (size[1] // factor) * 3
+    return file_size + decoded + target_size * target_size * 3
+
+def _estimate_file_bytes(image_path: Path, target_size: int, fast_decode: bool) -> int:
+    """디스크의 원본 파일은 헤더만 읽어서 추정"""
+    with open(image_path, "rb") as f:
+        header = f.read(_HEADER_PROBE_BYTES)
+    return estimate_image_bytes(header, target_size, fast_decode, image_path.stat().st_size)
+
+def decode_image(buf: np.ndarray,
+                 target_size: int = TARGET_SIZE,
+                 fast_decode: bool = FAST_DECODE) -> np.ndarray | None:
+    """
+    인코딩된 이미지 버퍼 디코딩.
+    fast_decode이면 JPEG 헤더의 해상도를 보고 1/2, 1/4, 1/8 축소 디코딩 (이후 INTER_AREA로 마무리)
+    """
+    flag = cv2.IMREAD_COLOR
+    if fast_decode:
+        size = jpeg_size(buf)
+        if size is not None:
+            flag = reduced_decode_flag(*size, target_size)
+    return cv2.imdecode(buf, flag)
+
+def _init_worker(log_queue=None):
+    """
+    워커 프로세스 초기화: 프로세스 간 병렬화를 쓰므로 cv2 내부 스레드는 1개로 제한하고
+    로그는 메인 프로세스의 큐로 보냄 (로그 파일 핸들러를 워커끼리 공유하지 않도록)
+    """
+    cv2.setNumThreads(1)
+    if log_queue is not None:
+        setup_worker_logger(log_queue)
+
+def _resize_task(image_path: Path, **kwargs) -> _ImageResult:
+    """워커에서 실행되는 단위 작업. 예외 대신 에러 메시지를 담은 결과를 반환해 메인 프로세스에서 로깅"""
+    start = time.perf_counter()
+    try:
+        _, hit, bytes_read, bytes_written, image_hash = _resize_file(image_path, **kwargs)
+        return _ImageResult(image_path, None, None, hit, time.perf_counter() - start, bytes_read, bytes_written,
+                            image_hash)
+    except Exception as e:
+        return _ImageResult(image_path, None, str(e), False, time.perf_counter() - start, 0, 0)
+
+def _resize_chunk(image_paths: list[Path], **kwargs) -> list[_ImageResult]:
+    return [_resize_task(image_path, **kwargs) for image_path in image_paths]
+
+def _bounded_results(pool,
+                     task,
+                     chunks,
+                     cost,
+                     max_inflight_bytes: int,
+                     stage: str = "transform"):
+    """
+    chunks를 pool에 제출하되 제출했지만 결과를 회수하지 않은 청크의 cost(추정 bytes) 합이 max_inflight_bytes를
+    넘지 않도록 제한하고 결과를 제출 순서대로 yield (청크 생성도 이 상한에 맞춰 지연되는 backpressure)
+    상한보다 큰 청크 하나는 단독으로 허용 (교착 방지). pool이 None이면 순차 처리
+    """
+    window = deque()
+    inflight = peak = 0
+    for chunk in chunks:
+        chunk_cost = cost(chunk)
+        while window and inflight + chunk_cost > max_inflight_bytes:
+            result, result_cost = window.popleft()
+            inflight -= result_cost
+            yield result.result() if isinstance(result, Future) else result
+        window.append((pool.submit(task, chunk) if pool else task(chunk), chunk_cost))
+        inflight += chunk_cost
+        peak = max(peak, inflight)
+    pipeline_metrics.set_gauge("inflight_bytes_peak", peak, stage=stage)
+    while window:
+        result, _ = window.popleft()
+        yield result.result() if isinstance(result, Future) else result
+
+def _record_image(stage: str, result: _ImageResult):
+    """이미지 1장의 지연 시간/bytes/에러/캐시 적중을 스테이지 메트릭에 기록"""
+    pipeline_metrics.observe("image_seconds", result.seconds, stage=stage)
+    pipeline_metrics.inc("images_total", stage=stage)
+    pipeline_metrics.inc("bytes_read_total", result.bytes_read, stage=stage)
+    pipeline_metrics.inc("bytes_written_total", result.bytes_written, stage=stage)
+    if result.error is not None:
+        pipeline_metrics.inc("errors_total", stage=stage)
+    if result.cache_hit:
+        pipeline_metrics.inc("cache_hits_total", stage=stage)
+
+def _get_executor(executor: str, workers: int):
+    """workers 수와 종류에 맞는 Executor 생성 (1 이하이면 None: 순차 처리)"""
+    if workers <= 1:
+        return None
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    if executor == "process":
+        return ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context(WORKER_START_METHOD),
+                                   initializer=_init_worker,
+                                   initargs=(worker_log_queue(),))
+    raise ValueError(f"Unknown executor: {executor}")
 
 @time_logger
 def transform_images(file_key: str,
-					image_path_list: list[Path]):
-    """"""
+                     image_path_list: list[Path],
+                     src_root: Path = TRANSFORM_SRC_DIR,
+                     dst_root: Path = TRANSFORM_DST_ROOT,
+                     specs: list[OutputSpec] = OUTPUT_SPECS,
+                     fast_decode: bool = FAST_DECODE,
+                     workers: int = TRANSFORM_WORKERS,
+                     chunksize: int = TRANSFORM_CHUNKSIZE,
+                     executor: str = TRANSFORM_EXECUTOR,
+                     state=None,
+                     digests: dict[str, str] | None = None,
+                     checkpoint_interval: int = CHECKPOINT_INTERVAL,
+                     cache: TransformCache | None = None,
+                     max_inflight_bytes: int = TRANSFORM_MEMORY_BUDGET_BYTES,
+                     dedup=None) -> int:
+    """
+    이미지 리스트를 specs별로 변환해 {dst_root}/{extension}_{target_size}에 저장하고 처리한 이미지 수 반환
+    (이미지당 디코딩은 한 번, workers > 1이면 병렬 처리)
+    state(PipelineState)와 digests(member_digests 결과)가 주어지면 이미 변환된 이미지는 건너뜀
+    cache(TransformCache)가 주어지면 같은 원본/파라미터의 결과는 재인코딩 없이 복사
+    dedup(DedupIndex)이 주어지면 변환 중 계산한 dHash를 중복 검출 인덱스에 기록
+    제출 후 회수하지 않은 이미지의 추정 메모리 합은 max_inflight_bytes 이내로 제한
+    """
     total_images = len(image_path_list)
+    log_interval = max(1, total_images // 10)
+    dst_roots = [spec_dir(spec, dst_root) for spec in specs]
+    task = partial(_resize_chunk,
+                   src_root=src_root,
+                   dst_roots=dst_roots,
+                   specs=specs,
+                   fast_decode=fast_decode,
+                   cache=cache,
+                   with_dhash=dedup is not None)
+    digests = digests or {}
+    members = {image_path: image_path.relative_to(src_root).as_posix() for image_path in image_path_list}
 
-    pipeline_logger.info(f"[{file_key}] {total_images} images transforming...")
-    for i, image_path in enumerate(image_path_list):
-        try:
-            resize_image(image_path)
-            if (i+1) % (total_images//10) == 0:
-                pipeline_logger.info(f"[{file_key}] {i+1}/{total_images} images transformed ")
+    pending = image_path_list
+    if state is not None:
+        done_images = state.done_images(file_key)
+        pending = [image_path for image_path in image_path_list
+                   if not (members[image_path] in digests
+                           and done_images.get(members[image_path]) == digests[members[image_path]]
+                           and all(_dst_path(image_path, src_root, spec_root, spec.extension).exists()
+                                   for spec_root, spec in zip(dst_roots, specs)))]
+    done = total_images - len(pending)
+
+    pipeline_logger.info(f"[{file_key}] {total_images} images transforming... "
+                         f"(specs={[spec.name for spec in specs]}, workers={workers}, executor={executor}, resumed={done})")
+    completed, hashes = [], []
+    cache_hits = 0
+    if cache is not None:
+        cache.sync()
+    max_size = max(spec.target_size for spec in specs)
+    cost = lambda chunk: sum(_estimate_file_bytes(image_path, max_size, fast_decode) for image_path in chunk)
+    chunks = (pending[i:i + chunksize] for i in range(0, len(pending), chunksize))
+    pool = _get_executor(executor, workers)
+    with pool or nullcontext():
+        results = (result for chunk_results in _bounded_results(pool, task, chunks, cost, max_inflight_bytes)
+                   for result in chunk_results)
+        # 워커의 에러/진행 상황은 결과 순서대로 메인 프로세스에서 로깅
+        for result in results:
+            image_path = result.member
+            done += 1
+            cache_hits += result.cache_hit
+            _record_image("transform_images", result)
+            _track_cache(cache, result)
+            if result.error is not None:
+                pipeline_logger.error(f"[{file_key}] {image_path} image transforming error: {result.error}")
+            else:
+                if dedup is not None:
+                    hashes.append((members[image_path], result.dhash))
+                if members[image_path] in digests:
+                    completed.append((members[image_path], digests[members[image_path]]))
+            if dedup is not None and len(hashes) >= checkpoint_interval:
+                dedup.add(file_key, hashes)
+                hashes = []
+            if state is not None and len(completed) >= checkpoint_interval:
+                state.mark_images_done(file_key, completed)
+                completed = []
+            if done % log_interval == 0:
+                pipeline_logger.info(f"[{file_key}] {done}/{total_images} images transformed ")
+    if dedup is not None and hashes:
+        dedup.add(file_key, hashes)
+    if state is not None and completed:
+        state.mark_images_done(file_key, completed)
+
+    pipeline_logger.info(f"[{file_key}] {total_images} images transformed"
+                         f"{_cache_summary(cache, cache_hits, len(pending))}")
 
-        except Exception as e:
-            pipeline_logger.error(f"[{file_key}] {image_path} image transforming error: {e}")
-    
-    pipeline_logger.info(f"[{file_key}] {total_images} images transformed")
-    
     return total_images
+
+def _track_cache(cache: TransformCache | None, result: _ImageResult):
+    """메인 프로세스: 워커가 캐시에 새로 쓴 결과 bytes를 누적 (상한을 넘으면 여기서 LRU 삭제)"""
+    if cache is not None and result.error is None and not result.cache_hit:
+        cache.track(result.bytes_written)
+
+def _cache_summary(cache: TransformCache | None, cache_hits: int, processed: int) -> str:
+    """요약 로그용 캐시 적중/삭제 정보"""
+    if cache is None:
+        return ""
+    removed, freed = cache.evicted
+    return (f" (cache hits {cache_hits}/{processed}"
+            f"{f', evicted {removed} entries / {freed / 1024 ** 2:.1f} MB' if removed else ''})")
+
+# ====================================================
+# --- 인메모리(zip -> zip) 스트리밍 변환 ---
 # ====================================================
+def _transform_chunk(items: list[tuple[str, bytes]],
+                     specs: list[OutputSpec],
+                     fast_decode: bool,
+                     cache: TransformCache | None = None,
+                     deflate: bool = False,
+                     with_dhash: bool = False) -> list[_ImageResult]:
+    """
+    워커에서 실행되는 청크 단위 작업. 멤버별 결과(spec별 변환 bytes 또는 에러 메시지) 리스트 반환
+    deflate=True이면 결과를 워커에서 deflate해 (CRC32, 원본 크기, 압축 bytes)로 반환 (ARCHIVE_COMPRESSION="parallel")
+    with_dhash=True이면 중복 검출용 dHash도 계산 (dedup을 쓰지 않으면 계산/캐시 기록 생략)
+    """
+    results = []
+    for member, data in items:
+        start = time.perf_counter()
+        try:
+            outputs, hit, image_hash = _transform_cached(data, specs, fast_decode, cache, with_dhash)
+            if deflate:
+                outputs = [_deflate_bytes(encoded) for encoded in outputs]
+            results.append(_ImageResult(member, outputs, None, hit, time.perf_counter() - start,
+                                        len(data), sum(output[1] if deflate else len(output) for output in outputs),
+                                        image_hash))
+        except Exception as e:
+            results.append(_ImageResult(member, None, str(e), False, time.perf_counter() - start, len(data), 0))
+    return results
+
+def _iter_member_chunks(z: zipfile.ZipFile,
+                        infos: list[zipfile.ZipInfo],
+                        chunksize: int):
+    """zip 멤버를 (멤버명, 원본 bytes) 청크로 묶어서 순차적으로 읽기"""
+    chunk = []
+    for info in infos:
+        chunk.append((_fix_filename(info), z.read(info)))
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class _SegmentWriter:
+    """
+    변환 결과를 checkpoint_interval 단위의 세그먼트 zip으로 나누어 기록 (spec마다 parts_dir/{spec.name}/part-NNNNN.zip).
+    세그먼트가 닫힐 때마다 state에 완료된 이미지를 기록하므로, 중단되어도 닫힌 세그먼트까지는 보존된다.
+    """
+    def __init__(self,
+                 parts_dir: Path,
+                 specs: list[OutputSpec],
+                 file_key: str,
+                 state=None,
+                 checkpoint_interval: int = CHECKPOINT_INTERVAL,
+                 compression: int = zipfile.ZIP_STORED):
+        self.spec_dirs = [parts_dir / spec.name for spec in specs]
+        self.extensions = [spec.extension for spec in specs]
+        self.file_key = file_key
+        self.state = state
+        self.compression = compression
+        # state가 없으면 체크포인트가 의미 없으므로 세그먼트 1개로 기록
+        self.checkpoint_interval = checkpoint_interval if state is not None else float("inf")
+        self.next_index = max(len(_list_segments(spec_dir)) for spec_dir in self.spec_dirs)
+        self.zips = None
+        self.pending = []
+
+    def write(self, member: str, digest: str, outputs: list[bytes]):
+        if self.zips is None:
+            self.zips = [zipfile.ZipFile(spec_dir / f"part-{self.next_index:05d}.zip.tmp", 'w',
+                                         compression=self.compression)
+                         for spec_dir in self.spec_dirs]
+        for z, extension, encoded in zip(self.zips, self.extensions, outputs):
+            arcname = Path(member).with_suffix(f".{extension}").as_posix()
+            if isinstance(encoded, tuple):
+                # 워커에서 deflate된 결과는 재압축 없이 기록
+                crc, file_size, data = encoded
+                zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+                zinfo.external_attr = 0o600 << 16
+                zinfo.CRC = crc
+                zinfo.file_size = file_size
+                zinfo.compress_size = len(data)
+                _write_raw(z, zinfo, data)
+            else:
+                z.writestr(arcname, encoded)
+        self.pending.append((member, digest))
+        if len(self.pending) >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """현재 세그먼트를 닫고(central directory 기록) 완료 이미지를 state에 반영"""
+        if self.zips is None:
+            return
+        for z in self.zips:
+            tmp_path = Path(z.filename)
+            z.close()
+            tmp_path.replace(tmp_path.with_suffix(""))
+        if self.state is not None:
+            self.state.mark_images_done(self.file_key, self.pending)
+        self.zips = None
+        self.pending = []
+        self.next_index += 1
+
+def _list_segments(parts_dir: Path) -> list[Path]:
+    return sorted(parts_dir.glob("part-*.zip"))
+
+def _merge_segments(parts_dir: Path, writer: "_ArchiveWriter") -> list[zipfile.ZipInfo]:
+    """세그먼트 zip들을 결과 zip(샤드)으로 합치고 ZipInfo 리스트 반환 (압축 데이터를 그대로 복사)"""
+    segments = _list_segments(parts_dir)
+    if len(segments) == 1 and writer.shard_size == 0:
+        # 중단 없이 한 번에 끝난 경우: 복사 없이 이름만 변경
+        zip_dst_path = writer.shard_path(None)
+        segments[0].replace(zip_dst_path)
+        writer.paths.append(zip_dst_path)
+        with zipfile.ZipFile(zip_dst_path, 'r') as z:
+            info_list = z.infolist()
+    else:
+        written = set()
+        for segment in segments:
+            with zipfile.ZipFile(segment, 'r') as seg:
+                for info in seg.infolist():
+                    # state 기록 직전에 중단된 세그먼트는 재처리되어 중복될 수 있음
+                    if info.filename in written:
+                        continue
+                    writer.write_raw(_copy_zipinfo(info), _read_raw(seg, info))
+                    written.add(info.filename)
+        info_list = writer.close()
+    shutil.rmtree(parts_dir)
+    return info_list
+
+@time_logger
+def transform_archive(file_key: str,
+                      src_path: Path,
+                      file_name: str,
+                      dst_root: Path = ARCHIVE_DST_DIR,
+                      specs: list[OutputSpec] = OUTPUT_SPECS,
+                      fast_decode: bool = FAST_DECODE,
+                      workers: int = TRANSFORM_WORKERS,
+                      chunksize: int = TRANSFORM_CHUNKSIZE,
+                      executor: str = TRANSFORM_EXECUTOR,
+                      state=None,
+                      checkpoint_interval: int = CHECKPOINT_INTERVAL,
+                      compression: str = ARCHIVE_COMPRESSION,
+                      shard_size: int = ARCHIVE_SHARD_SIZE,
+                      cache: TransformCache | None = None,
+                      max_inflight_bytes: int = TRANSFORM_MEMORY_BUDGET_BYTES,
+                      dedup=None) -> dict[str, list[zipfile.ZipInfo]]:
+    """
+    원본 zip을 디스크에 풀지 않고 멤버 단위로 변환해 결과 zip에 바로 기록 (extract + transform + make_archive)
+    이미지당 한 번 디코딩해서 specs별 결과 zip({extension}_{target_size}_{file_name})을 만들고
+    {spec.name: ZipInfo 리스트} 반환
+    state(PipelineState)가 주어지면 이전 실행에서 완료된 이미지는 건너뛰고 이어서 변환
+    cache(TransformCache)가 주어지면 같은 원본/파라미터의 결과는 재인코딩 없이 재사용
+    원본 bytes/디코딩 프레임/결과 bytes의 추정 메모리 합이 max_inflight_bytes를 넘지 않도록 원본 읽기를 늦춤
+    dedup(DedupIndex)이 주어지면 변환 중 계산한 dHash를 중복 검출 인덱스에 기록
+    """
+    writers = [_ArchiveWriter(file_name, dst_root, spec.target_size, spec.extension, compression, shard_size)
+               for spec in specs]
+    parts_dir = dst_root / f"{Path(file_name).stem}.parts"
+    spec_parts_dirs = [parts_dir / spec.name for spec in specs]
+    if state is None:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    for spec_parts_dir in spec_parts_dirs:
+        spec_parts_dir.mkdir(parents=True, exist_ok=True)
+        for tmp_path in spec_parts_dir.glob("*.tmp"):
+            tmp_path.unlink()  # 닫히지 못한(손상된) 세그먼트는 버리고 재처리
+    if state is not None and not all(_list_segments(spec_parts_dir) for spec_parts_dir in spec_parts_dirs):
+        # 완료 기록이 있어도 세그먼트가 없는 spec이 있으면 처음부터
+        shutil.rmtree(parts_dir)
+        for spec_parts_dir in spec_parts_dirs:
+            spec_parts_dir.mkdir(parents=True)
+        state.reset_images(file_key)
+    done_images = state.done_images(file_key) if state is not None else {}
+    task = partial(_transform_chunk,
+                   specs=specs,
+                   fast_decode=fast_decode,
+                   cache=cache,
+                   deflate=compression == "parallel",
+                   with_dhash=dedup is not None)
+
+    with zipfile.ZipFile(src_path, 'r') as src:
+        infos = [info for info in src.infolist() if not info.is_dir()]
+        digests = {_fix_filename(info): member_digest(info) for info in infos}
+        pending = [info for info in infos
+                   if done_images.get(_fix_filename(info)) != member_digest(info)]
+        total_images = len(infos)
+        counts = {"done": total_images - len(pending), "cache_hits": 0}
+        log_interval = max(1, total_images // 10)
+        pipeline_logger.info(f"[{file_key}] {total_images} images transforming in memory... "
+                             f"(specs={[spec.name for spec in specs]}, workers={workers}, "
+                             f"executor={executor}, resumed={counts['done']})")
+
+        if cache is not None:
+            cache.sync()
+        segment_writer = _SegmentWriter(parts_dir, specs, file_key, state, checkpoint_interval,
+                                        writers[0].compression)
+        max_size = max(spec.target_size for spec in specs)
+        cost = lambda chunk: sum(estimate_image_bytes(data, max_size, fast_decode) for _, data in chunk)
+        pool = _get_executor(executor, workers)
+        with pool or nullcontext():
+            # 원본 zip 읽기 -> 워커 변환 -> 세그먼트 기록이 generator로 연결되어 메모리 상한에서 원본 읽기가 멈춘다
+            chunks = _iter_member_chunks(src, pending, chunksize)
+            for results in _bounded_results(pool, task, chunks, cost, max_inflight_bytes):
+                _write_chunk_results(file_key, segment_writer, digests, results, counts, total_images, log_interval)
+                for result in results:
+                    _track_cache(cache, result)
+                if dedup is not None:
+                    dedup.add(file_key, [(result.member, result.dhash) for result in results if result.error is None])
+        segment_writer.checkpoint()
+
+    info_lists = {}
+    for spec, spec_parts_dir, writer in zip(specs, spec_parts_dirs, writers):
+        if not _list_segments(spec_parts_dir):
+            # 모든 이미지가 실패한 경우에도 빈 결과 zip을 남긴다
+            zipfile.ZipFile(spec_parts_dir / "part-00000.zip", 'w').close()
+        info_lists[spec.name] = _merge_segments(spec_parts_dir, writer)
+        pipeline_logger.info(f"[{file_key}] {len(info_lists[spec.name])}/{total_images} images transformed -> "
+                             f"{', '.join(path.name for path in writer.paths)}")
+    shutil.rmtree(parts_dir)
+    if cache is not None:
+        pipeline_logger.info(f"[{file_key}]{_cache_summary(cache, counts['cache_hits'], len(pending))}")
+    return info_lists
+
+def _write_chunk_results(file_key: str,
+                         writer: _SegmentWriter,
+                         digests: dict[str, str],
+                         results: list[_ImageResult],
+                         counts: dict[str, int],
+                         total_images: int,
+                         log_interval: int):
+    """청크 결과를 세그먼트 zip에 기록하고 counts(처리 수, 캐시 적중 수) 갱신 (zip 쓰기는 메인 프로세스에서만)"""
+    for result in results:
+        counts["done"] += 1
+        counts["cache_hits"] += result.cache_hit
+        _record_image("transform_archive", result)
+        if result.error is not None:
+            pipeline_logger.error(f"[{file_key}] {result.member} image transforming error: {result.error}")
+        else:
+            writer.write(result.member, digests[result.member], result.outputs)
+        if counts["done"] % log_interval == 0:
+            pipeline_logger.info(f"[{file_key}] {counts['done']}/{total_images} images transformed ")
+
 # --- 압축 함수 ---
 # ====================================================
+def member_digest(info: zipfile.ZipInfo) -> str:
+    """zip central directory의 CRC32와 원본 크기로 만든 멤버 콘텐츠 해시 (재압축/추가 I/O 없이 계산)"""
+    return f"{info.CRC:08x}-{info.file_size}"
+
+def member_digests(src_path: Path) -> dict[str, str]:
+    """zip 파일의 {복원된 멤버명: 콘텐츠 해시} 매핑 반환"""
+    with zipfile.ZipFile(src_path, 'r') as z:
+        return {_fix_filename(info): member_digest(info) for info in z.infolist() if not info.is_dir()}
+
+def _fix_filename(info: zipfile.ZipInfo) -> str:
+    """UTF-8 플래그 없이 cp949로 압축된 한글 파일명 복원"""
+    try:
+        return info.filename.encode('cp437').decode('cp949')
+    except:
+        return info.filename
+
+def _extract_members(src_path: Path,
+                     members: list[tuple[str, Path]],
+                     buffer_size: int = EXTRACT_BUFFER_SIZE) -> int:
+    """워커 작업: 자체 ZipFile 핸들로 멤버 묶음을 고정 크기 버퍼로 스트리밍 해제하고 해제한 수 반환"""
+    with zipfile.ZipFile(src_path, 'r') as z:
+        for filename, target_path in members:
+            with z.open(filename) as src, open(target_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, buffer_size)
+    return len(members)
+
 @time_logger
 def extract_archive(src_path: Path,
-                    dst_root: Path = EXTRACT_DST_DIR) -> list[Path]:
-    """압축을 해제하고, ZipInfo 리스트 반환"""
+                    dst_root: Path = EXTRACT_DST_DIR,
+                    workers: int = EXTRACT_WORKERS,
+                    executor: str = EXTRACT_EXECUTOR,
+                    buffer_size: int = EXTRACT_BUFFER_SIZE) -> list[Path]:
+    """압축을 해제하고, 해제된 파일 경로 리스트 반환 (workers > 1이면 멤버 묶음 단위로 병렬 해제)"""
     with zipfile.ZipFile(src_path, 'r') as z:
-        path_list = []
-        for info in z.infolist():
-            try:
-                if info.is_dir():
-                    continue
-                fixed_name = info.filename.encode('cp437').decode('cp949')
-            except:
-                fixed_name = info.filename
-            
-            target_path = dst_root / fixed_name 
-            target_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(target_path, 'wb') as f:
-                f.write(z.read(info))
-            path_list.append(target_path)
+        infos = [info for info in z.infolist() if not info.is_dir()]
+    path_list = [dst_root / _fix_filename(info) for info in infos]
+
+    # 디렉토리는 파일마다 mkdir하지 않고 한 번에 생성
+    for directory in {target_path.parent for target_path in path_list}:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    # 워커 간 부하가 고르도록 워커 수보다 잘게 나눈 묶음을 분배
+    members = [(info.filename, target_path) for info, target_path in zip(infos, path_list)]
+    batch_size = max(1, -(-len(members) // (max(1, workers) * 4)))
+    batches = [members[i:i + batch_size] for i in range(0, len(members), batch_size)]
+    task = partial(_extract_members, src_path, buffer_size=buffer_size)
+
+    pool = _get_executor(executor, workers)
+    with pool or nullcontext():
+        extracted = sum(pool.map(task, batches) if pool else map(task, batches))
+    pipeline_metrics.inc("images_total", extracted, stage="extract_archive")
+    pipeline_metrics.inc("bytes_read_total", src_path.stat().st_size, stage="extract_archive")
+    pipeline_metrics.inc("bytes_written_total", sum(info.file_size for info in infos), stage="extract_archive")
+    pipeline_logger.info(f"{src_path.name}: {extracted} files extracted (workers={workers}, executor={executor})")
 
     return path_list
 
+# WebP/JPEG는 이미 엔트로피 코딩되어 있어 deflate 이득이 ~1% 수준이므로 기본은 무압축(stored)
+_ARCHIVE_COMPRESSION_TYPES = {
+    "stored": zipfile.ZIP_STORED,
+    "deflated": zipfile.ZIP_DEFLATED,
+    "parallel": zipfile.ZIP_DEFLATED, # 워커에서 deflate한 데이터를 그대로 zip에 기록
+}
+
+def archive_path(file_name: str,
+                 dst_root: Path = ARCHIVE_DST_DIR,
+                 target_size: int = TARGET_SIZE,
+                 extension: str = TRANSFORM_EXTENSION,
+                 shard: int | None = None) -> Path:
+    """결과 zip 경로. 샤딩 시 {extension}_{target_size}_{stem}-{shard:05d}.zip"""
+    if shard is None:
+        return dst_root / f"{extension}_{str(target_size)}_{file_name}"
+    return dst_root / f"{extension}_{str(target_size)}_{Path(file_name).stem}-{shard:05d}.zip"
+
+def archive_paths(file_name: str,
+                  dst_root: Path = ARCHIVE_DST_DIR,
+                  target_size: int = TARGET_SIZE,
+                  extension: str = TRANSFORM_EXTENSION) -> list[Path]:
+    """make_archive/transform_archive가 만든 결과 zip 목록 (샤딩 포함)"""
+    single_path = archive_path(file_name, dst_root, target_size, extension)
+    if single_path.exists():
+        return [single_path]
+    pattern = f"{extension}_{str(target_size)}_{Path(file_name).stem}-{'[0-9]' * 5}.zip"
+    return sorted(dst_root.glob(pattern))
+
+def _read_raw(z: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    """멤버의 압축된 데이터를 해제하지 않고 그대로 읽기"""
+    z.fp.seek(info.header_offset)
+    header = z.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    z.fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+    return z.fp.read(info.compress_size)
+
+def _copy_zipinfo(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    zinfo = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.external_attr = info.external_attr
+    zinfo.file_size = info.file_size
+    zinfo.compress_size = info.compress_size
+    zinfo.CRC = info.CRC
+    return zinfo
+
+# _write_raw가 직접 다루는 ZipFile 내부 속성 (하나라도 없는 Python 버전이면 재압축 경로로 기록)
+_RAW_WRITE_ATTRS = ("fp", "start_dir", "filelist", "NameToInfo", "_writecheck", "_didModify")
+
+def _write_raw(z: zipfile.ZipFile, zinfo: zipfile.ZipInfo, data: bytes):
+    """
+    CRC/크기/compress_type이 채워진 zinfo와 이미 압축된 data를 재압축 없이 기록.
+    zipfile에 공개 API가 없어 ZipFile._open_to_write와 같은 순서로 헤더와 데이터를 직접 쓴다.
+    내부 속성이 없거나 다른 멤버를 쓰는 중이면 압축을 풀어 writestr로 기록 (느리지만 결과 zip은 같은 내용)
+    """
+    if not all(hasattr(z, attr) for attr in _RAW_WRITE_ATTRS) or getattr(z, "_writing", False):
+        raw = zlib.decompress(data, -15) if zinfo.compress_type == zipfile.ZIP_DEFLATED else data
+        if zlib.crc32(raw) != zinfo.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for raw member {zinfo.filename}")
+        z.writestr(zinfo, raw, compress_type=zinfo.compress_type)
+        return
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    z.fp.seek(z.start_dir)
+    zinfo.header_offset = z.fp.tell()
+    z._writecheck(zinfo)
+    z._didModify = True
+    z.fp.write(zinfo.FileHeader(zip64))
+    z.fp.write(data)
+    z.start_dir = z.fp.tell()
+    z.filelist.append(zinfo)
+    z.NameToInfo[zinfo.filename] = zinfo
+
+def replace_archive_members(zip_paths: list[Path], replacements: dict[str, bytes | None]) -> int:
+    """
+    결과 zip(샤드 포함)의 멤버를 교체하거나 삭제(None)하고, 어느 zip에도 없는 멤버는 마지막 zip에 추가.
+    같은 이름의 멤버가 여러 개면 첫 번째만 교체하고 나머지는 삭제.
+    해당 멤버가 있는 zip만 다시 쓰며 나머지 멤버는 재압축 없이 raw 복사. 변경된 멤버 수 반환
+    """
+    names = []
+    for zip_path in zip_paths:
+        with zipfile.ZipFile(zip_path, 'r') as z:
+            names.append(set(z.namelist()))
+    present = set().union(*names)
+    additions = {member: data for member, data in replacements.items() if data is not None and member not in present}
+
+    changed = 0
+    replaced = set()
+    for i, (zip_path, zip_names) in enumerate(zip(zip_paths, names)):
+        zip_additions = additions if i == len(zip_paths) - 1 else {}
+        if not (zip_names & replacements.keys()) and not zip_additions:
+            continue
+        partial_path = zip_path.with_suffix(".zip.partial")
+        with zipfile.ZipFile(zip_path, 'r') as src, zipfile.ZipFile(partial_path, 'w') as dst:
+            infos = src.infolist()
+            compression = infos[0].compress_type if infos else zipfile.ZIP_STORED
+            for info in infos:
+                if info.filename not in replacements:
+                    _write_raw(dst, _copy_zipinfo(info), _read_raw(src, info))
+                    continue
+                changed += 1
+                if replacements[info.filename] is not None and info.filename not in replaced:
+                    replaced.add(info.filename)
+                    dst.writestr(zipfile.ZipInfo(info.filename, date_time=info.date_time),
+                                 replacements[info.filename], compress_type=info.compress_type)
+            for member, data in zip_additions.items():
+                dst.writestr(member, data, compress_type=compression)
+                changed += 1
+        partial_path.replace(zip_path)
+    return changed
+
+def _deflate_bytes(data: bytes) -> tuple[int, int, bytes]:
+    """data를 raw deflate로 압축해 (CRC32, 원본 크기, 압축 bytes) 반환"""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return zlib.crc32(data), len(data), compressor.compress(data) + compressor.flush()
+
+def _deflate_file(file: Path) -> tuple[int, int, bytes]:
+    """워커 작업: 파일을 raw deflate로 압축해 (CRC32, 원본 크기, 압축 bytes) 반환"""
+    return _deflate_bytes(file.read_bytes())
+
+def _deflate_chunk(files: list[Path]) -> list[tuple[int, int, bytes]]:
+    return [_deflate_file(file) for file in files]
+
+class _ArchiveWriter:
+    """compression/shard_size 설정에 맞춰 결과 zip을 기록 (shard_size > 0이면 N개 단위로 분할)"""
+    def __init__(self,
+                 file_name: str,
+                 dst_root: Path = ARCHIVE_DST_DIR,
+                 target_size: int = TARGET_SIZE,
+                 extension: str = TRANSFORM_EXTENSION,
+                 compression: str = ARCHIVE_COMPRESSION,
+                 shard_size: int = ARCHIVE_SHARD_SIZE):
+        if compression not in _ARCHIVE_COMPRESSION_TYPES:
+            raise ValueError(f"Unknown archive compression: {compression}")
+        self.file_name = file_name
+        self.dst_root = dst_root
+        self.target_size = target_size
+        self.extension = extension
+        self.compression = _ARCHIVE_COMPRESSION_TYPES[compression]
+        self.shard_size = shard_size
+        self.paths = []
+        self.info_list = []
+        self.zip = None
+        self.count = 0
+
+    def shard_path(self, shard: int | None) -> Path:
+        return archive_path(self.file_name, self.dst_root, self.target_size, self.extension, shard)
+
+    def _current(self) -> zipfile.ZipFile:
+        if self.zip is not None and self.shard_size and self.count % self.shard_size == 0:
+            self._close_current()
+        if self.zip is None:
+            shard = len(self.paths) if self.shard_size else None
+            partial_path = self.shard_path(shard).with_suffix(".zip.partial")
+            self.zip = zipfile.ZipFile(partial_path, 'w', compression=self.compression)
+        self.count += 1
+        return self.zip
+
+    def _close_current(self):
+        partial_path = Path(self.zip.filename)
+        self.info_list.extend(self.zip.infolist())
+        self.zip.close()
+        self.paths.append(partial_path.replace(partial_path.with_suffix("")))
+        self.zip = None
+
+    def write_file(self, file: Path, arcname: str):
+        self._current().write(file, arcname)
+
+    def write_raw(self, zinfo: zipfile.ZipInfo, data: bytes):
+        """이미 압축된 data를 재압축 없이 현재 zip(샤드)에 기록"""
+        _write_raw(self._current(), zinfo, data)
+
+    def close(self) -> list[zipfile.ZipInfo]:
+        if self.zip is None and not self.paths:
+            self._current()  # 빈 결과도 zip 1개는 남긴다
+            self.count = 0
+        if self.zip is not None:
+            self._close_current()
+        return self.info_list
+
 @time_logger
 def make_archive(file_name: str,
                  src_root: Path = ARCHIVE_SRC_DIR,
                  dst_root: Path = ARCHIVE_DST_DIR,
                  target_size: int = TARGET_SIZE,
-                 extension: str = TRANSFORM_EXTENSION) -> list[zipfile.ZipInfo]:
-    """디렉토리를 zip으로 압축하고, ZipInfo 리스트 반환"""
-    zip_dst_path = dst_root / f"{extension}_{str(target_size)}_{file_name}"
-    with zipfile.ZipFile(zip_dst_path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
-        for file in src_root.rglob('*'):
-            if file.is_file():
-                arcname = file.relative_to(src_root) # zip 내부 상대경로
-                z.write(file, arcname)
-        info_list = z.infolist()
+                 extension: str = TRANSFORM_EXTENSION,
+                 compression: str = ARCHIVE_COMPRESSION,
+                 shard_size: int = ARCHIVE_SHARD_SIZE,
+                 workers: int = ARCHIVE_WORKERS,
+                 executor: str = ARCHIVE_EXECUTOR,
+                 chunksize: int = TRANSFORM_CHUNKSIZE,
+                 max_inflight_bytes: int = TRANSFORM_MEMORY_BUDGET_BYTES) -> list[zipfile.ZipInfo]:
+    """
+    디렉토리를 zip으로 압축하고, ZipInfo 리스트 반환
+    compression: "stored"(무압축) | "deflated"(단일 스레드) | "parallel"(워커에서 deflate 후 그대로 기록)
+    shard_size > 0이면 N개 이미지 단위로 여러 zip에 나누어 기록
+    parallel에서 기록하지 않은 압축 결과(+ 읽은 원본)의 합은 max_inflight_bytes 이내로 제한
+    """
+    writer = _ArchiveWriter(file_name, dst_root, target_size, extension, compression, shard_size)
+    files = sorted(file for file in src_root.rglob('*') if file.is_file())
+    arcnames = [file.relative_to(src_root).as_posix() for file in files] # zip 내부 상대경로
+
+    if compression == "parallel":
+        pool = _get_executor(executor, workers)
+        cost = lambda chunk: sum(2 * file.stat().st_size for file in chunk)  # 워커의 원본 + 압축 결과
+        chunks = (files[i:i + chunksize] for i in range(0, len(files), chunksize))
+        with pool or nullcontext():
+            results = (result for chunk_results in _bounded_results(pool, _deflate_chunk, chunks, cost,
+                                                                    max_inflight_bytes, stage="make_archive")
+                       for result in chunk_results)
+            for file, arcname, (crc, file_size, data) in zip(files, arcnames, results):
+                zinfo = zipfile.ZipInfo.from_file(file, arcname)
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+                zinfo.CRC = crc
+                zinfo.file_size = file_size
+                zinfo.compress_size = len(data)
+                writer.write_raw(zinfo, data)
+    else:
+        for file, arcname in zip(files, arcnames):
+            writer.write_file(file, arcname)
+
+    info_list = writer.close()
+    pipeline_metrics.inc("images_total", len(info_list), stage="make_archive")
+    pipeline_metrics.inc("bytes_read_total", sum(info.file_size for info in info_list), stage="make_archive")
+    pipeline_metrics.inc("bytes_written_total", sum(path.stat().st_size for path in writer.paths), stage="make_archive")
+    pipeline_logger.info(f"{len(info_list)} files archived -> {', '.join(path.name for path in writer.paths)} "
+                         f"(compression={compression})")
     return info_list
 
 @time_logger
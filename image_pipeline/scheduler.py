@@ -0,0 +1,121 @@
+"""
+파일키 단위 다운로드/처리 오버랩 스케줄러
+현재 아카이브를 변환하는 동안 다음 아카이브를 미리 다운로드한다. (CPU/네트워크 동시 사용)
+manifest의 size 컬럼으로 디스크 사용량을 예약해, 미리 받아둔 아카이브가 볼륨을 채우지 않도록 제한한다.
+"""
+import queue
+import re
+import threading
+from pathlib import Path
+from typing import Callable
+from config import (
+    PREFETCH_ARCHIVES,
+    DISK_BUDGET_BYTES,
+    DISK_FOOTPRINT_FACTOR,
+    PIPELINE_MODE
+)
+from logger import time_logger, pipeline_logger
+
+_SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+def parse_size(size: str) -> int:
+    """download_list.csv의 size 컬럼("15 MB", "1.2 GB")을 bytes로 변환"""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([KMGT]?B)\s*", size.upper())
+    if match is None:
+        raise ValueError(f"Invalid size: {size!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+class DiskBudget:
+    """디스크 사용량 예약/반환. 예산을 넘으면 반환될 때까지 대기"""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, nbytes: int, stop: threading.Event | None = None) -> bool:
+        """예약 성공 시 True. 단일 아카이브가 예산보다 커도 사용 중인 예약이 없으면 허용 (교착 방지)"""
+        with self.cond:
+            while self.used > 0 and self.used + nbytes > self.capacity:
+                if stop is not None and stop.is_set():
+                    return False
+                self.cond.wait(timeout=1.0)
+            self.used += nbytes
+            return True
+
+    def release(self, nbytes: int):
+        with self.cond:
+            self.used -= nbytes
+            self.cond.notify_all()
+
+@time_logger
+def run_scheduled(file_keys: list[str],
+                  key_map: dict[str, tuple[str, str]],
+                  download_fn: Callable[[str, str], Path],
+                  process_fn: Callable[[str, str, Path], None],
+                  prefetch: int = PREFETCH_ARCHIVES,
+                  disk_budget: int = DISK_BUDGET_BYTES,
+                  footprint_factor: float = DISK_FOOTPRINT_FACTOR[PIPELINE_MODE]) -> dict[str, str]:
+    """
+    download_fn(file_key, file_name) -> 다운로드 경로
+    process_fn(file_key, file_name, file_path) -> 변환/적재/정리 (다운로드 파일 삭제 포함)
+    다운로드 스레드가 최대 prefetch개 아카이브를 앞서 받고, 메인 스레드가 순서대로 처리한다.
+    file_key별 결과("done" | "download_failed" | "process_failed") 반환
+    """
+    budget = DiskBudget(disk_budget)
+    slots = threading.Semaphore(max(1, prefetch))
+    ready = queue.Queue()
+    stop = threading.Event()
+
+    def footprint(file_key: str) -> int:
+        return int(parse_size(key_map[file_key][1]) * footprint_factor)
+
+    def producer():
+        for file_key in file_keys:
+            # 처리 대기 슬롯 -> 디스크 예산 순서로 확보
+            while not slots.acquire(timeout=1.0):
+                if stop.is_set():
+                    return
+            # 알 수 없는 키/잘못된 size도 큐에 실패로 넘겨야 메인 스레드가 ready.get()에서 멈추지 않는다
+            try:
+                file_name, size = key_map[file_key]
+                nbytes = footprint(file_key)
+            except Exception as e:
+                ready.put((file_key, None, e, 0))
+                continue
+            if not budget.acquire(nbytes, stop):
+                return
+            pipeline_logger.info(f"[{file_key}] prefetch {file_name} ({size}, "
+                                 f"budget {budget.used / 1024 ** 3:.1f}/{disk_budget / 1024 ** 3:.1f} GB)")
+            try:
+                ready.put((file_key, download_fn(file_key, file_name), None, nbytes))
+            except Exception as e:
+                ready.put((file_key, None, e, nbytes))
+
+    downloader_thread = threading.Thread(target=producer, name="prefetch-downloader", daemon=True)
+    downloader_thread.start()
+
+    results = {}
+    try:
+        for _ in file_keys:
+            file_key, file_path, error, nbytes = ready.get()
+            slots.release()
+            file_name = key_map[file_key][0] if file_key in key_map else file_key
+            try:
+                if error is not None:
+                    pipeline_logger.error(f"[{file_key}] {file_name} download error: {error}")
+                    results[file_key] = "download_failed"
+                    continue
+                try:
+                    process_fn(file_key, file_name, file_path)
+                    results[file_key] = "done"
+                except Exception as e:
+                    pipeline_logger.error(f"[{file_key}] {file_name} processing error: {e}")
+                    results[file_key] = "process_failed"
+            finally:
+                if nbytes:
+                    budget.release(nbytes)
+    finally:
+        stop.set()
+        downloader_thread.join()
+
+    return results
@@ -0,0 +1,203 @@
+"""
+학습용 packed shard 포맷
+- {extension}_{target_size}_{stem}-{shard:05d}.rec : 변환된 이미지 bytes를 이어 붙인 레코드 파일 (헤더/구분자 없음)
+- {extension}_{target_size}_{stem}.idx.npz       : 레코드별 (shard, offset, length, label, crc32) 구조체 배열 + 멤버명 + 클래스명
+- classes.json                                   : 모든 아카이브가 공유하는 클래스명 목록 (목록 위치 = label)
+zip 멤버마다 open/seek/inflate 하는 대신 샤드를 순차로 읽거나 mmap으로 인덱스 접근(zero copy)한다.
+label은 카테고리 디렉토리(멤버 경로의 부모 디렉토리)명의 classes.json 내 번호.
+classes.json은 새 클래스를 뒤에 추가만 하므로 먼저 만든 샤드의 번호도 그대로 유효하다.
+"""
+import json
+import mmap
+import threading
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator
+import numpy as np
+from config import ARCHIVE_DST_DIR, TARGET_SIZE, TRANSFORM_EXTENSION, SHARD_MAX_BYTES, SHARD_CLASS_TABLE
+from logger import time_logger, pipeline_logger
+from metrics import pipeline_metrics
+
+INDEX_DTYPE = np.dtype([
+    ("shard", "<u2"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("label", "<i4"),
+    ("crc32", "<u4"),
+])
+
+_class_table_lock = threading.Lock()
+
+def shard_prefix(file_name: str,
+                 dst_root: Path = ARCHIVE_DST_DIR,
+                 target_size: int = TARGET_SIZE,
+                 extension: str = TRANSFORM_EXTENSION) -> Path:
+    """archive_path와 같은 이름 규칙의 샤드 파일 접두 경로 ({extension}_{target_size}_{stem})"""
+    return dst_root / f"{extension}_{str(target_size)}_{Path(file_name).stem}"
+
+def shard_path(prefix: Path, shard: int) -> Path:
+    return prefix.with_name(f"{prefix.name}-{shard:05d}.rec")
+
+def index_path(prefix: Path) -> Path:
+    return prefix.with_name(f"{prefix.name}.idx.npz")
+
+def shard_files(prefix: Path) -> list[Path]:
+    """write_shards가 만든 샤드 파일 + 인덱스 파일 목록 (없으면 빈 리스트)"""
+    idx_path = index_path(prefix)
+    if not idx_path.exists():
+        return []
+    return sorted(prefix.parent.glob(f"{prefix.name}-{'[0-9]' * 5}.rec")) + [idx_path]
+
+def member_label(member: str) -> str:
+    """멤버 경로의 카테고리 디렉토리명 (예: 닭강정/B120211XX_00084.webp -> 닭강정)"""
+    return Path(member).parent.name
+
+def class_table_path(dst_root: Path = ARCHIVE_DST_DIR) -> Path:
+    return dst_root / SHARD_CLASS_TABLE
+
+def load_class_table(dst_root: Path = ARCHIVE_DST_DIR) -> list[str]:
+    """샤드 공통 클래스명 목록 (없으면 빈 리스트)"""
+    path = class_table_path(dst_root)
+    if not path.exists():
+        return []
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def update_class_table(names: Iterable[str], dst_root: Path = ARCHIVE_DST_DIR) -> list[str]:
+    """처음 보는 클래스명을 이름순으로 목록 뒤에 추가하고 전체 목록 반환 (기존 번호는 바뀌지 않음)"""
+    with _class_table_lock:
+        classes = load_class_table(dst_root)
+        new_names = sorted(set(names) - set(classes))
+        if new_names:
+            classes += new_names
+            path = class_table_path(dst_root)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            tmp_path.write_text(json.dumps(classes, ensure_ascii=False, indent=2), encoding="utf-8")
+            tmp_path.replace(path)
+        return classes
+
+# ====================================================
+# --- 샤드 쓰기 ---
+# ====================================================
+@time_logger
+def write_shards(file_name: str,
+                 members: Iterable[tuple[str, bytes]],
+                 dst_root: Path = ARCHIVE_DST_DIR,
+                 target_size: int = TARGET_SIZE,
+                 extension: str = TRANSFORM_EXTENSION,
+                 shard_bytes: int = SHARD_MAX_BYTES) -> Path:
+    """
+    (멤버명, 이미지 bytes)를 순서대로 샤드 파일에 이어 쓰고 인덱스 파일 경로 반환
+    샤드가 shard_bytes를 넘으면 다음 샤드로 넘어감. 모든 파일은 .tmp에 쓴 뒤 완료 시 rename
+    label은 dst_root의 classes.json 기준 번호 (아카이브 간 같은 클래스는 같은 번호)
+    """
+    prefix = shard_prefix(file_name, dst_root, target_size, extension)
+    for stale_path in dst_root.glob(f"{prefix.name}-[0-9][0-9][0-9][0-9][0-9].rec*"):
+        stale_path.unlink()  # 이전 실행의 샤드 수가 더 많았을 수 있으므로 정리
+
+    names, records, labels = [], [], {}
+    shard, offset = 0, 0
+    tmp_paths = [shard_path(prefix, shard).with_suffix(".rec.tmp")]
+    f = open(tmp_paths[-1], "wb")
+    try:
+        for member, data in members:
+            if offset and offset + len(data) > shard_bytes:
+                f.close()
+                shard, offset = shard + 1, 0
+                tmp_paths.append(shard_path(prefix, shard).with_suffix(".rec.tmp"))
+                f = open(tmp_paths[-1], "wb")
+            f.write(data)
+            label = labels.setdefault(member_label(member), len(labels))
+            records.append((shard, offset, len(data), label, zlib.crc32(data)))
+            names.append(member)
+            offset += len(data)
+    finally:
+        f.close()
+
+    # 아카이브 내 등장 순서 번호 -> 공통 클래스 목록 번호
+    classes = update_class_table(labels, dst_root)
+    class_ids = {name: i for i, name in enumerate(classes)}
+    remap = np.array([class_ids[label] for label in labels], dtype="<i4")
+    index = np.array(records, dtype=INDEX_DTYPE)
+    if len(index):
+        index["label"] = remap[index["label"]]
+
+    idx_path = index_path(prefix)
+    tmp_index_path = idx_path.with_name(f"{idx_path.name}.tmp")
+    with open(tmp_index_path, "wb") as index_file:
+        np.savez(index_file, records=index, names=np.array(names, dtype=str), classes=np.array(classes, dtype=str))
+    for tmp_path in tmp_paths:
+        tmp_path.replace(tmp_path.with_suffix(""))
+    tmp_index_path.replace(idx_path)
+
+    total_bytes = int(index["length"].sum()) if len(index) else 0
+    pipeline_metrics.inc("images_total", len(index), stage="write_shards")
+    pipeline_metrics.inc("bytes_written_total", total_bytes, stage="write_shards")
+    pipeline_logger.info(f"{len(index)} images packed -> {len(tmp_paths)} shards, {idx_path.name} "
+                         f"({total_bytes / 1024 ** 2:.1f} MB, {len(labels)}/{len(classes)} classes)")
+    return idx_path
+
+def iter_dir_members(src_root: Path) -> Iterator[tuple[str, bytes]]:
+    """변환 결과 디렉토리(disk 모드)의 (상대경로, bytes)를 이름순으로 읽기"""
+    for file in sorted(file for file in src_root.rglob('*') if file.is_file()):
+        yield file.relative_to(src_root).as_posix(), file.read_bytes()
+
+def iter_zip_members(zip_paths: list[Path]) -> Iterator[tuple[str, bytes]]:
+    """결과 zip(streaming 모드, 샤딩 포함)의 (멤버명, bytes)를 순서대로 읽기"""
+    for zip_path in zip_paths:
+        with zipfile.ZipFile(zip_path, 'r') as z:
+            for info in z.infolist():
+                if not info.is_dir():
+                    yield info.filename, z.read(info)
+
+# ====================================================
+# --- 샤드 읽기 ---
+# ====================================================
+class ShardReader:
+    """
+    인덱스 파일을 읽고 샤드를 mmap해서 i번째 이미지 bytes를 memoryview로 반환 (복사 없음)
+    cv2.imdecode(np.frombuffer(reader[i], np.uint8), ...)처럼 바로 디코딩에 넘길 수 있다.
+    반환된 memoryview를 잡고 있는 동안에는 close()할 수 없으므로 사용 후 해제할 것
+    """
+    def __init__(self, idx_path: Path):
+        self.idx_path = Path(idx_path)
+        with np.load(self.idx_path) as index:
+            self.records = index["records"]
+            self.names = index["names"]
+            self.classes = index["classes"]
+        self.prefix = self.idx_path.with_name(self.idx_path.name.removesuffix(".idx.npz"))
+        self._maps = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _map(self, shard: int) -> mmap.mmap:
+        if shard not in self._maps:
+            with open(shard_path(self.prefix, shard), "rb") as f:
+                self._maps[shard] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[shard]
+
+    def __getitem__(self, i: int) -> memoryview:
+        shard, offset, length = (int(v) for v in self.records[["shard", "offset", "length"]][i])
+        return memoryview(self._map(shard))[offset:offset + length]
+
+    def label(self, i: int) -> int:
+        return int(self.records["label"][i])
+
+    def name(self, i: int) -> str:
+        return str(self.names[i])
+
+    def verify(self) -> list[int]:
+        """CRC32가 맞지 않는 레코드 번호 리스트 반환"""
+        return [i for i in range(len(self)) if zlib.crc32(self[i]) != int(self.records["crc32"][i])]
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,109 @@
+"""
+SQLite 기반 파이프라인 진행 상태 저장소
+- file_key 단위 스테이지(download, extract, transform, archive, cleanup) 완료 기록
+- 이미지 단위 변환 완료 기록 (원본 멤버명 + 콘텐츠 해시)
+중단된 run_pipeline을 다시 실행하면 완료된 작업은 건너뛰고 이어서 진행한다.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from config import STATE_DB_PATH
+
+class PipelineState:
+    def __init__(self, db_path: Path = STATE_DB_PATH):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        # 스케줄러의 다운로드 스레드와 메인 스레드가 함께 사용하므로 lock으로 직렬화
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS stages (
+                file_key TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                detail TEXT,
+                done_at REAL NOT NULL,
+                PRIMARY KEY (file_key, stage)
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                file_key TEXT NOT NULL,
+                member TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                done_at REAL NOT NULL,
+                PRIMARY KEY (file_key, member)
+            );
+        """)
+        self.conn.commit()
+
+    # ----------------------------------------------------
+    # 스테이지 단위 기록
+    # ----------------------------------------------------
+    def is_stage_done(self, file_key: str, stage: str) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM stages WHERE file_key = ? AND stage = ?", (file_key, stage)
+            ).fetchone()
+        return row is not None
+
+    def stage_detail(self, file_key: str, stage: str) -> str | None:
+        """스테이지 완료 시 함께 저장한 값(예: 다운로드 경로) 반환"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT detail FROM stages WHERE file_key = ? AND stage = ?", (file_key, stage)
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_stage_done(self, file_key: str, stage: str, detail: str | None = None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)",
+                (file_key, stage, detail, time.time())
+            )
+
+    # ----------------------------------------------------
+    # 이미지 단위 기록
+    # ----------------------------------------------------
+    def done_images(self, file_key: str) -> dict[str, str]:
+        """완료된 이미지의 {멤버명: 콘텐츠 해시} 반환"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT member, digest FROM images WHERE file_key = ?", (file_key,)
+            )
+            return dict(rows)
+
+    def mark_images_done(self, file_key: str, items: list[tuple[str, str]]):
+        """(멤버명, 콘텐츠 해시) 리스트를 한 트랜잭션으로 기록"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?)",
+                [(file_key, member, digest, now) for member, digest in items]
+            )
+
+    def unmark_images(self, file_key: str, members: list[str]):
+        """검증에 실패한 이미지 등 완료 기록을 지워 재처리 대상으로 되돌림"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM images WHERE file_key = ? AND member = ?",
+                [(file_key, member) for member in members]
+            )
+
+    def reset_images(self, file_key: str):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM images WHERE file_key = ?", (file_key,))
+
+    def reset(self, file_key: str):
+        """file_key의 모든 진행 기록 삭제 (처음부터 다시 실행)"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM stages WHERE file_key = ?", (file_key,))
+            self.conn.execute("DELETE FROM images WHERE file_key = ?", (file_key,))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,164 @@
+"""
+변환 결과(아카이브/샤드/라벨) 업로드
+- StorageBackend: GCSBackend(google-cloud-storage, 필요할 때만 import) / LocalBackend(로컬 디렉토리, 테스트/오프라인용)
+- 여러 파일을 동시에 청크 단위로 업로드하되, 동시에 업로드 중인 bytes는 상한(in-flight budget) 이내로 제한
+- 업로드가 확인(크기/체크섬)된 파일은 바로 로컬에서 삭제해서 ARCHIVE_DST_DIR가 쌓이지 않도록 한다
+"""
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from config import (
+    BUCKET_NAME,
+    UPLOAD_BACKEND,
+    UPLOAD_LOCAL_DIR,
+    UPLOAD_WORKERS,
+    UPLOAD_MAX_INFLIGHT_BYTES,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_RETRIES,
+    UPLOAD_BACKOFF_SECONDS
+)
+from logger import time_logger, pipeline_logger
+from metrics import pipeline_metrics
+from scheduler import DiskBudget
+
+class StorageBackend:
+    """업로드 대상 저장소 인터페이스"""
+    def upload(self, src_path: Path, object_name: str):
+        """src_path를 object_name으로 업로드. 반환 시점에는 저장소에 온전히 기록되어 있어야 함"""
+        raise NotImplementedError
+
+    def exists(self, object_name: str, size: int) -> bool:
+        """같은 크기의 객체가 이미 있으면 True (재실행 시 중복 업로드 방지)"""
+        raise NotImplementedError
+
+class LocalBackend(StorageBackend):
+    """
+    로컬 디렉토리를 버킷처럼 사용. {name}.partial에 청크 단위로 이어 쓰고 완료 시 rename
+    중단된 .partial이 남아 있으면 그 크기부터 이어서 업로드
+    """
+    def __init__(self, root: Path = UPLOAD_LOCAL_DIR, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def _path(self, object_name: str) -> Path:
+        return self.root / object_name
+
+    def upload(self, src_path: Path, object_name: str):
+        dst_path = self._path(object_name)
+        dst_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = dst_path.with_name(f"{dst_path.name}.partial")
+        size = src_path.stat().st_size
+        offset = partial_path.stat().st_size if partial_path.exists() else 0
+        if offset > size:
+            offset = 0
+        with open(src_path, "rb") as src, open(partial_path, "r+b" if offset else "wb") as dst:
+            src.seek(offset)
+            dst.seek(offset)
+            dst.truncate()
+            shutil.copyfileobj(src, dst, self.chunk_size)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if partial_path.stat().st_size != size:
+            raise IOError(f"{object_name}: uploaded size mismatch")
+        partial_path.replace(dst_path)
+
+    def exists(self, object_name: str, size: int) -> bool:
+        dst_path = self._path(object_name)
+        return dst_path.is_file() and dst_path.stat().st_size == size
+
+class GCSBackend(StorageBackend):
+    """
+    GCS 버킷 업로드. chunk_size를 지정하면 resumable upload 세션으로 청크 단위 전송/재시도
+    (crc32c 체크섬이 맞지 않으면 예외). google-cloud-storage는 GCS를 쓸 때만 import
+    """
+    def __init__(self, bucket_name: str = BUCKET_NAME, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        from google.cloud import storage  # 선택 의존성
+
+        self.client = storage.Client()
+        self.bucket = self.client.bucket(bucket_name)
+        # resumable upload 청크는 256KB의 배수여야 함
+        self.chunk_size = max(1, chunk_size // (256 * 1024)) * 256 * 1024
+
+    def upload(self, src_path: Path, object_name: str):
+        blob = self.bucket.blob(object_name, chunk_size=self.chunk_size)
+        blob.upload_from_filename(str(src_path), checksum="crc32c")
+
+    def exists(self, object_name: str, size: int) -> bool:
+        blob = self.bucket.get_blob(object_name)
+        return blob is not None and blob.size == size
+
+def get_backend(name: str = UPLOAD_BACKEND) -> StorageBackend:
+    if name == "gcs":
+        return GCSBackend()
+    if name == "local":
+        return LocalBackend()
+    raise ValueError(f"Unknown upload backend: {name}")
+
+def _upload_one(backend: StorageBackend,
+                src_path: Path,
+                object_name: str,
+                delete: bool,
+                retries: int,
+                backoff: float) -> str | None:
+    """파일 1개 업로드(+삭제). 실패 시 지수 backoff로 재시도하고 최종 에러 메시지 반환 (성공이면 None)"""
+    size = src_path.stat().st_size
+    for attempt in range(1, retries + 2):
+        try:
+            if backend.exists(object_name, size):
+                pipeline_logger.info(f"{object_name} already uploaded, skip")
+            else:
+                backend.upload(src_path, object_name)
+                pipeline_metrics.inc("bytes_written_total", size, stage="upload_files")
+            if delete:
+                src_path.unlink()
+            return None
+        except Exception as e:
+            pipeline_metrics.inc("errors_total", stage="upload_files")
+            if attempt > retries:
+                return str(e)
+            delay = backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            pipeline_logger.warning(f"{object_name} upload attempt {attempt}/{retries + 1} failed: {e} "
+                                    f"(retry in {delay:.1f}s)")
+            time.sleep(delay)
+
+@time_logger
+def upload_files(files: dict[Path, str],
+                 backend: StorageBackend | None = None,
+                 delete: bool = True,
+                 workers: int = UPLOAD_WORKERS,
+                 max_inflight_bytes: int = UPLOAD_MAX_INFLIGHT_BYTES,
+                 retries: int = UPLOAD_RETRIES,
+                 backoff: float = UPLOAD_BACKOFF_SECONDS) -> list[Path]:
+    """
+    {로컬 경로: 객체 이름}을 동시에 업로드하고 실패한 파일 리스트 반환
+    동시에 업로드 중인 파일 크기 합은 max_inflight_bytes 이내 (단일 파일이 더 크면 단독으로 업로드)
+    delete=True이면 업로드가 끝난 파일은 다른 파일을 기다리지 않고 바로 삭제
+    """
+    backend = backend or get_backend()
+    budget = DiskBudget(max_inflight_bytes)
+    failed = []
+
+    def task(src_path: Path, object_name: str, size: int) -> str | None:
+        try:
+            return _upload_one(backend, src_path, object_name, delete, retries, backoff)
+        finally:
+            budget.release(size)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {}
+        for src_path, object_name in files.items():
+            size = src_path.stat().st_size
+            budget.acquire(size)  # in-flight 예산이 빌 때까지 다음 파일 제출을 미룬다
+            futures[pool.submit(task, src_path, object_name, size)] = (src_path, object_name)
+        for future, (src_path, object_name) in futures.items():
+            error = future.result()
+            if error is not None:
+                pipeline_logger.error(f"{src_path.name} upload error: {error}")
+                failed.append(src_path)
+
+    pipeline_logger.info(f"{len(files) - len(failed)}/{len(files)} files uploaded "
+                         f"(workers={workers}, delete={delete})")
+    return failed
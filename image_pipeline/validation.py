@@ -0,0 +1,336 @@
+"""
+변환 결과 무결성 검증
+- 완전성: 원본 멤버마다 spec별 결과가 정확히 1개 (누락/중복/원본 없는 결과)
+- 디코딩: 결과가 디코딩되고 target_size x target_size x 3 인지
+- 프레임 통계(배치 NumPy): 거의 단색(빈 이미지) / 아래쪽이 평탄하게 채워진 프레임(잘린 원본, 손상된 인코딩)
+실패 이미지는 캐시 없이 원본에서 한 번 더 변환해 재검증하고, 그래도 실패하면 실패 목록(JSONL)에 남긴다.
+결과에서 빼는 것은 확실한 실패(누락/디코딩 실패/크기 불일치, 원본 자체가 잘림)뿐이고,
+프레임 통계는 단색 배경 사진도 걸리는 추정이므로 원본이 온전하면 경고(hard=False)로만 남긴다.
+"""
+import json
+import zipfile
+from collections import Counter
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+import cv2
+import numpy as np
+from config import (
+    ARCHIVE_DST_DIR,
+    TRANSFORM_DST_ROOT,
+    OUTPUT_SPECS,
+    OutputSpec,
+    FAST_DECODE,
+    VALIDATION_DIR,
+    VALIDATION_WORKERS,
+    VALIDATION_CHUNKSIZE,
+    VALIDATION_EXECUTOR,
+    VALIDATION_MIN_STD,
+    VALIDATION_FLAT_ROW_STD,
+    VALIDATION_MAX_FLAT_FRACTION,
+    TRANSFORM_MEMORY_BUDGET_BYTES
+)
+from logger import time_logger, pipeline_logger
+from metrics import pipeline_metrics
+import preprocessor
+import shards
+
+class ValidationFailure(NamedTuple):
+    member: str  # 원본 멤버명 (원본이 없는 결과는 결과 멤버명)
+    spec: str    # OutputSpec.name
+    reason: str
+    hard: bool = True  # False: 프레임 통계 경고 (결과에 남김)
+
+def output_member(member: str, spec: OutputSpec) -> str:
+    """원본 멤버명 -> spec 결과 멤버명 (닭강정/a.jpg -> 닭강정/a.webp)"""
+    return Path(member).with_suffix(f".{spec.extension}").as_posix()
+
+# ====================================================
+# --- 프레임 검사 ---
+# ====================================================
+def frame_stats(frames: np.ndarray, flat_row_std: float = VALIDATION_FLAT_ROW_STD) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (N, H, W, C) 프레임 배치의 이미지별 (전체 표준편차, 맨 아래부터 연속된 평탄 행 비율)
+    잘린 원본/손상된 인코딩은 디코딩은 되더라도 아래쪽이 단색으로 채워진다.
+    """
+    n, height = frames.shape[:2]
+    pixels = frames.reshape(n, -1)
+    std = pixels.std(axis=1, dtype=np.float32)
+    row_std = frames.reshape(n, height, -1).std(axis=2, dtype=np.float32)
+    flat = row_std < flat_row_std
+    trailing = np.cumprod(flat[:, ::-1], axis=1).sum(axis=1)
+    return std, trailing / height
+
+def source_truncated(data: bytes) -> bool:
+    """원본 bytes 자체가 잘렸는지 (JPEG EOI/PNG IEND 마커 없음, 그 외 형식은 디코딩 실패)"""
+    body = data.rstrip(b"\x00")
+    if body.startswith(b"\xff\xd8"):
+        # 엔트로피 코딩 구간에는 FFD9가 나오지 않으므로 끝부분에 없으면 잘린 파일 (뒤에 붙은 메타데이터는 허용)
+        return b"\xff\xd9" not in body[-4096:]
+    if body.startswith(b"\x89PNG"):
+        return b"IEND" not in body[-12:]
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) is None
+
+def _validate_chunk(items: list[tuple[str, str, bytes]],
+                    target_size: int,
+                    spec_name: str,
+                    min_std: float,
+                    max_flat_fraction: float) -> list[ValidationFailure]:
+    """워커에서 실행되는 청크 단위 검사. (원본 멤버명, 결과 멤버명, bytes) -> 실패 리스트"""
+    failures, frames, decoded = [], [], []
+    for member, _, data in items:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            failures.append(ValidationFailure(member, spec_name, "decode failed"))
+        elif img.shape != (target_size, target_size, 3):
+            failures.append(ValidationFailure(member, spec_name, f"unexpected shape {img.shape}"))
+        else:
+            frames.append(img)
+            decoded.append(member)
+    if frames:
+        std, flat_fraction = frame_stats(np.stack(frames))
+        for member, image_std, image_flat in zip(decoded, std, flat_fraction):
+            if image_std < min_std:
+                failures.append(ValidationFailure(member, spec_name, f"near-blank (std={image_std:.2f})", False))
+            elif image_flat > max_flat_fraction:
+                failures.append(ValidationFailure(member, spec_name, f"flat bottom {image_flat:.0%} (truncated/corrupt)",
+                                                  False))
+    return failures
+
+def _check_completeness(sources: list[str],
+                        names: Counter,
+                        spec: OutputSpec) -> list[ValidationFailure]:
+    """원본 멤버마다 결과가 정확히 1개인지 확인"""
+    failures = []
+    expected = {}
+    for member in sources:
+        expected[output_member(member, spec)] = member
+        count = names[output_member(member, spec)]
+        if count == 0:
+            failures.append(ValidationFailure(member, spec.name, "missing output"))
+        elif count > 1:
+            failures.append(ValidationFailure(member, spec.name, f"duplicate output ({count})"))
+    for name in names.keys() - expected.keys():
+        failures.append(ValidationFailure(name, spec.name, "orphan output"))
+    return failures
+
+@time_logger
+def validate_outputs(file_key: str,
+                     sources: list[str],
+                     outputs: dict[OutputSpec, Iterable[tuple[str, bytes]]],
+                     workers: int = VALIDATION_WORKERS,
+                     chunksize: int = VALIDATION_CHUNKSIZE,
+                     executor: str = VALIDATION_EXECUTOR,
+                     min_std: float = VALIDATION_MIN_STD,
+                     max_flat_fraction: float = VALIDATION_MAX_FLAT_FRACTION,
+                     max_inflight_bytes: int = TRANSFORM_MEMORY_BUDGET_BYTES) -> list[ValidationFailure]:
+    """
+    원본 멤버 목록과 spec별 (결과 멤버명, bytes)를 대조하고 결과를 청크 단위로 병렬 디코딩/검사해서 실패 리스트 반환
+    읽었지만 검사가 끝나지 않은 결과 bytes + 디코딩 프레임의 합은 max_inflight_bytes 이내
+    """
+    failures = []
+    pool = preprocessor._get_executor(executor, workers)
+    with pool or nullcontext():
+        for spec, members in outputs.items():
+            names = Counter()
+            sources_by_output = {output_member(member, spec): member for member in sources}
+
+            def chunks() -> Iterator[list[tuple[str, str, bytes]]]:
+                chunk = []
+                for name, data in members:
+                    names[name] += 1
+                    if name not in sources_by_output:
+                        continue
+                    chunk.append((sources_by_output[name], name, data))
+                    if len(chunk) == chunksize:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+
+            task = partial(_validate_chunk,
+                           target_size=spec.target_size,
+                           spec_name=spec.name,
+                           min_std=min_std,
+                           max_flat_fraction=max_flat_fraction)
+            frame_bytes = spec.target_size ** 2 * 3
+            cost = lambda chunk: sum(len(data) + frame_bytes for _, _, data in chunk)
+            for chunk_failures in preprocessor._bounded_results(pool, task, chunks(), cost, max_inflight_bytes,
+                                                                stage="validate"):
+                failures += chunk_failures
+            failures += _check_completeness(sources, names, spec)
+            pipeline_metrics.inc("images_total", sum(names.values()), stage="validate_outputs")
+
+    pipeline_metrics.inc("errors_total", len(failures), stage="validate_outputs")
+    pipeline_logger.info(f"[{file_key}] {len(sources)} images validated (specs={[spec.name for spec in outputs]}, "
+                         f"workers={workers}, failures={len(failures)})")
+    for failure in failures:
+        pipeline_logger.warning(f"[{file_key}] {failure.spec}/{failure.member} validation "
+                                f"{'failed' if failure.hard else 'warning'}: {failure.reason}")
+    return failures
+
+# ====================================================
+# --- 결과 읽기/교체 (disk: spec 디렉토리, streaming: 결과 zip) ---
+# ====================================================
+def dir_outputs(specs: list[OutputSpec] = OUTPUT_SPECS,
+                dst_root: Path = TRANSFORM_DST_ROOT,
+                members: list[str] | None = None) -> dict[OutputSpec, Iterator[tuple[str, bytes]]]:
+    """disk 모드 spec 디렉토리의 결과. members가 주어지면 해당 원본의 결과만 (없는 파일은 건너뜀)"""
+    def read(spec: OutputSpec) -> Iterator[tuple[str, bytes]]:
+        root = preprocessor.spec_dir(spec, dst_root)
+        if members is None:
+            yield from shards.iter_dir_members(root)
+            return
+        for member in members:
+            path = root / output_member(member, spec)
+            if path.is_file():
+                yield output_member(member, spec), path.read_bytes()
+    return {spec: read(spec) for spec in specs}
+
+def archive_outputs(file_name: str,
+                    specs: list[OutputSpec] = OUTPUT_SPECS,
+                    dst_root: Path = ARCHIVE_DST_DIR,
+                    members: list[str] | None = None) -> dict[OutputSpec, Iterator[tuple[str, bytes]]]:
+    """streaming 모드 결과 zip(샤드 포함)의 결과. members가 주어지면 해당 원본의 결과만"""
+    def read(spec: OutputSpec) -> Iterator[tuple[str, bytes]]:
+        zip_paths = preprocessor.archive_paths(file_name, dst_root, spec.target_size, spec.extension)
+        wanted = None if members is None else {output_member(member, spec) for member in members}
+        for zip_path in zip_paths:
+            with zipfile.ZipFile(zip_path, 'r') as z:
+                for info in z.infolist():
+                    if not info.is_dir() and (wanted is None or info.filename in wanted):
+                        yield info.filename, z.read(info)
+    return {spec: read(spec) for spec in specs}
+
+def replace_dir_outputs(replacements: dict[OutputSpec, dict[str, bytes | None]],
+                        dst_root: Path = TRANSFORM_DST_ROOT):
+    """spec 디렉토리의 결과 파일을 교체(bytes)하거나 삭제(None)"""
+    for spec, spec_replacements in replacements.items():
+        root = preprocessor.spec_dir(spec, dst_root)
+        for name, data in spec_replacements.items():
+            path = root / name
+            if data is None:
+                path.unlink(missing_ok=True)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+
+def replace_archive_outputs(file_name: str,
+                            replacements: dict[OutputSpec, dict[str, bytes | None]],
+                            dst_root: Path = ARCHIVE_DST_DIR):
+    """결과 zip의 멤버를 교체(bytes)하거나 삭제(None). 영향받는 zip만 raw 복사로 다시 씀"""
+    for spec, spec_replacements in replacements.items():
+        zip_paths = preprocessor.archive_paths(file_name, dst_root, spec.target_size, spec.extension)
+        if zip_paths and spec_replacements:
+            preprocessor.replace_archive_members(zip_paths, spec_replacements)
+
+def retransform_members(src_path: Path,
+                        members: list[str],
+                        specs: list[OutputSpec] = OUTPUT_SPECS,
+                        fast_decode: bool = FAST_DECODE) -> dict[OutputSpec, dict[str, bytes | None]]:
+    """
+    원본 zip에서 members를 캐시 없이 다시 변환해 spec별 {결과 멤버명: bytes} 반환 (실패하면 None: 결과에서 삭제)
+    캐시에 손상된 결과가 들어 있을 수 있으므로 TransformCache를 쓰지 않는다.
+    """
+    replacements = {spec: {} for spec in specs}
+    with zipfile.ZipFile(src_path, 'r') as z:
+        infos = {preprocessor._fix_filename(info): info for info in z.infolist() if not info.is_dir()}
+        for member in members:
+            outputs = [None] * len(specs)
+            if member in infos:
+                try:
+                    outputs = preprocessor.transform_variants(z.read(infos[member]), specs, fast_decode)
+                except Exception as e:
+                    pipeline_logger.error(f"{member} re-transforming error: {e}")
+            for spec, output in zip(specs, outputs):
+                replacements[spec][output_member(member, spec)] = output
+    return replacements
+
+def truncated_sources(src_path: Path, members: Iterable[str]) -> set[str]:
+    """원본 zip에서 members 중 원본 bytes 자체가 잘린(또는 디코딩되지 않는) 멤버"""
+    members = set(members)
+    if not members:
+        return set()
+    with zipfile.ZipFile(src_path, 'r') as z:
+        return {member for info in z.infolist()
+                if (member := preprocessor._fix_filename(info)) in members and source_truncated(z.read(info))}
+
+def write_failure_manifest(file_name: str,
+                           failures: list[ValidationFailure],
+                           dst_root: Path = VALIDATION_DIR) -> Path:
+    """실패 목록을 {dst_root}/{stem}.failures.jsonl로 기록 (실패가 없으면 이전 목록 삭제)"""
+    manifest_path = dst_root / f"{Path(file_name).stem}.failures.jsonl"
+    if not failures:
+        manifest_path.unlink(missing_ok=True)
+        return manifest_path
+    dst_root.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        for failure in failures:
+            f.write(json.dumps(failure._asdict(), ensure_ascii=False) + "\n")
+    return manifest_path
+
+# ====================================================
+# --- 검증 스테이지 ---
+# ====================================================
+@time_logger
+def validate_and_requeue(file_key: str,
+                         file_name: str,
+                         src_path: Path,
+                         streaming: bool,
+                         specs: list[OutputSpec] = OUTPUT_SPECS,
+                         transform_root: Path = TRANSFORM_DST_ROOT,
+                         archive_root: Path = ARCHIVE_DST_DIR,
+                         manifest_root: Path = VALIDATION_DIR,
+                         fast_decode: bool = FAST_DECODE,
+                         state=None,
+                         **kwargs) -> list[ValidationFailure]:
+    """
+    전체 결과 검증 -> 실패 원본을 다시 변환해 교체 -> 재검증 -> 그래도 실패한 결과 삭제 + 실패 목록 기록
+    프레임 통계 경고는 원본이 잘린 경우에만 실패로 올려 삭제하고, 원본이 온전하면 경고(hard=False)로 남긴다.
+    state(PipelineState)가 주어지면 삭제된 이미지의 완료 기록을 지워 다음 변환 때 다시 처리되도록 한다.
+    kwargs는 validate_outputs로 전달 (workers, executor 등)
+    """
+    def outputs(members: list[str] | None = None):
+        if streaming:
+            return archive_outputs(file_name, specs, archive_root, members)
+        return dir_outputs(specs, transform_root, members)
+
+    def replace(replacements: dict[OutputSpec, dict[str, bytes | None]]):
+        if streaming:
+            replace_archive_outputs(file_name, replacements, archive_root)
+        else:
+            replace_dir_outputs(replacements, transform_root)
+
+    sources = list(preprocessor.member_digests(src_path))
+    failures = validate_outputs(file_key, sources, outputs(), **kwargs)
+    source_set = set(sources)
+    orphans = [failure for failure in failures if failure.member not in source_set]
+    retry = sorted({failure.member for failure in failures if failure.member in source_set})
+
+    remaining = []
+    if retry:
+        pipeline_logger.info(f"[{file_key}] re-transforming {len(retry)} failed images without cache")
+        replace(retransform_members(src_path, retry, specs, fast_decode))
+        remaining = validate_outputs(file_key, retry, outputs(retry), **kwargs)
+        truncated = truncated_sources(src_path, {failure.member for failure in remaining if not failure.hard})
+        remaining = [failure._replace(reason=f"{failure.reason}, truncated source", hard=True)
+                     if failure.member in truncated else failure for failure in remaining]
+        # 재변환 후에도 확실히 실패한 이미지는 모든 spec 결과에서 빼서 학습 데이터에 섞이지 않도록
+        still_failing = sorted({failure.member for failure in remaining if failure.hard})
+        replace({spec: {output_member(member, spec): None for member in still_failing} for spec in specs})
+        if state is not None and still_failing:
+            state.unmark_images(file_key, still_failing)
+    if orphans:
+        by_spec = {spec.name: spec for spec in specs}
+        removals = {spec: {} for spec in specs}
+        for failure in orphans:
+            removals[by_spec[failure.spec]][failure.member] = None
+        replace(removals)
+
+    failures = orphans + remaining
+    write_failure_manifest(file_name, failures, manifest_root)
+    pipeline_logger.info(f"[{file_key}] validation done: {len(retry)} re-transformed, "
+                         f"{sum(failure.hard for failure in failures)} failures removed, "
+                         f"{sum(not failure.hard for failure in failures)} warnings kept")
+    return failures
@@ -0,0 +1,271 @@
+"""
+학습용 CPU 데이터 로더: 전처리 파이프라인 결과(결과 zip / packed shard)를 압축 해제 없이 바로 읽는다.
+- 카탈로그: 소스별 (소스 번호, 레코드 번호, 멤버명)을 중앙 디렉토리/인덱스 파일만 읽어서 구성
+- 에폭마다 seed + epoch 기준 전역 셔플, rank/world_size로 학습 프로세스 간 분할 (rank마다 같은 배치 수)
+- 디코딩: 프로세스 풀 워커가 공유 메모리의 미리 할당된 배치 버퍼(slot)에 바로 기록 (배치마다 새 배열 할당/전송 없음)
+- prefetch개 배치를 소비자보다 앞서 디코딩 (slot = prefetch + 1개를 돌려 씀)
+
+    loader = DataLoader(discover_sources(), batch_size=64, label_index=labels.load_label_index())
+    for epoch in range(epochs):
+        loader.set_epoch(epoch)
+        for batch in loader:
+            train_step(batch.images, batch.labels)  # images는 다음 배치를 요청하면 덮어써짐 (보관하려면 copy)
+"""
+# --- image_pipeline 모듈 경로 ---
+# image_pipeline의 평평한 모듈(config, preprocessor ...)을 쓴다. `uv pip install -e image_pipeline`으로 설치되어 있으면
+# 설치본을 쓰고, 저장소에서 바로 실행할 때만 image_pipeline 디렉토리를 경로 맨 앞에 추가 (다른 import보다 먼저)
+import importlib.util
+import sys
+from pathlib import Path
+if importlib.util.find_spec("preprocessor") is None:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "image_pipeline"))
+
+import math
+import multiprocessing
+import os
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, NamedTuple
+import cv2
+import numpy as np
+import preprocessor
+import shards
+from config import ARCHIVE_DST_DIR, TARGET_SIZE, TRANSFORM_EXTENSION, WORKER_START_METHOD
+from labels import LabelIndex
+from logger import pipeline_logger, worker_log_queue
+from metrics import pipeline_metrics
+
+# ======================================================================
+# --- 로더 설정 ---
+# ======================================================================
+LOADER_BATCH_SIZE = 64
+LOADER_WORKERS = os.cpu_count() or 1  # 1이면 메인 프로세스에서 순차 디코딩 (prefetch 없음)
+LOADER_PREFETCH = 2                   # 소비자보다 앞서 디코딩해 두는 배치 수
+
+_ZIP_SHARD_SUFFIX = re.compile(r"-\d{5}$")
+
+class Batch(NamedTuple):
+    images: np.ndarray   # (n, H, W, 3) BGR uint8, 공유 버퍼의 view
+    labels: np.ndarray   # (n,) int32, 라벨이 없거나 디코딩에 실패하면 -1
+    indices: np.ndarray  # (n,) 카탈로그 레코드 번호 (DataLoader.names[i]로 멤버명 확인)
+
+def discover_sources(root: Path = ARCHIVE_DST_DIR,
+                     target_size: int = TARGET_SIZE,
+                     extension: str = TRANSFORM_EXTENSION) -> list[Path]:
+    """
+    root의 결과물 중 target_size/extension에 맞는 소스 목록
+    같은 아카이브에 packed shard(.idx.npz)가 있으면 결과 zip 대신 shard를 쓴다 (mmap으로 zero copy 읽기)
+    """
+    prefix = f"{extension}_{target_size}_"
+    indexes = sorted(root.glob(f"{prefix}*.idx.npz"))
+    stems = {path.name.removesuffix(".idx.npz") for path in indexes}
+    zips = [path for path in sorted(root.glob(f"{prefix}*.zip"))
+            if _ZIP_SHARD_SUFFIX.sub("", path.stem) not in stems]
+    return indexes + zips
+
+def _list_members(source: Path) -> list[str]:
+    """소스의 레코드 순서대로 멤버명 (zip은 디렉토리를 제외한 infolist 순서)"""
+    if source.name.endswith(".idx.npz"):
+        with np.load(source) as index:
+            return [str(name) for name in index["names"]]
+    with zipfile.ZipFile(source) as z:
+        return [info.filename for info in z.infolist() if not info.is_dir()]
+
+# ====================================================
+# --- 디코딩 (워커) ---
+# ====================================================
+class _Decoder:
+    """공유 배치 버퍼와 소스 핸들(ShardReader/ZipFile)을 가진 디코더. 워커 프로세스마다 하나"""
+    def __init__(self, buffer, shape: tuple[int, ...], sources: list[Path]):
+        self.images = np.frombuffer(buffer, dtype=np.uint8).reshape(shape)
+        self.sources = sources
+        self.readers = {}
+
+    def _reader(self, source_id: int):
+        if source_id not in self.readers:
+            source = self.sources[source_id]
+            if source.name.endswith(".idx.npz"):
+                self.readers[source_id] = shards.ShardReader(source)
+            else:
+                z = zipfile.ZipFile(source)
+                self.readers[source_id] = (z, [info for info in z.infolist() if not info.is_dir()])
+        return self.readers[source_id]
+
+    def read(self, source_id: int, item: int):
+        reader = self._reader(source_id)
+        if isinstance(reader, shards.ShardReader):
+            return reader[item]
+        z, infos = reader
+        return z.read(infos[item])
+
+    def decode(self, slot: int, start: int, records: list[tuple[int, int]]) -> list[int]:
+        """records를 slot 버퍼의 start행부터 디코딩해 기록하고 실패한 행 번호 리스트 반환"""
+        height, width = self.images.shape[2:4]
+        failed = []
+        for row, (source_id, item) in enumerate(records, start):
+            try:
+                img = cv2.imdecode(np.frombuffer(self.read(source_id, item), dtype=np.uint8), cv2.IMREAD_COLOR)
+                if img is None:
+                    raise ValueError("Image decode failed")
+                if img.shape[:2] != (height, width):
+                    img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+                self.images[slot, row] = img
+            except Exception as e:
+                pipeline_logger.debug(f"{self.sources[source_id].name}[{item}] decode failed: {e}")
+                self.images[slot, row] = 0
+                failed.append(row)
+        return failed
+
+    def close(self):
+        for reader in self.readers.values():
+            if isinstance(reader, shards.ShardReader):
+                reader.close()
+            else:
+                reader[0].close()
+        self.readers.clear()
+
+_decoder: _Decoder | None = None
+
+def _init_loader_worker(buffer, shape: tuple[int, ...], sources: list[Path], log_queue=None):
+    global _decoder
+    preprocessor._init_worker(log_queue)
+    _decoder = _Decoder(buffer, shape, sources)
+
+def _decode_task(slot: int, start: int, records: list[tuple[int, int]]) -> list[int]:
+    return _decoder.decode(slot, start, records)
+
+# ====================================================
+# --- 로더 ---
+# ====================================================
+class DataLoader:
+    """
+    결과 zip / packed shard 소스들을 셔플된 배치로 순회하는 로더
+    label_index(labels.LabelIndex)가 있으면 라벨 JSON 기준 class id, 없으면 카테고리 디렉토리명 정렬 순서를 라벨로 쓴다.
+    """
+    def __init__(self,
+                 sources: list[Path],
+                 batch_size: int = LOADER_BATCH_SIZE,
+                 image_size: int = TARGET_SIZE,
+                 shuffle: bool = True,
+                 seed: int = 0,
+                 rank: int = 0,
+                 world_size: int = 1,
+                 drop_last: bool = False,
+                 workers: int = LOADER_WORKERS,
+                 prefetch: int = LOADER_PREFETCH,
+                 label_index: LabelIndex | None = None):
+        if not 0 <= rank < world_size:
+            raise ValueError(f"rank {rank} is out of range for world_size {world_size}")
+        self.sources = [Path(source) for source in sources]
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.drop_last = drop_last
+        self.workers = workers
+        self.epoch = 0
+
+        members = [_list_members(source) for source in self.sources]
+        self.source_ids = np.repeat(np.arange(len(members), dtype=np.int32), [len(names) for names in members])
+        self.items = np.concatenate([np.arange(len(names)) for names in members] or [[]]).astype(np.int64)
+        self.names = np.array([name for names in members for name in names], dtype=str)
+        if label_index is not None:
+            self.classes = label_index.classes
+            self.labels = label_index.join(self.names)
+        else:
+            categories = np.array([shards.member_label(name) for name in self.names], dtype=str)
+            self.classes, self.labels = np.unique(categories, return_inverse=True)
+            self.labels = self.labels.astype(np.int32)
+
+        # 배치 버퍼: 소비 중인 배치 1개 + 앞서 디코딩 중인 prefetch개
+        self.slots = max(1, prefetch + 1) if workers > 1 else 1
+        shape = (self.slots, batch_size, image_size, image_size, 3)
+        context = multiprocessing.get_context(WORKER_START_METHOD)
+        self._buffer = context.RawArray("B", math.prod(shape))
+        if workers > 1:
+            self._decoder = None
+            self._pool = ProcessPoolExecutor(max_workers=workers,
+                                             mp_context=context,
+                                             initializer=_init_loader_worker,
+                                             initargs=(self._buffer, shape, self.sources, worker_log_queue()))
+        else:
+            self._decoder = _Decoder(self._buffer, shape, self.sources)
+            self._pool = None
+        self._images = np.frombuffer(self._buffer, dtype=np.uint8).reshape(shape)
+        pipeline_logger.info(f"DataLoader: {len(self.names)} images from {len(self.sources)} sources, "
+                             f"{len(self)} batches/epoch (rank {rank}/{world_size}, workers={workers})")
+
+    def set_epoch(self, epoch: int):
+        """셔플 순서를 바꿀 에폭 번호 (모든 rank가 같은 값을 써야 분할이 겹치지 않음)"""
+        self.epoch = epoch
+
+    def _rank_order(self) -> np.ndarray:
+        """이번 에폭에서 이 rank가 읽을 레코드 번호 (전 rank가 같은 순열을 만든 뒤 rank::world_size로 분할)"""
+        order = np.arange(len(self.names))
+        if self.shuffle:
+            order = np.random.default_rng((self.seed, self.epoch)).permutation(order)
+        per_rank = len(order) // self.world_size
+        return order[:per_rank * self.world_size][self.rank::self.world_size]
+
+    def __len__(self) -> int:
+        per_rank = len(self.names) // self.world_size
+        return per_rank // self.batch_size if self.drop_last else math.ceil(per_rank / self.batch_size)
+
+    def _submit(self, slot: int, indices: np.ndarray) -> list:
+        """배치를 워커 수만큼 나눠 제출 (순차 모드면 바로 디코딩한 결과)"""
+        records = list(zip(self.source_ids[indices].tolist(), self.items[indices].tolist()))
+        if self._pool is None:
+            return [self._decoder.decode(slot, 0, records)]
+        step = math.ceil(len(records) / self.workers)
+        return [self._pool.submit(_decode_task, slot, start, records[start:start + step])
+                for start in range(0, len(records), step)]
+
+    def __iter__(self) -> Iterator[Batch]:
+        order = self._rank_order()
+        batches = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+        if self.drop_last and batches and len(batches[-1]) < self.batch_size:
+            batches.pop()
+
+        window = deque()
+        try:
+            for i, indices in enumerate(batches):
+                window.append((i % self.slots, indices, self._submit(i % self.slots, indices)))
+                # slot 하나는 소비자가 들고 있으므로 slots - 1개(= prefetch)까지만 앞서 제출
+                if len(window) < self.slots and i + 1 < len(batches):
+                    continue
+                yield self._collect(*window.popleft())
+            while window:
+                yield self._collect(*window.popleft())
+        finally:
+            # 중간에 멈춘 경우에도 제출된 디코딩이 끝난 뒤에 slot을 다시 쓰도록 대기
+            for _, _, futures in window:
+                for future in futures:
+                    if not isinstance(future, list):
+                        future.result()
+
+    def _collect(self, slot: int, indices: np.ndarray, futures: list) -> Batch:
+        labels = self.labels[indices].copy()
+        failed = 0
+        for future in futures:
+            rows = future if isinstance(future, list) else future.result()
+            labels[rows] = -1
+            failed += len(rows)
+        pipeline_metrics.inc("images_total", len(indices), stage="data_loader")
+        if failed:
+            pipeline_metrics.inc("errors_total", failed, stage="data_loader")
+        return Batch(self._images[slot, :len(indices)], labels, indices)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._decoder is not None:
+            self._decoder.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,88 @@
+"""
+학습 데이터 로더 처리량 벤치마크 (model_training/data_loader.py)
+합성 원본 -> 결과 zip / packed shard로 변환해 두고, 소스 종류 x 워커 수별 1 에폭 images/sec를 기록한다.
+비교 기준(naive): 결과 zip을 모두 압축 해제한 뒤 파일을 하나씩 cv2.imread (ImageFolder 방식)
+"""
+import json
+import os
+import platform
+import shutil
+from datetime import datetime
+from pathlib import Path
+import cv2
+import pytest
+import data_loader
+import preprocessor
+import shards
+from config import OutputSpec
+from synthetic import make_synthetic_archive
+
+BENCHMARK_DIR = Path(__file__).parent / "data" / "benchmarks"
+BENCHMARK_OUTPUT_JSON = Path(__file__).parent / "results" / f"benchmark_data_loader_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+BENCHMARK_IMAGE_COUNT = int(os.getenv("BENCHMARK_LOADER_IMAGE_COUNT", "256"))
+BENCHMARK_IMAGE_SIZE = 224
+BENCHMARK_BATCH_SIZE = 32
+BENCHMARK_WORKERS = sorted({int(v) for v in os.getenv("BENCHMARK_WORKERS", f"1,2,4,{os.cpu_count() or 1}").split(",")})
+BENCHMARK_SEED = 302
+
+RESULTS = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_report():
+	yield
+	if not RESULTS:
+		return
+	report = {
+		"created_at": datetime.now().isoformat(timespec="seconds"),
+		"machine": {"platform": platform.platform(), "python": platform.python_version(),
+					"cpu_count": os.cpu_count(), "opencv": cv2.__version__},
+		"settings": {"image_count": BENCHMARK_IMAGE_COUNT, "image_size": BENCHMARK_IMAGE_SIZE,
+					 "batch_size": BENCHMARK_BATCH_SIZE, "workers": BENCHMARK_WORKERS},
+		"results": RESULTS,
+	}
+	BENCHMARK_OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
+	BENCHMARK_OUTPUT_JSON.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def record(benchmark, case: str, images: int):
+	median = benchmark.stats.stats.median
+	RESULTS[case] = {"median_seconds": round(median, 6), "images_per_sec": round(images / median, 3),
+					 **benchmark.extra_info}
+
+@pytest.fixture(scope="module")
+def archive_root(tmp_path_factory) -> Path:
+	"""결과 zip(webp_224_loader.zip)과 같은 내용의 packed shard를 각각 다른 디렉토리에 준비"""
+	src_path = make_synthetic_archive(BENCHMARK_DIR / "synthetic" / f"synthetic_{BENCHMARK_IMAGE_COUNT}_1024x768.zip",
+									  BENCHMARK_IMAGE_COUNT, (1024, 768), seed=BENCHMARK_SEED)
+	root = tmp_path_factory.mktemp("loader")
+	preprocessor.transform_archive("loader", src_path, "loader.zip", dst_root=root / "zip",
+								   specs=[OutputSpec(BENCHMARK_IMAGE_SIZE, "webp", 90)])
+	zip_path = preprocessor.archive_path("loader.zip", root / "zip", BENCHMARK_IMAGE_SIZE, "webp")
+	(root / "shards").mkdir()
+	shards.write_shards("loader.zip", shards.iter_zip_members([zip_path]), root / "shards", BENCHMARK_IMAGE_SIZE, "webp")
+	return root
+
+def run_epoch(loader: data_loader.DataLoader) -> int:
+	return sum(len(batch.indices) for batch in loader)
+
+@pytest.mark.parametrize("source", ["zip", "shards"])
+@pytest.mark.parametrize("workers", BENCHMARK_WORKERS)
+def test_data_loader_epoch(benchmark, request, archive_root, source, workers):
+	paths = data_loader.discover_sources(archive_root / source, BENCHMARK_IMAGE_SIZE, "webp")
+	benchmark.extra_info.update(source=source, workers=workers)
+	with data_loader.DataLoader(paths, batch_size=BENCHMARK_BATCH_SIZE, image_size=BENCHMARK_IMAGE_SIZE,
+								workers=workers) as loader:
+		images = benchmark.pedantic(run_epoch, args=(loader,), rounds=3, warmup_rounds=1)
+	assert images == BENCHMARK_IMAGE_COUNT
+	record(benchmark, request.node.name, images)
+
+def naive_epoch(zip_path: Path, extract_dir: Path) -> int:
+	"""압축 해제 후 파일 단위로 읽기 (비교 기준)"""
+	shutil.rmtree(extract_dir, ignore_errors=True)
+	shutil.unpack_archive(zip_path, extract_dir)
+	return sum(cv2.imread(str(file)) is not None for file in sorted(extract_dir.rglob("*.webp")))
+
+def test_naive_extract_then_read(benchmark, request, archive_root, tmp_path):
+	zip_path = preprocessor.archive_path("loader.zip", archive_root / "zip", BENCHMARK_IMAGE_SIZE, "webp")
+	images = benchmark.pedantic(naive_epoch, args=(zip_path, tmp_path / "extracted"), rounds=3, warmup_rounds=1)
+	assert images == BENCHMARK_IMAGE_COUNT
+	record(benchmark, request.node.name, images)
@@ -1,78 +1,305 @@
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent / "image_pipeline"))
-import argparse
-import csv
 import config
 import preprocessor
-import zipfile
+import shards
 import shutil
-import itertools
-import subprocess
+import json
+import multiprocessing
+import os
+import platform
+import pytest
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from logger import worker_log_queue
+from synthetic import make_synthetic_archive, make_food_jpeg
 # 경로 설정
 # 현재 파일 기준으로 상대 경로 고정
 BENCHMARK_DIR = Path(__file__).parent / "data" / "benchmarks"
-BENCHMARK_ZIP_PATH     = BENCHMARK_DIR / "sample_val_302.zip"
-BENCHMARK_EXTRACT_DST_DIR = BENCHMARK_DIR / "extracted"
-BENCHMARK_TRANSFORM_DST_DIR = BENCHMARK_DIR / "transformed"
-BENCHMARK_ARCHIVE_DST_DIR = BENCHMARK_DIR / "archive"
-BENCHMARK_TMP_DIR = BENCHMARK_DIR / "tmp"
+BENCHMARK_SYNTHETIC_DIR = BENCHMARK_DIR / "synthetic" # 합성 아카이브 캐시 (같은 설정이면 재사용)
+BENCHMARK_BASELINE_JSON = BENCHMARK_DIR / "baseline.json"
 BENCHMARK_OUTPUT_JSON = Path(__file__).parent / "results" / f"benchmark_output_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+# 합성 데이터 설정 (환경변수로 조절: BENCHMARK_IMAGE_COUNT=64 BENCHMARK_IMAGE_SIZES=1024x768,4000x3000)
+BENCHMARK_IMAGE_COUNT = int(os.getenv("BENCHMARK_IMAGE_COUNT", "16"))
+BENCHMARK_IMAGE_SIZES = [tuple(int(v) for v in size.split("x"))
+						 for size in os.getenv("BENCHMARK_IMAGE_SIZES", "1024x768,2560x1920").split(",")]
+BENCHMARK_SEED = 302
 # 이미지 설정
 BENCHMARK_TARGET_SIZE = 384
 BENCHMARK_EXTENSION = "webp"
 BENCHMARK_QUALITY = 90
+BENCHMARK_QUALITIES = [75, BENCHMARK_QUALITY]
+BENCHMARK_SPEC = config.OutputSpec(BENCHMARK_TARGET_SIZE, BENCHMARK_EXTENSION, BENCHMARK_QUALITY)
+# 다중 출력 (한 번 디코딩 -> 384/224 WebP + JPEG)
+BENCHMARK_MULTI_SPECS = [BENCHMARK_SPEC,
+						 config.OutputSpec(224, "webp", BENCHMARK_QUALITY),
+						 config.OutputSpec(BENCHMARK_TARGET_SIZE, "jpg", 95)]
+# 병렬 처리 설정 (워커 수 스윕)
+BENCHMARK_WORKERS = sorted({int(v) for v in os.getenv("BENCHMARK_WORKERS", f"1,2,4,{os.cpu_count() or 1}").split(",")})
+# 결과 적재 모드 (compression, shard_size) + packed shard
+BENCHMARK_ARCHIVE_MODES = [("stored", 0), ("deflated", 0), ("parallel", 0), ("stored", 4), ("shards", 0)]
+# 축소 디코딩(FAST_DECODE) 품질 기준: 기존 전체 디코딩 경로 대비
+BENCHMARK_LARGE_SIZE = (4000, 3000) # AIHub 원본 해상도 수준
+BENCHMARK_MIN_PSNR = 35.0
+BENCHMARK_MIN_SSIM = 0.95
+# 워커 프로세스 기동 방식 (spawn/forkserver는 워커마다 config/cv2/numpy를 다시 import)
+BENCHMARK_START_METHODS = [method for method in ("fork", "forkserver", "spawn")
+						   if method in multiprocessing.get_all_start_methods()]
+# 절대 처리량(images/sec)은 머신마다 다르므로 같은 실행 안의 처리량 비율(speedup)을 baseline과 비교
+# baseline 대비 비율이 이 값 이상 떨어지면 실패, BENCHMARK_UPDATE_BASELINE=1이면 이번 비율을 baseline으로 저장
+BENCHMARK_REGRESSION_THRESHOLD = float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.2"))
+BENCHMARK_UPDATE_BASELINE = os.getenv("BENCHMARK_UPDATE_BASELINE") == "1"
 
-image_list = list(BENCHMARK_EXTRACT_DST_DIR.rglob("*.jpg"))
+RESULTS = {}
 
-def setup():
+def size_id(size: tuple[int, int]) -> str:
+	return f"{size[0]}x{size[1]}"
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_report():
+	"""모듈이 끝나면 케이스별 처리량을 BENCHMARK_OUTPUT_JSON에 기록 (필요 시 baseline 갱신)"""
+	yield
+	if not RESULTS:
+		return
+	report = {
+		"created_at": datetime.now().isoformat(timespec="seconds"),
+		"machine": {"platform": platform.platform(), "python": platform.python_version(),
+					"cpu_count": os.cpu_count(), "opencv": cv2.__version__},
+		"settings": {"image_count": BENCHMARK_IMAGE_COUNT, "image_sizes": [size_id(size) for size in BENCHMARK_IMAGE_SIZES],
+					 "workers": BENCHMARK_WORKERS, "regression_threshold": BENCHMARK_REGRESSION_THRESHOLD},
+		"results": RESULTS,
+		"ratios": speedup_ratios(),
+	}
+	BENCHMARK_OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
+	BENCHMARK_OUTPUT_JSON.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+	if BENCHMARK_UPDATE_BASELINE:
+		baseline = load_baseline()
+		baseline.update(report["ratios"])
+		BENCHMARK_BASELINE_JSON.write_text(json.dumps(baseline, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
+										   encoding="utf-8")
+
+def load_baseline() -> dict[str, float]:
+	if not BENCHMARK_BASELINE_JSON.exists():
+		return {}
+	return json.loads(BENCHMARK_BASELINE_JSON.read_text(encoding="utf-8"))
+
+def record(benchmark, case: str, images: int, nbytes: int = 0):
+	"""중앙값 기준 처리량 기록 (회귀 판정은 test_speedup_ratios에서 최솟값 기준 비율로)"""
+	median = benchmark.stats.stats.median
+	RESULTS[case] = {"median_seconds": round(median, 6),
+					 "min_seconds": round(benchmark.stats.stats.min, 6),
+					 "images_per_sec": round(images / median, 3),
+					 "mb_per_sec": round(nbytes / 1024 ** 2 / median, 3),
+					 **benchmark.extra_info}
+
+def speedup_ratios() -> dict[str, float]:
+	"""같은 실행 안에서 측정한 두 케이스의 처리량 비율 (둘 중 하나라도 실행되지 않았으면 생략)
+
+	- streaming/disk: zip -> zip 인메모리 변환 vs 압축 해제된 파일 변환 (workers=1)
+	- multi_spec/single: 변형 3개 동시 생성 vs 단일 변형 (1에 가까울수록 디코딩 재사용 효과가 큼)
+	- fast_decode/full: 4000x3000 JPEG 축소 디코딩 vs 전체 디코딩
+	- parallel/serial: 워커 수로 나눈 병렬 효율 (이 머신의 CPU 수 이하 워커만)
+	"""
+	pairs = {}
+	for size in map(size_id, BENCHMARK_IMAGE_SIZES):
+		pairs[f"streaming/disk[{size}]"] = (f"test_transform_archive[{size}-1-{BENCHMARK_QUALITY}]",
+											f"test_transform_images[{size}-1]", 1)
+		pairs[f"multi_spec/single[{size}]"] = (f"test_transform_multi_spec[{size}]", f"test_transform_images[{size}-1]", 1)
+		for workers in BENCHMARK_WORKERS:
+			if 1 < workers <= (os.cpu_count() or 1):
+				for case in (f"test_transform_archive[{size}-{{}}-{BENCHMARK_QUALITY}]", f"test_transform_images[{size}-{{}}]"):
+					pairs[f"parallel/serial[{case.format(workers)}]"] = (case.format(workers), case.format(1), workers)
+	pairs["fast_decode/full"] = ("test_transform_large_jpeg[True]", "test_transform_large_jpeg[False]", 1)
+	# 다른 프로세스의 간섭은 시간을 늘리기만 하므로 비율은 라운드 중 최솟값으로 계산
+	return {name: round(RESULTS[reference]["min_seconds"] / RESULTS[case]["min_seconds"] / scale, 3)
+			for name, (case, reference, scale) in pairs.items() if case in RESULTS and reference in RESULTS}
+
+# ====================================================
+# --- 합성 데이터 ---
+# ====================================================
+@pytest.fixture(scope="module", params=BENCHMARK_IMAGE_SIZES, ids=size_id)
+def synthetic_zip(request) -> Path:
+	size = request.param
+	return make_synthetic_archive(BENCHMARK_SYNTHETIC_DIR / f"synthetic_{BENCHMARK_IMAGE_COUNT}_{size_id(size)}.zip",
+								  BENCHMARK_IMAGE_COUNT, size, seed=BENCHMARK_SEED)
+
+@pytest.fixture(scope="module")
+def extracted(synthetic_zip, tmp_path_factory) -> tuple[Path, list[Path]]:
+	dst_root = tmp_path_factory.mktemp("extracted")
+	return dst_root, preprocessor.extract_archive(synthetic_zip, dst_root, workers=1)
+
+@pytest.fixture(scope="module")
+def transformed(extracted, tmp_path_factory) -> Path:
+	src_root, image_list = extracted
+	dst_root = tmp_path_factory.mktemp("transformed")
+	preprocessor.transform_images("sample", image_list, src_root, dst_root, specs=[BENCHMARK_SPEC], workers=1)
+	return preprocessor.spec_dir(BENCHMARK_SPEC, dst_root)
+
+@pytest.fixture
+def out_dir(tmp_path) -> Path:
+	return tmp_path
+
+def reset(path: Path):
 	"""pedantic setup 함수"""
-	shutil.rmtree(BENCHMARK_TMP_DIR, ignore_errors=True)
-	BENCHMARK_TMP_DIR.mkdir(parents=True, exist_ok=True)
+	shutil.rmtree(path, ignore_errors=True)
+	path.mkdir(parents=True, exist_ok=True)
 
-def test_extract_archive(benchmark):
+# ====================================================
+# --- 스테이지 벤치마크 ---
+# ====================================================
+@pytest.mark.parametrize("workers", BENCHMARK_WORKERS)
+def test_extract_archive(benchmark, request, synthetic_zip, out_dir, workers):
+	benchmark.extra_info["workers"] = workers
 	benchmark.pedantic(
 		preprocessor.extract_archive,
-		args=(BENCHMARK_ZIP_PATH, BENCHMARK_TMP_DIR),
-		setup=setup,
+		args=(synthetic_zip, out_dir, workers),
+		setup=lambda: reset(out_dir),
 		rounds=3,
 		warmup_rounds=1
 	)
+	record(benchmark, request.node.name, BENCHMARK_IMAGE_COUNT, synthetic_zip.stat().st_size)
+
+@pytest.mark.parametrize("quality", BENCHMARK_QUALITIES)
+@pytest.mark.parametrize("workers", BENCHMARK_WORKERS)
+def test_transform_archive(benchmark, request, synthetic_zip, out_dir, workers, quality):
+	"""기본 경로(streaming): 원본 zip -> 결과 zip 인메모리 변환"""
+	benchmark.extra_info.update(workers=workers, quality=quality)
+	benchmark.pedantic(
+		preprocessor.transform_archive,
+		args=("sample", synthetic_zip, "sample.zip"),
+		kwargs=dict(dst_root=out_dir,
+					specs=[config.OutputSpec(BENCHMARK_TARGET_SIZE, BENCHMARK_EXTENSION, quality)],
+					workers=workers),
+		setup=lambda: reset(out_dir),
+		rounds=5,
+		warmup_rounds=1
+	)
+	record(benchmark, request.node.name, BENCHMARK_IMAGE_COUNT, synthetic_zip.stat().st_size)
 
-def test_transform_images(benchmark):
+@pytest.mark.parametrize("workers", BENCHMARK_WORKERS)
+def test_transform_images(benchmark, request, extracted, out_dir, workers):
+	"""disk 모드: 압축 해제된 파일 -> 변환 파일"""
+	src_root, image_list = extracted
+	benchmark.extra_info["workers"] = workers
 	benchmark.pedantic(
-		transform_images,
+		preprocessor.transform_images,
 		args=("sample", image_list),
-		setup=setup,
-		rounds=3,
+		kwargs=dict(src_root=src_root,
+					dst_root=out_dir,
+					specs=[BENCHMARK_SPEC],
+					workers=workers),
+		setup=lambda: reset(out_dir),
+		rounds=5,
 		warmup_rounds=1
 	)
+	record(benchmark, request.node.name, len(image_list))
+
+@pytest.mark.parametrize("compression, shard_size", BENCHMARK_ARCHIVE_MODES)
+def test_make_archive(benchmark, request, transformed, out_dir, compression, shard_size):
+	benchmark.extra_info.update(compression=compression, shard_size=shard_size)
+	if compression == "shards":
+		target = lambda: shards.write_shards("sample.zip", shards.iter_dir_members(transformed), out_dir,
+											 BENCHMARK_TARGET_SIZE, BENCHMARK_EXTENSION)
+	else:
+		target = lambda: preprocessor.make_archive("sample.zip", transformed, out_dir, BENCHMARK_TARGET_SIZE,
+												   BENCHMARK_EXTENSION, compression, shard_size)
+	benchmark.pedantic(target, setup=lambda: reset(out_dir), rounds=3, warmup_rounds=1)
+	nbytes = sum(file.stat().st_size for file in transformed.rglob("*") if file.is_file())
+	record(benchmark, request.node.name, BENCHMARK_IMAGE_COUNT, nbytes)
+
+# ====================================================
+# --- 디코딩/다중 출력 ---
+# ====================================================
+def large_jpegs(count: int = 4) -> list[bytes]:
+	return [make_food_jpeg(*BENCHMARK_LARGE_SIZE, seed=BENCHMARK_SEED + i, quality=95) for i in range(count)]
+
+def resized(data: bytes, fast_decode: bool) -> np.ndarray:
+	img = preprocessor.decode_image(np.frombuffer(data, dtype=np.uint8), BENCHMARK_TARGET_SIZE, fast_decode)
+	return cv2.resize(img, (BENCHMARK_TARGET_SIZE, BENCHMARK_TARGET_SIZE), interpolation=cv2.INTER_AREA)
 
-def test_make_archive(benchmark):
+def ssim(a: np.ndarray, b: np.ndarray) -> float:
+	"""그레이스케일 SSIM (Gaussian 11x11, sigma=1.5)"""
+	a = cv2.cvtColor(a, cv2.COLOR_BGR2GRAY).astype(np.float64)
+	b = cv2.cvtColor(b, cv2.COLOR_BGR2GRAY).astype(np.float64)
+	c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+	blur = lambda x: cv2.GaussianBlur(x, (11, 11), 1.5)
+	mu_a, mu_b = blur(a), blur(b)
+	var_a = blur(a * a) - mu_a ** 2
+	var_b = blur(b * b) - mu_b ** 2
+	cov = blur(a * b) - mu_a * mu_b
+	ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+	return float(ssim_map.mean())
+
+@pytest.mark.parametrize("fast_decode", [False, True])
+def test_transform_large_jpeg(benchmark, request, fast_decode):
+	data = large_jpegs(1)[0]
+	benchmark.extra_info["fast_decode"] = fast_decode
 	benchmark.pedantic(
-		preprocessor.make_archive,
-		args=("sample.zip",
-			  BENCHMARK_TRANSFORM_DST_DIR,
-			  BENCHMARK_TMP_DIR,
-			  BENCHMARK_TARGET_SIZE,
-			  BENCHMARK_EXTENSION),
-		setup=setup,
-		rounds=3,
+		preprocessor.transform_bytes,
+		args=(data, BENCHMARK_TARGET_SIZE, BENCHMARK_EXTENSION, BENCHMARK_QUALITY, fast_decode),
+		rounds=5,
+		warmup_rounds=1
+	)
+	record(benchmark, request.node.name, 1, len(data))
+
+def test_transform_multi_spec(benchmark, request, extracted, out_dir):
+	"""변형 3개를 한 번의 디코딩으로 생성 (단일 spec 3회 실행 대비)"""
+	src_root, image_list = extracted
+	benchmark.pedantic(
+		preprocessor.transform_images,
+		args=("sample", image_list),
+		kwargs=dict(src_root=src_root,
+					dst_root=out_dir,
+					specs=BENCHMARK_MULTI_SPECS,
+					workers=1),
+		setup=lambda: reset(out_dir),
+		rounds=5,
 		warmup_rounds=1
 	)
+	record(benchmark, request.node.name, len(image_list))
+
+def test_fast_decode_quality():
+	"""축소 디코딩 결과가 전체 디코딩 결과와 시각적으로 동등한지 PSNR/SSIM으로 확인"""
+	for i, data in enumerate(large_jpegs()):
+		full, fast = resized(data, False), resized(data, True)
+		assert cv2.PSNR(full, fast) >= BENCHMARK_MIN_PSNR, i
+		assert ssim(full, fast) >= BENCHMARK_MIN_SSIM, i
+
+# ====================================================
+# --- 워커 기동 ---
+# ====================================================
+def start_workers(start_method: str, workers: int):
+	"""프로세스 풀 생성 -> 모든 워커가 initializer(cv2 스레드/로그 큐 설정)를 마치고 첫 작업을 돌려줌 -> 종료"""
+	with ProcessPoolExecutor(max_workers=workers,
+							 mp_context=multiprocessing.get_context(start_method),
+							 initializer=preprocessor._init_worker,
+							 initargs=(worker_log_queue(),)) as pool:
+		list(pool.map(preprocessor.reduced_decode_flag, [4000] * workers, [3000] * workers,
+					  [BENCHMARK_TARGET_SIZE] * workers))
+
+@pytest.mark.parametrize("start_method", BENCHMARK_START_METHODS)
+def test_worker_cold_start(benchmark, request, start_method):
+	"""워커 cold start 비용 (images_per_sec 자리에 초당 기동 워커 수 기록)"""
+	workers = max(BENCHMARK_WORKERS)
+	benchmark.extra_info.update(start_method=start_method, workers=workers)
+	benchmark.pedantic(start_workers, args=(start_method, workers), rounds=3, warmup_rounds=1)
+	record(benchmark, request.node.name, workers)
 
-def transform_images(file_key: str,
-					image_path_list: list,
-                 	src_root: Path = BENCHMARK_EXTRACT_DST_DIR,
-                 	dst_root: Path = BENCHMARK_TRANSFORM_DST_DIR,
-                 	target_size: int = BENCHMARK_TARGET_SIZE,
-                 	extension: str = BENCHMARK_EXTENSION,
-                 	quality: int = BENCHMARK_QUALITY):
-	for image_path in image_path_list:
-		preprocessor.resize_image(image_path,
-								src_root,
-								dst_root,
-								target_size,
-								extension,
-								quality)
+# ====================================================
+# --- 회귀 판정 ---
+# ====================================================
+def test_speedup_ratios():
+	"""앞선 벤치마크로 계산한 처리량 비율이 baseline보다 threshold 이상 떨어지면 실패"""
+	ratios = speedup_ratios()
+	if not ratios:
+		pytest.skip("비율을 계산할 벤치마크가 실행되지 않음")
+	if BENCHMARK_UPDATE_BASELINE:
+		return
+	baseline = load_baseline()
+	regressions = [f"{name}: {ratio} < baseline {baseline[name]} x {1 - BENCHMARK_REGRESSION_THRESHOLD:.2f}"
+				   for name, ratio in ratios.items()
+				   if name in baseline and ratio < baseline[name] * (1 - BENCHMARK_REGRESSION_THRESHOLD)]
+	assert not regressions, "\n".join(regressions)
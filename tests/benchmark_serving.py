@@ -0,0 +1,78 @@
+"""
+추론 서버 부하 벤치마크 (deploy/serving.py + deploy/loadgen.py)
+max_batch_size x 동시 연결 수를 스윕하고 p50/p99 지연, 초당 요청 수, 평균 배치 크기를 기록한다.
+기본 모델은 CI용 LinearModel이고, BENCHMARK_SERVING_MODEL=model.onnx로 실제 모델을 지정할 수 있다.
+"""
+import json
+import os
+import platform
+import threading
+from datetime import datetime
+from pathlib import Path
+import cv2
+import pytest
+import loadgen
+import serving
+from synthetic import make_food_jpeg
+
+BENCHMARK_OUTPUT_JSON = Path(__file__).parent / "results" / f"benchmark_serving_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+BENCHMARK_SERVING_MODEL = os.getenv("BENCHMARK_SERVING_MODEL")
+BENCHMARK_REQUESTS = int(os.getenv("BENCHMARK_SERVING_REQUESTS", "256"))
+BENCHMARK_CONCURRENCY = [int(v) for v in os.getenv("BENCHMARK_SERVING_CONCURRENCY", "1,16").split(",")]
+BENCHMARK_MAX_BATCH_SIZES = [1, serving.SERVING_MAX_BATCH_SIZE]
+BENCHMARK_MAX_WAIT_MS = serving.SERVING_MAX_WAIT_MS
+BENCHMARK_IMAGE_SIZE = (1024, 768)
+BENCHMARK_SEED = 302
+
+RESULTS = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_report():
+	yield
+	if not RESULTS:
+		return
+	report = {
+		"created_at": datetime.now().isoformat(timespec="seconds"),
+		"machine": {"platform": platform.platform(), "python": platform.python_version(),
+					"cpu_count": os.cpu_count(), "opencv": cv2.__version__},
+		"settings": {"model": BENCHMARK_SERVING_MODEL or "LinearModel", "requests": BENCHMARK_REQUESTS,
+					 "max_wait_ms": BENCHMARK_MAX_WAIT_MS},
+		"results": RESULTS,
+	}
+	BENCHMARK_OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
+	BENCHMARK_OUTPUT_JSON.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+@pytest.fixture(scope="module")
+def payloads() -> list[bytes]:
+	return [make_food_jpeg(*BENCHMARK_IMAGE_SIZE, seed=BENCHMARK_SEED + i) for i in range(16)]
+
+@pytest.fixture(scope="module")
+def model():
+	if BENCHMARK_SERVING_MODEL:
+		return serving.load_model(Path(BENCHMARK_SERVING_MODEL))
+	return serving.LinearModel.random(num_classes=150)
+
+@pytest.fixture(params=BENCHMARK_MAX_BATCH_SIZES, ids=lambda size: f"batch{size}")
+def server_url(request, model):
+	service = serving.InferenceService(model, max_batch_size=request.param, max_wait_ms=BENCHMARK_MAX_WAIT_MS)
+	httpd = serving.make_server(service, "127.0.0.1", 0)
+	thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+	thread.start()
+	yield service, f"http://127.0.0.1:{httpd.server_address[1]}/predict"
+	httpd.shutdown()
+	httpd.server_close()
+	service.close()
+
+@pytest.mark.parametrize("concurrency", BENCHMARK_CONCURRENCY)
+def test_serving_load(benchmark, request, server_url, payloads, concurrency):
+	service, url = server_url
+	loadgen.run_load(url, payloads, len(payloads), concurrency)  # warmup
+	service.metrics.reset()
+	report = benchmark.pedantic(loadgen.run_load, args=(url, payloads, BENCHMARK_REQUESTS, concurrency),
+								rounds=1, iterations=1)
+	batches = service.metrics.counters.get(("batches_total", ()), 0)
+	report["mean_batch_size"] = round(service.metrics.counters.get(("batched_requests_total", ()), 0) / batches, 3) if batches else 0.0
+	report["max_batch_size"] = service.batcher.max_batch_size
+	benchmark.extra_info.update(report)
+	RESULTS[request.node.name] = report
+	assert report["errors"] == 0
@@ -3,4 +3,5 @@ from pathlib import Path
 
 ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT / "image_pipeline"))
-sys.path.insert(0, str(ROOT / "model_training"))
\ No newline at end of file
+sys.path.insert(0, str(ROOT / "model_training"))
+sys.path.insert(0, str(ROOT / "deploy"))
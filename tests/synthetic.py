@@ -0,0 +1,64 @@
+"""
+벤치마크/테스트용 합성 음식 사진 JPEG 아카이브 생성기
+AIHub 원본 없이도 같은 결과를 내도록 seed 기반으로 결정적으로 생성한다.
+(배경 그라데이션 + 접시 + 음식 덩어리 + 센서 노이즈 -> 실제 사진과 비슷한 JPEG 압축률/디코딩 비용)
+"""
+import zipfile
+from pathlib import Path
+import cv2
+import numpy as np
+
+SYNTHETIC_CATEGORIES = ["닭강정", "라면", "김밥", "비빔밥"]
+
+def make_food_image(width: int, height: int, seed: int) -> np.ndarray:
+	"""BGR uint8 이미지 1장 생성"""
+	rng = np.random.default_rng(seed)
+	# 테이블/배경: 두 색 사이 세로 그라데이션
+	top, bottom = rng.integers(60, 200, size=(2, 3))
+	ramp = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+	img = (top * (1 - ramp) + bottom * ramp).astype(np.float32) * np.ones((1, width, 1), np.float32)
+
+	# 접시
+	center = (int(width * rng.uniform(0.4, 0.6)), int(height * rng.uniform(0.4, 0.6)))
+	axes = (int(width * rng.uniform(0.3, 0.4)), int(height * rng.uniform(0.3, 0.4)))
+	cv2.ellipse(img, center, axes, 0, 0, 360, (235, 235, 240), -1, cv2.LINE_AA)
+
+	# 음식 덩어리: 접시 안쪽에 색/크기가 다른 원 여러 개
+	base_color = rng.integers(0, 255, size=3)
+	for _ in range(int(rng.integers(20, 40))):
+		offset = rng.normal(0, 0.35, size=2) * axes
+		radius = int(min(width, height) * rng.uniform(0.02, 0.08))
+		color = np.clip(base_color + rng.normal(0, 30, size=3), 0, 255)
+		cv2.circle(img, (int(center[0] + offset[0]), int(center[1] + offset[1])), radius,
+				   tuple(float(c) for c in color), -1, cv2.LINE_AA)
+
+	# 조명 얼룩과 센서 노이즈 (평탄한 합성 이미지는 실제보다 지나치게 잘 압축됨)
+	img = cv2.GaussianBlur(img, (0, 0), sigmaX=max(1.0, min(width, height) / 400))
+	img += rng.normal(0, 6, size=img.shape).astype(np.float32)
+	return np.clip(img, 0, 255).astype(np.uint8)
+
+def make_food_jpeg(width: int, height: int, seed: int, quality: int = 90) -> bytes:
+	img = make_food_image(width, height, seed)
+	return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+def make_synthetic_archive(zip_path: Path,
+						   count: int,
+						   size: tuple[int, int] = (1024, 768),
+						   seed: int = 0,
+						   quality: int = 90) -> Path:
+	"""
+	AIHub 아카이브와 같은 구조({카테고리}/{파일명}.jpg)의 zip 생성
+	같은 인자로 만들면 항상 같은 내용 (이미 있으면 재사용)
+	"""
+	if zip_path.exists():
+		return zip_path
+	zip_path.parent.mkdir(parents=True, exist_ok=True)
+	tmp_path = zip_path.with_name(f"{zip_path.name}.tmp")
+	with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as z:
+		for i in range(count):
+			category = SYNTHETIC_CATEGORIES[i % len(SYNTHETIC_CATEGORIES)]
+			name = f"{category}/S{seed:03d}XX_{i:05d}.jpg"
+			zinfo = zipfile.ZipInfo(name, date_time=(2024, 1, 1, 0, 0, 0))
+			z.writestr(zinfo, make_food_jpeg(*size, seed=seed * 100003 + i, quality=quality))
+	tmp_path.replace(zip_path)
+	return zip_path
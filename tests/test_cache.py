@@ -0,0 +1,96 @@
+import os
+import zipfile
+import pytest
+import preprocessor
+from cache import TransformCache
+from config import OutputSpec
+from synthetic import make_food_jpeg
+
+def test_get_put_hit_and_miss(tmp_path):
+	cache = TransformCache(tmp_path, max_bytes=1024 ** 2)
+	key = cache.make_key(cache.hash_bytes(b"src"), target_size=64)
+	assert cache.get(key) is None
+	cache.put(key, b"encoded")
+	assert cache.get(key) == b"encoded"
+	assert not list(tmp_path.glob("*/*.tmp"))
+
+SPEC = OutputSpec(64, "webp", 90)
+
+def test_transform_cached_key_changes_with_spec(tmp_path):
+	cache = TransformCache(tmp_path, max_bytes=1024 ** 2)
+	data = make_food_jpeg(256, 192, seed=0)
+	spec = OutputSpec(64, "webp", 90)
+
+	outputs, hit, image_hash = preprocessor._transform_cached(data, [spec], False, cache, with_dhash=True)
+	assert not hit
+	assert preprocessor._transform_cached(data, [spec], False, cache, with_dhash=True) == (outputs, True, image_hash)
+	# 품질/크기/디코딩 방식 중 하나라도 바뀌면 이전 결과를 재사용하지 않는다
+	assert not preprocessor._transform_cached(data, [OutputSpec(64, "webp", 80)], False, cache)[1]
+	assert not preprocessor._transform_cached(data, [OutputSpec(96, "webp", 90)], False, cache)[1]
+	assert not preprocessor._transform_cached(data, [spec], True, cache)[1]
+	# 원본이 바뀌어도 미스
+	assert not preprocessor._transform_cached(make_food_jpeg(256, 192, seed=1), [spec], False, cache)[1]
+
+def test_track_evicts_least_recently_used(tmp_path):
+	cache = TransformCache(tmp_path, max_bytes=300, evict_ratio=0.75)
+	cache.sync()
+	for i, key in enumerate(["aa0", "bb1", "cc2"]):
+		cache.put(key, bytes(100))
+		os.utime(cache._path(key), (i, i))
+		cache.track(100)
+	assert cache.size == 300
+	cache.get("aa0")  # 가장 먼저 쓴 항목이지만 최근에 사용
+
+	# 상한을 넘는 시점에 바로 상한의 75%까지 오래 사용되지 않은 항목부터 삭제
+	cache.put("dd3", bytes(100))
+	assert cache.track(100) == (2, 200)
+	assert cache.get("bb1") is None and cache.get("cc2") is None
+	assert cache.get("aa0") is not None and cache.get("dd3") is not None
+	assert cache.size == 200 and cache.evicted == (2, 200)
+
+def test_track_counts_existing_entries(tmp_path):
+	TransformCache(tmp_path).put("aa0", bytes(100))
+	cache = TransformCache(tmp_path, max_bytes=150)
+	cache.sync()  # 이전 실행의 항목도 크기에 포함
+	cache.put("bb1", bytes(100))
+	cache.track(100)
+	assert cache.size <= 150
+	assert cache.evict() == (0, 0)
+
+@pytest.mark.parametrize("stage", ["transform_images", "transform_archive"])
+def test_cache_scans_once_per_stage(tmp_path, monkeypatch, stage):
+	"""워커(청크)마다 캐시 디렉토리를 스캔하지 않고 메인 프로세스에서 한 번만 스캔"""
+	scans = []
+	entries = TransformCache._entries
+	monkeypatch.setattr(TransformCache, "_entries", lambda self: scans.append(1) or entries(self))
+	cache = TransformCache(tmp_path / "cache", max_bytes=1024 ** 3)
+	src_path = tmp_path / "src.zip"
+	with zipfile.ZipFile(src_path, "w") as z:
+		for i in range(8):
+			z.writestr(f"라면/{i:03d}.jpg", make_food_jpeg(128, 96, seed=i))
+	kwargs = dict(specs=[SPEC], workers=2, executor="thread", chunksize=1, cache=cache)
+	if stage == "transform_images":
+		image_list = preprocessor.extract_archive(src_path, tmp_path / "extracted", workers=1)
+		preprocessor.transform_images("k", image_list, tmp_path / "extracted", tmp_path / "out", **kwargs)
+	else:
+		preprocessor.transform_archive("k", src_path, "src.zip", dst_root=tmp_path, **kwargs)
+	assert len(scans) == 1
+	# dedup이 없으면 dHash 항목을 쓰지 않으므로 추적 크기 = 캐시 디렉토리 크기
+	assert sum(size for _, size, _ in entries(cache)) == cache.size
+
+def test_dhash_skipped_without_dedup(tmp_path, monkeypatch):
+	cache = TransformCache(tmp_path, max_bytes=1024 ** 2)
+	data = make_food_jpeg(256, 192, seed=0)
+	calls = []
+	dhash = preprocessor.dhash
+	monkeypatch.setattr(preprocessor, "dhash", lambda img: calls.append(1) or dhash(img))
+
+	assert preprocessor._transform_cached(data, [SPEC], False, cache)[2] is None
+	assert preprocessor._transform_cached(data, [SPEC], False, None)[2] is None
+	assert calls == [] and len(list(tmp_path.glob("*/*"))) == 1  # spec 결과 1개만 저장
+
+	# dedup을 켜면 dHash 항목이 없으므로 다시 변환해서 dHash 항목만 추가
+	outputs, hit, image_hash = preprocessor._transform_cached(data, [SPEC], False, cache, with_dhash=True)
+	assert not hit and image_hash is not None and calls == [1]
+	assert len(list(tmp_path.glob("*/*"))) == 2
+	assert preprocessor._transform_cached(data, [SPEC], False, cache, with_dhash=True) == (outputs, True, image_hash)
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+from pathlib import Path
+import cli
+import config
+
+def test_help_does_not_import_stage_modules():
+	code = "import sys, cli\ntry:\n\tcli.main(['--help'])\nexcept SystemExit:\n\tpass\nprint('cv2' in sys.modules, 'preprocessor' in sys.modules)"
+	result = subprocess.run([sys.executable, "-c", code], cwd=Path(cli.__file__).parent,
+							capture_output=True, text=True, check=True)
+	assert result.stdout.strip().splitlines()[-1] == "False False"
+
+def test_overrides_apply_to_config(monkeypatch):
+	for name in ("PIPELINE_MODE", "TRANSFORM_WORKERS", "ARCHIVE_WORKERS", "VALIDATION_WORKERS", "UPLOAD_ENABLED"):
+		monkeypatch.setattr(config, name, getattr(config, name))
+	args = cli.build_parser().parse_args(["--mode", "disk", "--workers", "3", "--no-upload", "dedup", "1", "--action", "drop"])
+	cli._apply_overrides(args)
+
+	assert (config.PIPELINE_MODE, config.TRANSFORM_WORKERS, config.ARCHIVE_WORKERS) == ("disk", 3, 3)
+	assert config.UPLOAD_ENABLED is False
+	assert args.func is cli.cmd_dedup and args.action == "drop" and args.file_keys == ["1"]
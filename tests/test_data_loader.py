@@ -0,0 +1,81 @@
+import zipfile
+import cv2
+import numpy as np
+import pytest
+import data_loader
+import preprocessor
+import shards
+from config import OutputSpec
+from labels import LabelIndex
+from synthetic import make_synthetic_archive
+
+SIZE = 32
+
+@pytest.fixture(scope="module")
+def sources(tmp_path_factory):
+	"""같은 합성 원본을 결과 zip 하나와 packed shard 하나로 변환"""
+	root = tmp_path_factory.mktemp("archive")
+	for name, seed in (("음식1_Tra.zip", 1), ("음식2_Val.zip", 2)):
+		src_path = make_synthetic_archive(root / "src" / name, 10, (128, 96), seed=seed)
+		preprocessor.transform_archive("k", src_path, name, dst_root=root, specs=[OutputSpec(SIZE, "webp", 90)], workers=1)
+	zip_path = preprocessor.archive_path("음식2_Val.zip", root, SIZE, "webp")
+	shards.write_shards("음식2_Val.zip", shards.iter_zip_members([zip_path]), root, SIZE, "webp")
+	return root
+
+def expected_image(root, name: str) -> np.ndarray:
+	for zip_path in sorted(root.glob("*.zip")):
+		with zipfile.ZipFile(zip_path) as z:
+			if name in z.namelist():
+				return cv2.imdecode(np.frombuffer(z.read(name), np.uint8), cv2.IMREAD_COLOR)
+
+def test_discover_sources_prefers_shards(sources):
+	assert [path.name for path in data_loader.discover_sources(sources, SIZE, "webp")] == \
+		["webp_32_음식2_Val.idx.npz", "webp_32_음식1_Tra.zip"]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_epoch_covers_every_image_with_correct_pixels_and_labels(sources, workers):
+	with data_loader.DataLoader(data_loader.discover_sources(sources, SIZE, "webp"), batch_size=6, image_size=SIZE,
+								workers=workers, prefetch=2) as loader:
+		seen = []
+		for batch in loader:
+			for image, label, index in zip(batch.images, batch.labels, batch.indices):
+				name = loader.names[index]
+				assert loader.classes[label] == shards.member_label(name)
+				assert np.array_equal(image, expected_image(sources, name))
+				seen.append(name)
+
+	assert len(loader) == 4
+	assert sorted(seen) == sorted(loader.names.tolist()) and len(seen) == 20
+
+def test_shuffle_is_deterministic_per_epoch_and_split_across_ranks(sources):
+	paths = data_loader.discover_sources(sources, SIZE, "webp")
+	orders = []
+	for rank in range(3):
+		with data_loader.DataLoader(paths, batch_size=4, image_size=SIZE, seed=7, rank=rank, world_size=3,
+									workers=1) as loader:
+			orders.append(np.concatenate([batch.indices for batch in loader]))
+			loader.set_epoch(1)
+			assert not np.array_equal(np.concatenate([batch.indices for batch in loader]), orders[-1])
+
+	assert [len(order) for order in orders] == [6, 6, 6]
+	assert len(set(np.concatenate(orders).tolist())) == 18
+
+def test_early_break_and_label_index(sources):
+	paths = data_loader.discover_sources(sources, SIZE, "webp")
+	label_index = LabelIndex(np.array(["라면/S001XX_00001"]), np.array(["라면"]),
+							 np.zeros(2, dtype="<u4"), np.empty((0, 4), dtype="<f4"))
+	with data_loader.DataLoader(paths, batch_size=3, image_size=SIZE, shuffle=False, workers=2, prefetch=1,
+								label_index=label_index) as loader:
+		for batch in loader:
+			break
+		labels = np.concatenate([batch.labels for batch in loader])
+
+	assert labels.tolist().count(0) == 1 and labels.tolist().count(-1) == 19
+
+def test_decode_failure_marks_label(sources, tmp_path):
+	zip_path = tmp_path / "webp_32_broken.zip"
+	with zipfile.ZipFile(zip_path, "w") as z:
+		z.writestr("라면/a.webp", b"garbage")
+	with data_loader.DataLoader([zip_path], batch_size=2, image_size=SIZE, workers=1) as loader:
+		batch = next(iter(loader))
+	assert batch.labels.tolist() == [-1] and not batch.images.any()
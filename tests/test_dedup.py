@@ -0,0 +1,85 @@
+import json
+import random
+import zipfile
+import cv2
+import pytest
+import dedup
+import preprocessor
+from config import OutputSpec
+from synthetic import make_food_image, make_food_jpeg
+
+def flip(image_hash: int, bits: list[int]) -> int:
+	for bit in bits:
+		image_hash ^= 1 << bit
+	return image_hash
+
+def test_dhash_is_stable_under_reencoding_and_separates_images():
+	img = make_food_image(1024, 768, seed=1)
+	reencoded = cv2.imdecode(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 60])[1], cv2.IMREAD_COLOR)
+	resized = cv2.resize(img, (512, 384), interpolation=cv2.INTER_AREA)
+	image_hash = preprocessor.dhash(img)
+
+	assert 0 <= image_hash < 1 << 64
+	assert (image_hash ^ preprocessor.dhash(reencoded)).bit_count() <= 6
+	assert (image_hash ^ preprocessor.dhash(resized)).bit_count() <= 6
+	assert (image_hash ^ preprocessor.dhash(make_food_image(1024, 768, seed=2))).bit_count() > 6
+
+def test_split_of():
+	assert dedup.split_of("음식302_Val.zip") == "Val"
+	assert dedup.split_of("음식110_Tra_json.zip") == "Tra"
+	assert dedup.split_of("misc.zip") == ""
+
+@pytest.mark.parametrize("max_distance", [0, 3, 6])
+def test_multi_index_lookup_matches_brute_force(tmp_path, max_distance):
+	rng = random.Random(max_distance)
+	stored = [rng.getrandbits(64) for _ in range(300)]
+	queries = [flip(stored[i], rng.sample(range(64), rng.randint(0, 8))) for i in range(100)]
+	with dedup.DedupIndex(tmp_path / "dedup.db") as index:
+		index.add("A", [(f"a/{i}", image_hash) for i, image_hash in enumerate(stored)])
+		for query in queries:
+			expected = sorted(f"a/{i}" for i, image_hash in enumerate(stored)
+							  if (image_hash ^ query).bit_count() <= max_distance)
+			assert sorted(member for _, member, _ in index.neighbors(query, max_distance)) == expected
+
+def test_find_duplicates_flags_leakage_and_category(tmp_path):
+	image_hash = random.Random(0).getrandbits(64)
+	with dedup.DedupIndex(tmp_path / "dedup.db") as index:
+		index.register_archive("1", "음식302_Tra.zip")
+		index.register_archive("2", "음식302_Val.zip")
+		index.add("1", [("라면/a.jpg", image_hash), ("라면/b.jpg", ~image_hash & (1 << 64) - 1)])
+		index.add("2", [("라면/c.jpg", flip(image_hash, [0, 17, 63])),
+						("김밥/d.jpg", flip(image_hash, [5])),
+						("김밥/e.jpg", flip(image_hash, [5]))])
+
+		assert index.find_duplicates("1") == []
+		duplicates = {duplicate.member: duplicate for duplicate in index.find_duplicates("2", max_distance=3)}
+
+		assert duplicates["라면/c.jpg"] == dedup.Duplicate("라면/c.jpg", "1", "라면/a.jpg", 3, True, False)
+		assert duplicates["김밥/d.jpg"] == dedup.Duplicate("김밥/d.jpg", "1", "라면/a.jpg", 1, True, True)
+		# 같은 아카이브 안에서는 멤버명이 앞선 쪽을 원본으로
+		assert duplicates["김밥/e.jpg"] == dedup.Duplicate("김밥/e.jpg", "2", "김밥/d.jpg", 0, False, False)
+
+		index.remove("1", ["라면/a.jpg"])
+		assert {duplicate.member for duplicate in index.find_duplicates("2", max_distance=3)} == {"김밥/e.jpg"}
+
+def test_transform_archive_records_hashes_and_drops_duplicates(tmp_path):
+	src_path = tmp_path / "음식1_Val.zip"
+	with zipfile.ZipFile(src_path, "w") as z:
+		for i in range(4):
+			z.writestr(f"라면/{i}.jpg", make_food_jpeg(256, 192, seed=i))
+		z.writestr("라면/9.jpg", make_food_jpeg(256, 192, seed=0, quality=80))
+	specs = [OutputSpec(64, "webp", 90)]
+
+	with dedup.DedupIndex(tmp_path / "dedup.db") as index:
+		preprocessor.transform_archive("k", src_path, src_path.name, dst_root=tmp_path, specs=specs,
+									   workers=1, dedup=index)
+		assert index.count("k") == 5
+		duplicates = dedup.dedup_archive("k", src_path.name, index, streaming=True, action="drop",
+										 specs=specs, archive_root=tmp_path, report_root=tmp_path / "dedup")
+
+		assert [(duplicate.member, duplicate.other_member) for duplicate in duplicates] == [("라면/9.jpg", "라면/0.jpg")]
+		assert index.count("k") == 4
+	with zipfile.ZipFile(preprocessor.archive_paths(src_path.name, tmp_path, 64, "webp")[0]) as z:
+		assert sorted(z.namelist()) == [f"라면/{i}.webp" for i in range(4)]
+	report = (tmp_path / "dedup" / "음식1_Val.duplicates.jsonl").read_text(encoding="utf-8").splitlines()
+	assert json.loads(report[0])["other_member"] == "라면/0.jpg"
@@ -0,0 +1,120 @@
+import stat
+import sys
+from pathlib import Path
+import subprocess
+import pytest
+import downloader
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+TEST_ZIP = FIXTURE_DIR / "sample.zip"
+
+# aihubshell처럼 cwd 아래에 데이터셋 디렉토리 트리를 만들고 파일을 내려놓는 가짜 스크립트
+# FAKE_AIHUB_FAILURES 파일의 숫자만큼 실패(또는 FAKE_AIHUB_MODE=truncate면 잘린 zip) 후 정상 동작
+# 호출마다 FAKE_AIHUB_ATTEMPTS에, 정상 다운로드마다 FAKE_AIHUB_LOG에 파일키를 기록
+FAKE_AIHUBSHELL = f"""#!{sys.executable}
+import os, shutil, sys
+from pathlib import Path
+args = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+with open(Path(os.environ["FAKE_AIHUB_ATTEMPTS"]), "a") as attempts:
+	attempts.write(args["-filekey"] + "\\n")
+counter = Path(os.environ["FAKE_AIHUB_FAILURES"])
+failures = int(counter.read_text())
+dst = Path("음식 이미지 및 영양정보 텍스트") / "01.데이터" / "2.Validation" / os.environ["FAKE_AIHUB_FILE_NAME"]
+dst.parent.mkdir(parents=True)
+if failures > 0:
+	counter.write_text(str(failures - 1))
+	if os.environ.get("FAKE_AIHUB_MODE") == "truncate":
+		dst.write_bytes(Path(os.environ["FAKE_AIHUB_SRC"]).read_bytes()[:-100])
+		sys.exit(0)
+	sys.exit(1)
+with open(Path(os.environ["FAKE_AIHUB_LOG"]), "a") as log:
+	log.write(args["-filekey"] + "\\n")
+shutil.copy(os.environ["FAKE_AIHUB_SRC"], dst)
+"""
+
+@pytest.fixture
+def fake_aihubshell(tmp_path, monkeypatch):
+	script = tmp_path / "aihubshell"
+	script.write_text(FAKE_AIHUBSHELL, encoding="utf-8")
+	script.chmod(script.stat().st_mode | stat.S_IEXEC)
+	failures = tmp_path / "failures"
+	failures.write_text("0")
+	log = tmp_path / "calls.log"
+	log.touch()
+	monkeypatch.setattr(downloader, "AIHUB_SHELL", str(script))
+	monkeypatch.setenv("FAKE_AIHUB_SRC", str(TEST_ZIP))
+	monkeypatch.setenv("FAKE_AIHUB_FAILURES", str(failures))
+	monkeypatch.setenv("FAKE_AIHUB_LOG", str(log))
+	monkeypatch.setenv("FAKE_AIHUB_ATTEMPTS", str(tmp_path / "attempts.log"))
+	monkeypatch.setenv("FAKE_AIHUB_FILE_NAME", "음식302_Val.zip")
+	return failures, log
+
+def download(tmp_path, **kwargs):
+	download_dir = tmp_path / "raw"
+	download_dir.mkdir(exist_ok=True)
+	kwargs.setdefault("expected_size", "1 MB")
+	return downloader.download_file("49526", "음식302_Val.zip", download_dir=download_dir,
+									manifest_csv_path=tmp_path / "missing.csv", backoff=0, **kwargs)
+
+def test_size_tolerance():
+	# 10진(1 MB = 10^6)/2진(1 MB = 2^20) 해석 모두 + 마지막 자리 1만큼
+	assert downloader.size_tolerance("15 MB") == (14 * 1000 ** 2, 16 * 1024 ** 2)
+	assert downloader.size_tolerance("1.2GB") == (1100 * 1000 ** 2, round(1.3 * 1024 ** 3))
+	with pytest.raises(ValueError):
+		downloader.size_tolerance("15 MiB")
+
+def test_validate_archive_accepts_decimal_size(tmp_path):
+	"""29e9 bytes 파일은 2진 해석(29 GiB)으로는 1 GiB 이상 모자라지만 "29 GB" 표시와 일치"""
+	file_path = tmp_path / "large.tar"
+	with open(file_path, "wb") as f:
+		f.truncate(29 * 1000 ** 3)  # sparse file
+	downloader.validate_archive(file_path, "29 GB")
+	with pytest.raises(downloader.DownloadValidationError):
+		downloader.validate_archive(file_path, "31 GB")
+
+def test_download_resolves_path_and_cleans_staging(tmp_path, fake_aihubshell):
+	file_path = download(tmp_path)
+
+	assert file_path == tmp_path / "raw" / "음식302_Val.zip"
+	assert file_path.read_bytes() == TEST_ZIP.read_bytes()
+	assert not (tmp_path / "raw" / ".staging" / "49526").exists()
+
+def test_download_retries_until_valid(tmp_path, fake_aihubshell, monkeypatch):
+	failures, log = fake_aihubshell
+	failures.write_text("2")
+	monkeypatch.setenv("FAKE_AIHUB_MODE", "truncate")
+
+	file_path = download(tmp_path, retries=2)
+
+	assert file_path.read_bytes() == TEST_ZIP.read_bytes()
+	assert failures.read_text() == "0"
+
+def test_download_gives_up_after_retries(tmp_path, fake_aihubshell):
+	failures, log = fake_aihubshell
+	failures.write_text(str(downloader.DOWNLOAD_RETRIES + 2))
+
+	with pytest.raises(subprocess.CalledProcessError):
+		download(tmp_path)
+	assert (tmp_path / "attempts.log").read_text().split() == ["49526"] * (downloader.DOWNLOAD_RETRIES + 1)
+	assert failures.read_text() == "1"
+	assert log.read_text() == ""
+
+def test_download_rejects_size_mismatch(tmp_path, fake_aihubshell):
+	with pytest.raises(downloader.DownloadValidationError):
+		download(tmp_path, retries=0, expected_size="20 MB")
+
+def test_download_skips_valid_existing_file(tmp_path, fake_aihubshell):
+	failures, log = fake_aihubshell
+	download(tmp_path)
+	download(tmp_path)
+
+	assert log.read_text().split() == ["49526"]
+
+def test_validate_archive_detects_truncation(tmp_path):
+	truncated = tmp_path / "truncated.zip"
+	data = TEST_ZIP.read_bytes()
+	# 연결이 끊겨 앞부분만 받은 경우 (EOCD 없음)
+	truncated.write_bytes(data[:len(data) // 2])
+	with pytest.raises(downloader.DownloadValidationError):
+		downloader.validate_archive(truncated)
+	downloader.validate_archive(TEST_ZIP)
@@ -0,0 +1,43 @@
+import json
+import zipfile
+import numpy as np
+import labels
+
+def write_label_zip(path, entries: dict[str, object], encoding: str = "utf-8"):
+	with zipfile.ZipFile(path, "w") as z:
+		for member, content in entries.items():
+			data = content if isinstance(content, bytes) else json.dumps(content, ensure_ascii=False).encode(encoding)
+			z.writestr(member, data)
+
+def test_find_boxes_tolerates_schemas():
+	assert labels.find_boxes({"annotations": [{"bbox": [1, 2, 3, 4]}]}) == [(1.0, 2.0, 3.0, 4.0)]
+	assert labels.find_boxes([{"Point": {"X": "10", "Y": "20", "Width": "30", "Height": "40"}}]) == [(10.0, 20.0, 30.0, 40.0)]
+	assert labels.find_boxes({"Name": "라면", "W": "640", "H": "480"}) == []
+
+def test_build_and_join_label_index(tmp_path):
+	write_label_zip(tmp_path / "음식302_Val_json.zip", {
+		"라면/A_001.json": {"bbox": [0, 0, 10, 10]},
+		"라면/A_002.json": [{"bbox": [1, 1, 5, 5]}, {"bbox": [2, 2, 6, 6]}],
+		"닭강정/B_001.json": {"Name": "닭강정"},
+		"닭강정/B_002.json": b"{",
+	})
+	write_label_zip(tmp_path / "음식303_Val_json.zip", {
+		"김밥/C_001.json": {"box": {"x": 3, "y": 4, "w": 5, "h": 6}},
+	}, encoding="cp949")
+	index_dir = tmp_path / "labels"
+	labels.build_label_index("1", tmp_path / "음식302_Val_json.zip", "음식302_Val_json.zip", dst_root=index_dir)
+	labels.build_label_index("2", tmp_path / "음식303_Val_json.zip", "음식303_Val_json.zip", dst_root=index_dir)
+
+	index = labels.load_label_index(index_dir)
+	assert len(index) == 4 # 파싱 실패한 B_002는 제외
+	assert list(index.classes) == ["김밥", "닭강정", "라면"]
+	class_ids = index.join(["라면/A_002.webp", "김밥/C_001.webp", "닭강정/B_001.webp", "라면/unknown.webp"])
+	assert class_ids.tolist() == [2, 0, 1, -1]
+	np.testing.assert_array_equal(index.boxes_of("라면/A_002.webp"), [[1, 1, 5, 5], [2, 2, 6, 6]])
+	np.testing.assert_array_equal(index.boxes_of("김밥/C_001.jpg"), [[3, 4, 5, 6]])
+	assert index.boxes_of("닭강정/B_001.webp").shape == (0, 4)
+
+def test_load_empty_label_index(tmp_path):
+	index = labels.load_label_index(tmp_path)
+	assert len(index) == 0
+	assert index.join(["라면/A_001.webp"]).tolist() == [-1]
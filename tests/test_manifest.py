@@ -0,0 +1,78 @@
+import os
+import config
+import manifest
+from state import PipelineState
+
+TREE = """==========================================
+aihubshell version 25.09.19 v0.6
+==========================================
+    └─052.건강관리를 위한 음식 이미지 데이터
+        └─01.데이터
+            ├─1.Training
+            │  ├─라벨링데이터
+            │  │  └─음식110_Tra_json.zip | 15 MB | 49611
+            │  └─원천데이터
+            │      ├─음식001_Tra.zip | 29 GB | 49638
+            │      └─음식110_Tra.zip | 18 GB | 49562
+            ├─2.Validation
+            │  └─원천데이터
+            │      └─음식001_Val.zip | 7 GB | 49602
+            └─InfoTable_0720_add
+                └─통합 식품영양성분DB.zip | 48 MB | 49531
+"""
+
+def test_parse_tree_restores_paths_and_classifies():
+	entries = {entry.file_key: entry for entry in manifest.parse_tree(TREE)}
+
+	assert entries["49611"] == manifest.ManifestEntry(
+		"49611", "음식110_Tra_json.zip", "052.건강관리를 위한 음식 이미지 데이터/01.데이터/1.Training/라벨링데이터/음식110_Tra_json.zip",
+		"Tra", "음식110", "label", "15 MB")
+	assert entries["49602"].path.endswith("2.Validation/원천데이터/음식001_Val.zip")
+	assert (entries["49602"].split, entries["49602"].kind, entries["49602"].size_bytes) == ("Val", "image", 7 * 1024 ** 3)
+	assert entries["49531"].file_name == "통합 식품영양성분DB.zip" and entries["49531"].kind == "other"
+
+def test_raw_listing_matches_manifest_csv():
+	entries = manifest.read_tree(config.AIHUB_MANIFEST_RAW_PATH)
+	assert len(entries) == 105
+	assert {entry.file_key: (entry.file_name, entry.size) for entry in entries} == \
+		manifest.read_manifest_csv(config.AIHUB_MANIFEST_CSV_PATH)
+
+def test_write_and_cached_read_manifest_csv(tmp_path):
+	csv_path = manifest.write_manifest_csv(manifest.parse_tree(TREE), tmp_path / "download_list.csv")
+	first = manifest.read_manifest_csv(csv_path)
+	assert first["49638"] == ("음식001_Tra.zip", "29 GB")
+	assert manifest.read_manifest_csv(csv_path) is first
+
+	manifest.write_manifest_csv(manifest.parse_tree(TREE)[:1], csv_path)
+	os.utime(csv_path, ns=(0, 1))  # 같은 mtime 해상도 안에서 다시 써도 갱신되도록
+	assert list(manifest.read_manifest_csv(csv_path)) == ["49611"]
+
+def test_refresh_diff_and_incremental_schedule(tmp_path):
+	entries = manifest.parse_tree(TREE)
+	with PipelineState(tmp_path / "state.db") as state, manifest.ManifestCatalog(tmp_path / "manifest.db") as catalog:
+		diff = catalog.refresh(entries, state)
+		assert len(diff.added) == 5 and not diff.changed and not diff.removed
+
+		assert [entry.file_key for entry in manifest.schedule(catalog, state, categories=["음식001"])] == ["49638", "49602"]
+		assert [entry.file_key for entry in manifest.schedule(catalog, state, splits=["Val"])] == ["49602"]
+		assert [entry.file_key for entry in catalog.select(kinds=["label"])] == ["49611"]
+
+		# 음식001 처리 완료 (49602는 카탈로그 도입 전에 처리되어 처리 기록이 없는 경우)
+		for file_key in ("49638", "49602"):
+			state.mark_stage_done(file_key, "cleanup")
+		catalog.mark_processed(["49638"])
+		assert manifest.schedule(catalog, state, categories=["음식001"]) == []
+
+		# 목록 갱신: 49638 크기 변경, 49602 크기 변경, 음식002 추가, 음식110 라벨 삭제
+		updated = [entry._replace(size="30 GB") if entry.file_key in ("49638", "49602") else entry
+				   for entry in entries if entry.file_key != "49611"]
+		updated.append(manifest.ManifestEntry("49639", "음식002_Tra.zip", "x/음식002_Tra.zip", "Tra", "음식002", "image", "18 GB"))
+		diff = catalog.refresh(updated, state)
+		assert [entry.file_key for entry in diff.added] == ["49639"]
+		assert sorted(entry.file_key for entry in diff.changed) == ["49602", "49638"]
+		assert [entry.file_key for entry in diff.removed] == ["49611"]
+
+		scheduled = manifest.schedule(catalog, state, categories=["음식001", "음식002"])
+		assert sorted(entry.file_key for entry in scheduled) == ["49602", "49638", "49639"]
+		assert not state.is_stage_done("49638", "cleanup")
+		assert catalog.key_map()["49638"] == ("음식001_Tra.zip", "30 GB")
@@ -0,0 +1,44 @@
+import json
+import pytest
+from metrics import Histogram, MetricsRegistry
+
+def test_histogram_percentiles():
+	histogram = Histogram()
+	for i in range(1, 101):
+		histogram.observe(i / 1000)
+	summary = histogram.summary()
+	assert summary["count"] == 100
+	assert summary["p50"] == pytest.approx(0.051)
+	assert summary["p99"] == pytest.approx(0.1)
+
+def test_histogram_reservoir_is_bounded():
+	histogram = Histogram(reservoir_size=10)
+	for i in range(1000):
+		histogram.observe(i)
+	assert len(histogram.samples) == 10
+	assert histogram.count == 1000
+
+def test_stage_records_time_and_errors():
+	registry = MetricsRegistry()
+	with registry.stage("transform"):
+		registry.inc("images_total", 3, stage="transform")
+	with pytest.raises(RuntimeError):
+		with registry.stage("transform"):
+			raise RuntimeError("boom")
+
+	report = registry.report()
+	assert report["histograms"]["stage_seconds"]['{stage="transform"}']["count"] == 2
+	assert report["counters"]["errors_total"]['{stage="transform"}'] == 1
+	assert report["gauges"]["rss_peak_bytes"]['{scope="self"}'] > 0
+	assert "transform" in report["throughput"]
+
+def test_write_report(tmp_path):
+	registry = MetricsRegistry()
+	registry.observe("image_seconds", 0.02, stage="transform")
+	json_path, prom_path = registry.write_report(tmp_path)
+
+	assert json.loads(json_path.read_text())["histograms"]["image_seconds"]
+	prom = prom_path.read_text()
+	assert "# TYPE pipeline_image_seconds histogram" in prom
+	assert 'pipeline_image_seconds_bucket{stage="transform",le="0.025"} 1' in prom
+	assert 'pipeline_image_seconds_count{stage="transform"} 1' in prom
@@ -0,0 +1,264 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import zipfile
+import zlib
+import cv2
+import numpy as np
+import pytest
+import preprocessor
+from config import OutputSpec
+from synthetic import make_food_jpeg
+
+def test_estimate_image_bytes_uses_jpeg_header():
+	data = cv2.imencode(".jpg", np.zeros((1200, 1600, 3), np.uint8))[1].tobytes()
+
+	full = preprocessor.estimate_image_bytes(data, 384, fast_decode=False)
+	reduced = preprocessor.estimate_image_bytes(data, 384, fast_decode=True)
+	header_only = preprocessor.estimate_image_bytes(data[:1024], 384, fast_decode=False, file_size=len(data))
+
+	assert full == len(data) + 1600 * 1200 * 3 + 384 * 384 * 3
+	assert reduced == len(data) + 800 * 600 * 3 + 384 * 384 * 3  # IMREAD_REDUCED_COLOR_2
+	assert header_only == full
+
+@pytest.mark.parametrize("max_inflight_bytes", [1, 25, 1000])
+def test_bounded_results_keeps_order_within_budget(max_inflight_bytes):
+	lock = threading.Lock()
+	state = {"inflight": 0, "peak": 0, "produced": 0}
+
+	def chunks():
+		for i in range(20):
+			with lock:
+				state["produced"] += 1
+			yield [i] * 10  # cost 10
+
+	def task(chunk):
+		with lock:
+			state["inflight"] += len(chunk)
+			state["peak"] = max(state["peak"], state["inflight"])
+		time.sleep(0.001)
+		return chunk[0]
+
+	results = []
+	with ThreadPoolExecutor(max_workers=4) as pool:
+		for result in preprocessor._bounded_results(pool, task, chunks(), len, max_inflight_bytes):
+			with lock:
+				state["inflight"] -= 10
+			results.append(result)
+			# 결과를 회수하기 전에는 상한을 넘는 청크를 만들지 않음 (상한보다 큰 청크 1개는 허용)
+			assert (state["produced"] - len(results)) * 10 <= max(max_inflight_bytes, 10) + 10
+
+	assert results == list(range(20))
+	assert state["peak"] <= max(max_inflight_bytes, 10)
+
+def test_bounded_results_without_pool():
+	assert list(preprocessor._bounded_results(None, sum, ([i, i] for i in range(5)), len, 3)) == [0, 2, 4, 6, 8]
+
+def test_transform_archive_parallel_compression(tmp_path):
+	src_path = tmp_path / "src.zip"
+	with zipfile.ZipFile(src_path, "w") as z:
+		for i in range(4):
+			z.writestr(f"라면/{i:03d}.jpg", make_food_jpeg(256, 192, seed=i))
+	specs = [OutputSpec(64, "webp", 90), OutputSpec(32, "jpg", 90)]
+
+	# streaming 모드에서도 "parallel"은 변환 워커에서 deflate한 결과를 그대로 기록한다
+	outputs = {}
+	for compression in ("stored", "parallel"):
+		dst_root = tmp_path / compression
+		dst_root.mkdir()
+		preprocessor.transform_archive("k", src_path, "src.zip", dst_root=dst_root, specs=specs, workers=1,
+									   compression=compression)
+		for spec in specs:
+			with zipfile.ZipFile(preprocessor.archive_path("src.zip", dst_root, spec.target_size, spec.extension)) as z:
+				assert z.testzip() is None
+				assert {info.compress_type for info in z.infolist()} == {
+					zipfile.ZIP_DEFLATED if compression == "parallel" else zipfile.ZIP_STORED}
+				outputs[compression, spec.name] = {name: z.read(name) for name in z.namelist()}
+	for spec in specs:
+		assert outputs["parallel", spec.name] == outputs["stored", spec.name]
+
+def make_image_tree(root, count: int = 6):
+	"""{카테고리}/{번호}.jpg 원본 트리 + 디코딩되지 않는 파일 1개"""
+	image_list = []
+	for i in range(count):
+		path = root / ("라면" if i % 2 else "김밥") / f"{i:03d}.jpg"
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_bytes(make_food_jpeg(256, 192, seed=i))
+		image_list.append(path)
+	broken = root / "라면" / "broken.jpg"
+	broken.write_bytes(b"not a jpeg")
+	image_list.insert(count // 2, broken)
+	return image_list
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_transform_images_parallel_matches_serial(tmp_path, monkeypatch, executor):
+	"""병렬 결과가 순차 결과와 bytes 단위로 같고, 깨진 원본은 로깅 후 건너뛰며 풀은 계속 동작"""
+	src_root = tmp_path / "src"
+	image_list = make_image_tree(src_root)
+	specs = [OutputSpec(64, "webp", 90), OutputSpec(32, "jpg", 90)]
+	errors = []
+	monkeypatch.setattr(preprocessor.pipeline_logger, "error", errors.append)
+
+	outputs = {}
+	for workers in (1, 2):
+		dst_root = tmp_path / str(workers)
+		assert preprocessor.transform_images("k", image_list, src_root, dst_root, specs=specs, workers=workers,
+											 executor=executor, chunksize=2) == len(image_list)  # 깨진 파일과 같은 청크 포함
+		outputs[workers] = {path.relative_to(dst_root).as_posix(): path.read_bytes()
+							for path in dst_root.rglob("*") if path.is_file()}
+
+	assert outputs[1] == outputs[2]
+	assert len(outputs[1]) == (len(image_list) - 1) * len(specs)
+	assert not any("broken" in name for name in outputs[1])
+	assert len(errors) == 2 and all("broken.jpg" in message for message in errors)
+
+def read_members(zip_path) -> dict[str, bytes]:
+	with zipfile.ZipFile(zip_path) as z:
+		assert z.testzip() is None
+		return {name: z.read(name) for name in z.namelist()}
+
+def test_streaming_matches_disk_mode(tmp_path):
+	"""zip -> zip 인메모리 변환 결과가 압축 해제 -> 변환 -> 압축 결과와 멤버 단위로 같음"""
+	src_path = tmp_path / "src.zip"
+	with zipfile.ZipFile(src_path, "w") as z:
+		for i in range(6):
+			z.writestr(f"{'라면' if i % 2 else '김밥'}/{i:03d}.jpg", make_food_jpeg(256, 192, seed=i))
+	specs = [OutputSpec(64, "webp", 90), OutputSpec(32, "jpg", 90)]
+
+	streaming_root, disk_root = tmp_path / "streaming", tmp_path / "disk"
+	streaming_root.mkdir()
+	disk_root.mkdir()
+	preprocessor.transform_archive("k", src_path, "src.zip", dst_root=streaming_root, specs=specs, workers=1)
+	image_list = preprocessor.extract_archive(src_path, tmp_path / "extracted", workers=1)
+	preprocessor.transform_images("k", image_list, tmp_path / "extracted", tmp_path / "transformed", specs=specs,
+								  workers=1)
+	for spec in specs:
+		preprocessor.make_archive("src.zip", preprocessor.spec_dir(spec, tmp_path / "transformed"), disk_root,
+								  spec.target_size, spec.extension, compression="stored", workers=1)
+
+	for spec in specs:
+		streaming = read_members(preprocessor.archive_path("src.zip", streaming_root, spec.target_size, spec.extension))
+		disk = read_members(preprocessor.archive_path("src.zip", disk_root, spec.target_size, spec.extension))
+		assert len(streaming) == 6
+		assert streaming == disk
+
+def make_cp949_zip(zip_path, members: dict[str, bytes]):
+	"""
+	UTF-8 플래그 없이 한글 파일명을 cp949 bytes로 기록한 zip (Windows 압축 프로그램/AIHub 원본과 같은 형태)
+	zipfile은 비ASCII 이름에 항상 UTF-8 플래그를 붙이므로 같은 길이의 ASCII 이름으로 쓴 뒤 이름 bytes만 교체
+	"""
+	placeholders = {}
+	with zipfile.ZipFile(zip_path, "w") as z:
+		for i, (member, data) in enumerate(members.items()):
+			encoded = member.encode("cp949")
+			placeholder = f"<{i:02d}{'~' * (len(encoded) - 4)}>".encode()
+			placeholders[placeholder] = encoded
+			z.writestr(placeholder.decode(), data)
+	raw = zip_path.read_bytes()
+	for placeholder, encoded in placeholders.items():
+		assert raw.count(placeholder) == 2  # local header + central directory
+		raw = raw.replace(placeholder, encoded)
+	zip_path.write_bytes(raw)
+
+@pytest.mark.parametrize("workers, executor", [(1, "thread"), (2, "thread"), (2, "process")])
+def test_extract_archive_fixes_cp949_names(tmp_path, workers, executor):
+	members = {f"{category}/{name}_{i:03d}.jpg": make_food_jpeg(64, 48, seed=i)
+			   for i, (category, name) in enumerate([("라면", "신라면"), ("김밥", "참치김밥")] * 4)}
+	src_path = tmp_path / "src.zip"
+	make_cp949_zip(src_path, members)
+	with zipfile.ZipFile(src_path) as z:
+		assert not any(info.flag_bits & 0x800 for info in z.infolist())
+		assert sorted(map(preprocessor._fix_filename, z.infolist())) == sorted(members)
+
+	dst_root = tmp_path / "extracted"
+	path_list = preprocessor.extract_archive(src_path, dst_root, workers=workers, executor=executor)
+
+	assert [path.relative_to(dst_root).as_posix() for path in path_list] == list(members)
+	assert {path.relative_to(dst_root).as_posix(): path.read_bytes()
+			for path in dst_root.rglob("*") if path.is_file()} == members
+
+@pytest.mark.parametrize("stage", ["transform_archive", "transform_images"])
+def test_multi_spec_decodes_once(tmp_path, monkeypatch, stage):
+	"""이미지당 디코딩 한 번으로 모든 spec 결과를 만들고, spec별 결과는 해당 크기/확장자"""
+	src_path = tmp_path / "src.zip"
+	with zipfile.ZipFile(src_path, "w") as z:
+		for i in range(4):
+			z.writestr(f"라면/{i:03d}.jpg", make_food_jpeg(256, 192, seed=i))
+	specs = [OutputSpec(96, "webp", 90), OutputSpec(48, "jpg", 90)]
+	image_list = preprocessor.extract_archive(src_path, tmp_path / "extracted", workers=1)
+	decodes = []
+	decode_image = preprocessor.decode_image
+	monkeypatch.setattr(preprocessor, "decode_image", lambda *args: decodes.append(1) or decode_image(*args))
+
+	dst_root = tmp_path / "out"
+	if stage == "transform_archive":
+		dst_root.mkdir()
+		preprocessor.transform_archive("k", src_path, "src.zip", dst_root=dst_root, specs=specs, workers=1)
+	else:
+		preprocessor.transform_images("k", image_list, tmp_path / "extracted", dst_root, specs=specs, workers=1)
+		for spec in specs:
+			preprocessor.make_archive("src.zip", preprocessor.spec_dir(spec, dst_root), dst_root, spec.target_size,
+									  spec.extension, compression="stored", workers=1)
+	assert len(decodes) == 4
+
+	for spec, ext in zip(specs, (".webp", ".jpg")):
+		zip_path = preprocessor.archive_path("src.zip", dst_root, spec.target_size, spec.extension)
+		assert zip_path.name == f"{spec.extension}_{spec.target_size}_src.zip"
+		members = read_members(zip_path)
+		assert sorted(members) == [f"라면/{i:03d}{ext}" for i in range(4)]
+		for data in members.values():
+			img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+			assert img.shape == (spec.target_size, spec.target_size, 3)
+		if spec.extension == "webp":
+			assert all(data[8:12] == b"WEBP" for data in members.values())
+		else:
+			assert all(data[:2] == b"\xff\xd8" for data in members.values())
+
+@pytest.mark.parametrize("raw_write", ["internal", "fallback"])
+def test_write_raw_round_trip(tmp_path, monkeypatch, raw_write):
+	"""재압축 없이 기록한 멤버가 testzip/read를 통과하고, zipfile 내부가 바뀐 경우의 재압축 경로도 같은 내용"""
+	if raw_write == "fallback":
+		monkeypatch.setattr(preprocessor, "_RAW_WRITE_ATTRS", ("_missing_attribute",))
+	members = {f"라면/{i:03d}.webp": make_food_jpeg(64, 48, seed=i) for i in range(3)}
+	zip_path = tmp_path / "raw.zip"
+	with zipfile.ZipFile(zip_path, "w") as z:
+		for i, (member, data) in enumerate(members.items()):
+			zinfo = zipfile.ZipInfo(member, date_time=(2024, 1, 1, 0, 0, 0))
+			if i % 2:
+				zinfo.compress_type = zipfile.ZIP_STORED
+				zinfo.CRC, zinfo.file_size, raw = zlib.crc32(data), len(data), data
+			else:
+				zinfo.compress_type = zipfile.ZIP_DEFLATED
+				zinfo.CRC, zinfo.file_size, raw = preprocessor._deflate_bytes(data)
+			zinfo.compress_size = len(raw)
+			preprocessor._write_raw(z, zinfo, raw)
+		z.writestr("김밥/after.webp", b"regular member")  # raw 기록 뒤 일반 기록도 이어서 가능
+
+	assert read_members(zip_path) == {**members, "김밥/after.webp": b"regular member"}
+	with zipfile.ZipFile(zip_path) as z:
+		assert [info.compress_type for info in z.infolist()] == [
+			zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED]
+
+	# 결과 zip 멤버 교체(raw 복사)도 같은 경로를 쓴다
+	preprocessor.replace_archive_members([zip_path], {"라면/001.webp": b"replaced", "라면/002.webp": None})
+	assert read_members(zip_path) == {"라면/000.webp": members["라면/000.webp"], "라면/001.webp": b"replaced",
+									  "김밥/after.webp": b"regular member"}
+
+def test_make_archive_parallel_is_bounded(tmp_path):
+	src_root = tmp_path / "src"
+	for i in range(8):
+		path = src_root / "라면" / f"{i:03d}.webp"
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_bytes(make_food_jpeg(128, 96, seed=i))
+	largest = max(path.stat().st_size for path in src_root.rglob("*.webp"))
+	outputs = {}
+	for compression in ("stored", "parallel"):
+		dst_root = tmp_path / compression
+		dst_root.mkdir()
+		preprocessor.make_archive("src.zip", src_root, dst_root, 64, "webp", compression, workers=2,
+								  executor="thread", chunksize=1, max_inflight_bytes=1)
+		outputs[compression] = read_members(preprocessor.archive_path("src.zip", dst_root, 64, "webp"))
+
+	assert outputs["parallel"] == outputs["stored"] and len(outputs["stored"]) == 8
+	# 상한 1byte: 청크(파일 1개) 하나씩만 워커에 넘어간다
+	assert preprocessor.pipeline_metrics.gauges[("inflight_bytes_peak", (("stage", "make_archive"),))] <= 2 * largest
@@ -0,0 +1,103 @@
+import shutil
+import threading
+import time
+from pathlib import Path
+import pytest
+import scheduler
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+TEST_ZIP = FIXTURE_DIR / "sample.zip"
+
+class FakeDownloader:
+	"""aihubshell 대신 로컬 fixture zip을 복사하는 다운로더"""
+	def __init__(self, download_dir: Path, delay: float = 0.0):
+		self.download_dir = download_dir
+		self.delay = delay
+		self.started = []
+
+	def __call__(self, file_key: str, file_name: str) -> Path:
+		self.started.append(file_key)
+		time.sleep(self.delay)
+		dst_path = self.download_dir / file_name
+		shutil.copy(TEST_ZIP, dst_path)
+		return dst_path
+
+def make_key_map(n: int, size: str = "10 MB") -> dict[str, tuple[str, str]]:
+	return {str(i): (f"음식{i}_Val.zip", size) for i in range(n)}
+
+def test_parse_size():
+	assert scheduler.parse_size("15 MB") == 15 * 1024 ** 2
+	assert scheduler.parse_size("1.5 GB") == int(1.5 * 1024 ** 3)
+	with pytest.raises(ValueError):
+		scheduler.parse_size("15 parsecs")
+
+def test_run_scheduled_processes_in_order(tmp_path):
+	key_map = make_key_map(5)
+	download_fn = FakeDownloader(tmp_path)
+	processed = []
+
+	def process_fn(file_key, file_name, file_path):
+		assert file_path.is_file()
+		processed.append(file_key)
+		file_path.unlink()
+
+	results = scheduler.run_scheduled(list(key_map), key_map, download_fn, process_fn, prefetch=2)
+	assert processed == list(key_map)
+	assert set(results.values()) == {"done"}
+	assert not any(tmp_path.iterdir())
+
+def test_run_scheduled_prefetches_while_processing(tmp_path):
+	key_map = make_key_map(4)
+	download_fn = FakeDownloader(tmp_path)
+	prefetched = []
+
+	def process_fn(file_key, file_name, file_path):
+		# 첫 아카이브 처리 중에 다음 아카이브 다운로드가 시작되어야 한다
+		time.sleep(0.1)
+		prefetched.append(len(download_fn.started))
+		file_path.unlink()
+
+	scheduler.run_scheduled(list(key_map), key_map, download_fn, process_fn, prefetch=2)
+	assert prefetched[0] >= 2
+
+def test_run_scheduled_respects_disk_budget(tmp_path):
+	key_map = make_key_map(6, size="10 MB")
+	download_fn = FakeDownloader(tmp_path, delay=0.01)
+	max_on_disk = []
+	lock = threading.Lock()
+
+	def process_fn(file_key, file_name, file_path):
+		time.sleep(0.02)
+		with lock:
+			max_on_disk.append(len(list(tmp_path.iterdir())))
+		file_path.unlink()
+
+	# 아카이브 2개 분량 예산 -> 처리 중 1개 + 미리 받은 1개까지만 디스크에 존재
+	scheduler.run_scheduled(list(key_map), key_map, download_fn, process_fn,
+							prefetch=4, disk_budget=20 * 1024 ** 2, footprint_factor=1.0)
+	assert max(max_on_disk) <= 2
+
+def test_run_scheduled_continues_after_download_failure(tmp_path):
+	key_map = make_key_map(3)
+	download_fn = FakeDownloader(tmp_path)
+
+	def flaky_download(file_key, file_name):
+		if file_key == "1":
+			raise FileNotFoundError(f"Download failed for key: {file_key}")
+		return download_fn(file_key, file_name)
+
+	results = scheduler.run_scheduled(list(key_map), key_map, flaky_download,
+									  lambda file_key, file_name, file_path: file_path.unlink())
+	assert results == {"0": "done", "1": "download_failed", "2": "done"}
+
+def test_run_scheduled_continues_after_invalid_manifest_entry(tmp_path):
+	key_map = make_key_map(3)
+	key_map["1"] = ("음식1_Val.zip", "??")
+	download_fn = FakeDownloader(tmp_path)
+
+	# 알 수 없는 키/잘못된 size가 있어도 나머지는 처리되고 예약한 디스크 예산만 반환되어야 한다
+	results = scheduler.run_scheduled(["0", "1", "missing", "2"], key_map, download_fn,
+									  lambda file_key, file_name, file_path: file_path.unlink(),
+									  prefetch=1, disk_budget=10 * 1024 ** 2, footprint_factor=1.0)
+	assert results == {"0": "done", "1": "download_failed", "missing": "download_failed", "2": "done"}
+	assert download_fn.started == ["0", "2"]
@@ -0,0 +1,102 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import cv2
+import numpy as np
+import pytest
+import loadgen
+import preprocessor
+import serving
+from synthetic import make_food_jpeg
+
+class RecordingModel:
+	"""배치 크기를 기록하고 이미지별 평균 밝기를 점수로 돌려주는 모델"""
+	def __init__(self):
+		self.batch_sizes = []
+
+	def predict(self, batch: np.ndarray) -> np.ndarray:
+		self.batch_sizes.append(len(batch))
+		return batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+
+class FailingModel:
+	def predict(self, batch: np.ndarray) -> np.ndarray:
+		raise RuntimeError("boom")
+
+@pytest.fixture
+def server(tmp_path):
+	model_path = tmp_path / "tiny.npz"
+	serving.LinearModel.random(num_classes=4).save(model_path)
+	service = serving.InferenceService(serving.load_model(model_path), input_size=64, max_batch_size=8,
+									   max_wait_ms=20, class_names=["닭강정", "라면", "김밥", "비빔밥"], top_k=2)
+	httpd = serving.make_server(service, "127.0.0.1", 0)
+	thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+	thread.start()
+	yield service, f"http://127.0.0.1:{httpd.server_address[1]}"
+	httpd.shutdown()
+	httpd.server_close()
+	service.close()
+
+def post(url: str, data: bytes) -> tuple[int, dict]:
+	try:
+		with urllib.request.urlopen(urllib.request.Request(url, data=data, method="POST")) as response:
+			return response.status, json.loads(response.read())
+	except urllib.error.HTTPError as e:
+		return e.code, json.loads(e.read())
+
+def test_load_resized_matches_transform_stage():
+	data = make_food_jpeg(1024, 768, seed=0)
+	lossless = preprocessor.transform_bytes(data, 64, "png", 3)
+
+	decoded = cv2.imdecode(np.frombuffer(lossless, np.uint8), cv2.IMREAD_COLOR)
+	assert np.array_equal(preprocessor.load_resized(data, 64), decoded)
+
+def test_micro_batcher_groups_concurrent_requests():
+	model = RecordingModel()
+	batcher = serving.MicroBatcher(model, max_batch_size=4, max_wait_ms=500)
+	images = [np.full((8, 8, 3), i, np.uint8) for i in range(8)]
+	futures = [batcher.submit(image) for image in images]
+
+	assert [future.result(5)[0] for future in futures] == list(range(8))
+	batcher.close()
+	assert model.batch_sizes == [4, 4]
+	assert batcher.metrics.counters[("batched_requests_total", ())] == 8
+
+def test_micro_batcher_flushes_partial_batch_after_max_wait():
+	model = RecordingModel()
+	batcher = serving.MicroBatcher(model, max_batch_size=16, max_wait_ms=1)
+	assert batcher.submit(np.zeros((8, 8, 3), np.uint8)).result(5)[0] == 0
+	batcher.close()
+	assert model.batch_sizes == [1]
+
+def test_micro_batcher_propagates_forward_errors():
+	batcher = serving.MicroBatcher(FailingModel(), max_batch_size=2, max_wait_ms=50)
+	futures = [batcher.submit(np.zeros((8, 8, 3), np.uint8)) for _ in range(2)]
+	for future in futures:
+		with pytest.raises(RuntimeError, match="boom"):
+			future.result(5)
+	batcher.close()
+
+def test_service_rejects_label_count_mismatch():
+	model = serving.LinearModel.random(num_classes=4)
+	with pytest.raises(ValueError, match="3 class names for a model with 4 outputs"):
+		serving.InferenceService(model, input_size=64, class_names=["닭강정", "라면", "김밥"])
+
+def test_http_predict_and_load_generator(server):
+	service, url = server
+	data = make_food_jpeg(512, 384, seed=1)
+	status, result = post(f"{url}/predict", data)
+
+	expected = service.batcher.model.predict(preprocessor.load_resized(data, 64)[None])[0]
+	assert status == 200
+	assert result["class_id"] == int(np.argmax(expected))
+	assert [item["class_id"] for item in result["top_k"]] == list(np.argsort(expected)[::-1][:2])
+	assert result["top_k"][0]["label"] == ["닭강정", "라면", "김밥", "비빔밥"][result["class_id"]]
+	assert post(f"{url}/predict", b"not an image")[0] == 400
+	assert post(f"{url}/predict", b"") == (400, {"error": "Empty image data"})
+
+	report = loadgen.run_load(f"{url}/predict", [data], requests=24, concurrency=6)
+	assert report["errors"] == 0 and report["requests_per_sec"] > 0
+	assert 0 < report["p50_ms"] <= report["p99_ms"]
+	with urllib.request.urlopen(f"{url}/metrics") as response:
+		assert "serving_batches_total" in response.read().decode()
@@ -0,0 +1,61 @@
+import zipfile
+import cv2
+import numpy as np
+import shards
+
+def make_members(n: int) -> list[tuple[str, bytes]]:
+	categories = ["라면", "닭강정"]
+	members = []
+	for i in range(n):
+		img = np.full((32, 32, 3), i * 10 % 256, dtype=np.uint8)
+		members.append((f"{categories[i % 2]}/{i:03d}.webp", cv2.imencode(".webp", img)[1].tobytes()))
+	return members
+
+def test_write_and_read_shards(tmp_path):
+	members = make_members(10)
+	idx_path = shards.write_shards("음식302_Val.zip", members, dst_root=tmp_path, target_size=32,
+								   extension="webp", shard_bytes=len(members[0][1]) * 3)
+
+	assert idx_path.name == "webp_32_음식302_Val.idx.npz"
+	assert len(list(tmp_path.glob("*.rec"))) > 1
+	assert not list(tmp_path.glob("*.tmp"))
+	with shards.ShardReader(idx_path) as reader:
+		assert len(reader) == 10
+		assert list(reader.classes) == ["닭강정", "라면"]
+		for i, (member, data) in enumerate(members):
+			view = reader[i]
+			assert isinstance(view, memoryview)
+			assert bytes(view) == data
+			assert reader.name(i) == member
+			assert reader.classes[reader.label(i)] == shards.member_label(member)
+			img = cv2.imdecode(np.frombuffer(view, np.uint8), cv2.IMREAD_COLOR)
+			assert img.shape == (32, 32, 3)
+			del view, img
+		assert reader.verify() == []
+
+def test_write_shards_from_zip_replaces_stale_shards(tmp_path):
+	members = make_members(6)
+	zip_path = tmp_path / "webp_32_a.zip"
+	with zipfile.ZipFile(zip_path, "w") as z:
+		for member, data in members:
+			z.writestr(member, data)
+	shards.write_shards("a.zip", members * 4, dst_root=tmp_path, target_size=32, extension="webp", shard_bytes=1)
+	idx_path = shards.write_shards("a.zip", shards.iter_zip_members([zip_path]), dst_root=tmp_path,
+								   target_size=32, extension="webp")
+
+	assert len(list(tmp_path.glob("*.rec"))) == 1
+	with shards.ShardReader(idx_path) as reader:
+		assert [reader.name(i) for i in range(len(reader))] == [member for member, _ in members]
+
+def test_labels_are_shared_across_archives(tmp_path):
+	"""아카이브마다 카테고리 구성이 달라도 같은 클래스는 같은 번호, 먼저 쓴 샤드의 번호도 유지"""
+	first = [("라면/000.webp", b"a"), ("닭강정/001.webp", b"b")]
+	second = [("김치/000.webp", b"c"), ("라면/001.webp", b"d")]
+	first_idx = shards.write_shards("a.zip", first, dst_root=tmp_path, target_size=32, extension="webp")
+	second_idx = shards.write_shards("b.zip", second, dst_root=tmp_path, target_size=32, extension="webp")
+
+	assert shards.load_class_table(tmp_path) == ["닭강정", "라면", "김치"]
+	with shards.ShardReader(first_idx) as a, shards.ShardReader(second_idx) as b:
+		assert [a.label(i) for i in range(len(a))] == [1, 0]
+		assert [b.label(i) for i in range(len(b))] == [2, 1]
+		assert list(b.classes) == shards.load_class_table(tmp_path)
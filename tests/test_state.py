@@ -0,0 +1,142 @@
+import zipfile
+import pytest
+import preprocessor
+from config import OutputSpec
+from state import PipelineState
+from synthetic import make_food_jpeg
+
+SPECS = [OutputSpec(64, "webp", 90)]
+MEMBERS = [f"라면/{i:03d}.jpg" for i in range(6)]
+
+@pytest.fixture
+def state(tmp_path):
+	with PipelineState(tmp_path / "state.db") as state:
+		yield state
+
+def make_source(tmp_path):
+	src_path = tmp_path / "src.zip"
+	with zipfile.ZipFile(src_path, "w") as z:
+		for i, member in enumerate(MEMBERS):
+			z.writestr(member, make_food_jpeg(256, 192, seed=i))
+	return src_path
+
+def record_calls(monkeypatch, name: str) -> list[str]:
+	"""preprocessor의 청크 작업 함수를 감싸서 실제로 변환된 멤버명을 기록"""
+	calls = []
+	original = getattr(preprocessor, name)
+	def wrapper(items, **kwargs):
+		calls.extend(item[0] if isinstance(item, tuple) else item for item in items)
+		return original(items, **kwargs)
+	monkeypatch.setattr(preprocessor, name, wrapper)
+	return calls
+
+def test_stage_marks(tmp_path, state):
+	assert not state.is_stage_done("k", "download")
+	state.mark_stage_done("k", "download", "/tmp/a.zip")
+	state.mark_stage_done("k", "extract")
+	assert state.is_stage_done("k", "download")
+	assert state.stage_detail("k", "download") == "/tmp/a.zip"
+	assert state.stage_detail("k", "extract") is None
+	assert not state.is_stage_done("other", "download")
+
+	# 다시 열어도 기록이 남아 있어야 재실행 시 이어서 진행할 수 있다
+	with PipelineState(tmp_path / "state.db") as reopened:
+		assert reopened.is_stage_done("k", "download")
+
+def test_image_marks_and_reset(state):
+	state.mark_images_done("k", [("a.jpg", "1"), ("b.jpg", "2")])
+	state.mark_images_done("k", [("b.jpg", "3")])
+	state.mark_images_done("other", [("a.jpg", "9")])
+	assert state.done_images("k") == {"a.jpg": "1", "b.jpg": "3"}
+
+	state.unmark_images("k", ["a.jpg"])
+	assert state.done_images("k") == {"b.jpg": "3"}
+
+	state.mark_stage_done("k", "transform")
+	state.reset_images("k")
+	assert state.done_images("k") == {}
+	assert state.is_stage_done("k", "transform")
+
+	state.mark_images_done("k", [("a.jpg", "1")])
+	state.reset("k")
+	assert state.done_images("k") == {}
+	assert not state.is_stage_done("k", "transform")
+	assert state.done_images("other") == {"a.jpg": "9"}
+
+def test_transform_images_skips_done_images(tmp_path, state, monkeypatch):
+	src_root, dst_root = tmp_path / "extracted", tmp_path / "transformed"
+	image_list = preprocessor.extract_archive(make_source(tmp_path), src_root, workers=1)
+	digests = preprocessor.member_digests(tmp_path / "src.zip")
+	preprocessor.transform_images("k", image_list[:2], src_root, dst_root, specs=SPECS, workers=1,
+								  state=state, digests=digests)
+	assert set(state.done_images("k")) == set(MEMBERS[:2])
+
+	calls = record_calls(monkeypatch, "_resize_chunk")
+	preprocessor.transform_images("k", image_list, src_root, dst_root, specs=SPECS, workers=1,
+								  state=state, digests=digests)
+	assert [path.relative_to(src_root).as_posix() for path in calls] == MEMBERS[2:]
+	assert state.done_images("k") == digests
+
+	# 결과 파일이 지워진 이미지는 완료 기록이 있어도 다시 변환
+	calls.clear()
+	(preprocessor.spec_dir(SPECS[0], dst_root) / "라면" / "000.webp").unlink()
+	preprocessor.transform_images("k", image_list, src_root, dst_root, specs=SPECS, workers=1,
+								  state=state, digests=digests)
+	assert [path.relative_to(src_root).as_posix() for path in calls] == MEMBERS[:1]
+
+def test_transform_archive_resumes_after_interrupt(tmp_path, state, monkeypatch):
+	src_path = make_source(tmp_path)
+	original = preprocessor._transform_chunk
+
+	def interrupted(items, **kwargs):
+		if any(member == MEMBERS[4] for member, _ in items):
+			raise KeyboardInterrupt
+		return original(items, **kwargs)
+
+	# 2장마다 세그먼트를 닫으므로 5번째 이미지에서 중단되면 앞의 4장만 완료로 남는다
+	# (max_inflight_bytes=1: 청크마다 결과를 기록한 뒤 다음 청크를 변환)
+	monkeypatch.setattr(preprocessor, "_transform_chunk", interrupted)
+	with pytest.raises(KeyboardInterrupt):
+		preprocessor.transform_archive("k", src_path, "src.zip", dst_root=tmp_path, specs=SPECS, workers=1,
+									   chunksize=1, state=state, checkpoint_interval=2, max_inflight_bytes=1)
+	assert set(state.done_images("k")) == set(MEMBERS[:4])
+
+	monkeypatch.setattr(preprocessor, "_transform_chunk", original)
+	calls = record_calls(monkeypatch, "_transform_chunk")
+	info_lists = preprocessor.transform_archive("k", src_path, "src.zip", dst_root=tmp_path, specs=SPECS, workers=1,
+												chunksize=1, state=state, checkpoint_interval=2)
+	assert calls == MEMBERS[4:]
+	assert sorted(info.filename for info in info_lists[SPECS[0].name]) == [
+		member.replace(".jpg", ".webp") for member in MEMBERS]
+	assert not (tmp_path / "src.parts").exists()
+
+def test_resumed_archive_matches_uninterrupted_run(tmp_path, state, monkeypatch):
+	"""세그먼트 체크포인트 중간(3번째 이미지)에서 중단 후 이어서 만든 결과 zip이 한 번에 만든 결과와 같음"""
+	src_path = make_source(tmp_path)
+	kwargs = dict(specs=SPECS, workers=1, chunksize=1, checkpoint_interval=2, max_inflight_bytes=1)
+	fresh_root, resumed_root = tmp_path / "fresh", tmp_path / "resumed"
+	fresh_root.mkdir()
+	resumed_root.mkdir()
+	preprocessor.transform_archive("fresh", src_path, "src.zip", dst_root=fresh_root, **kwargs)
+
+	original = preprocessor._transform_chunk
+	def interrupted(items, **chunk_kwargs):
+		if any(member == MEMBERS[2] for member, _ in items):
+			raise KeyboardInterrupt
+		return original(items, **chunk_kwargs)
+	monkeypatch.setattr(preprocessor, "_transform_chunk", interrupted)
+	with pytest.raises(KeyboardInterrupt):
+		preprocessor.transform_archive("k", src_path, "src.zip", dst_root=resumed_root, state=state, **kwargs)
+	assert set(state.done_images("k")) == set(MEMBERS[:2])
+	assert (resumed_root / "src.parts").exists()
+
+	monkeypatch.setattr(preprocessor, "_transform_chunk", original)
+	preprocessor.transform_archive("k", src_path, "src.zip", dst_root=resumed_root, state=state, **kwargs)
+
+	archives = []
+	for root in (fresh_root, resumed_root):
+		with zipfile.ZipFile(preprocessor.archive_path("src.zip", root, SPECS[0].target_size, SPECS[0].extension)) as z:
+			assert z.testzip() is None
+			archives.append([(name, z.read(name)) for name in z.namelist()])
+	assert archives[0] == archives[1]
+	assert len(archives[1]) == len(MEMBERS)
@@ -0,0 +1,84 @@
+import threading
+import time
+from pathlib import Path
+import pytest
+import uploader
+
+def make_files(root: Path, sizes: list[int]) -> dict[Path, str]:
+	root.mkdir(parents=True, exist_ok=True)
+	files = {}
+	for i, size in enumerate(sizes):
+		path = root / f"webp_384_음식{i}_Val.zip"
+		path.write_bytes(bytes([i % 256]) * size)
+		files[path] = f"image_pipeline/{path.name}"
+	return files
+
+class RecordingBackend(uploader.LocalBackend):
+	"""동시에 업로드 중인 bytes를 기록하고, 지정한 객체는 처음 fail_times번 실패시키는 백엔드"""
+	def __init__(self, root: Path, fail: dict[str, int] | None = None):
+		super().__init__(root, chunk_size=4)
+		self.fail = dict(fail or {})
+		self.inflight = 0
+		self.max_inflight = 0
+		self.lock = threading.Lock()
+
+	def upload(self, src_path: Path, object_name: str):
+		size = src_path.stat().st_size
+		with self.lock:
+			self.inflight += size
+			self.max_inflight = max(self.max_inflight, self.inflight)
+		try:
+			time.sleep(0.02)
+			if self.fail.get(object_name, 0) > 0:
+				self.fail[object_name] -= 1
+				raise IOError("connection reset")
+			super().upload(src_path, object_name)
+		finally:
+			with self.lock:
+				self.inflight -= size
+
+def test_upload_then_delete_within_budget(tmp_path):
+	files = make_files(tmp_path / "archive", [100, 100, 100, 100, 250])
+	backend = RecordingBackend(tmp_path / "bucket")
+
+	failed = uploader.upload_files(files, backend, workers=4, max_inflight_bytes=200, backoff=0)
+
+	assert failed == []
+	assert backend.max_inflight <= 250  # 예산보다 큰 파일은 단독으로만 업로드
+	for path, object_name in files.items():
+		assert not path.exists()
+		assert (tmp_path / "bucket" / object_name).stat().st_size in (100, 250)
+
+def test_upload_retries_and_reports_failures(tmp_path):
+	files = make_files(tmp_path / "archive", [10, 10])
+	names = list(files.values())
+	backend = RecordingBackend(tmp_path / "bucket", fail={names[0]: 1, names[1]: 5})
+
+	failed = uploader.upload_files(files, backend, workers=2, retries=1, backoff=0)
+
+	assert failed == [tmp_path / "archive" / Path(names[1]).name]
+	assert (tmp_path / "bucket" / names[0]).exists()
+	assert failed[0].exists()  # 실패한 파일은 로컬에 남김
+
+def test_local_backend_resumes_partial_upload(tmp_path):
+	src_path = tmp_path / "a.zip"
+	src_path.write_bytes(b"0123456789" * 10)
+	partial_path = tmp_path / "bucket" / "a.zip.partial"
+	partial_path.parent.mkdir()
+	partial_path.write_bytes(b"0123456789" * 3)
+
+	backend = uploader.LocalBackend(tmp_path / "bucket", chunk_size=7)
+	backend.upload(src_path, "a.zip")
+
+	assert (tmp_path / "bucket" / "a.zip").read_bytes() == src_path.read_bytes()
+	assert not partial_path.exists()
+	assert backend.exists("a.zip", 100)
+
+def test_keep_local_files(tmp_path):
+	files = make_files(tmp_path / "archive", [10])
+	uploader.upload_files(files, uploader.LocalBackend(tmp_path / "bucket"), delete=False)
+	assert all(path.exists() for path in files)
+
+def test_unknown_backend():
+	with pytest.raises(ValueError):
+		uploader.get_backend("s3")
@@ -0,0 +1,130 @@
+import json
+import zipfile
+import cv2
+import numpy as np
+import preprocessor
+import validation
+from config import OutputSpec
+from synthetic import make_food_jpeg
+
+SPECS = [OutputSpec(64, "webp", 90)]
+
+def make_source(tmp_path, broken: bool = False):
+	src_path = tmp_path / "src.zip"
+	with zipfile.ZipFile(src_path, "w") as z:
+		for i in range(6):
+			z.writestr(f"라면/{i:03d}.jpg", make_food_jpeg(256, 192, seed=i))
+		if broken:
+			z.writestr("라면/broken.jpg", b"not a jpeg")
+	return src_path
+
+def transform(tmp_path, src_path):
+	preprocessor.transform_archive("k", src_path, "src.zip", dst_root=tmp_path, specs=SPECS, workers=1)
+	return preprocessor.archive_paths("src.zip", tmp_path, 64, "webp")
+
+def encode(img: np.ndarray) -> bytes:
+	return cv2.imencode(".webp", img)[1].tobytes()
+
+def test_frame_stats_flags_blank_and_flat_bottom():
+	frames = np.random.default_rng(0).integers(0, 255, size=(3, 64, 64, 3), dtype=np.uint8)
+	frames[1] = 128
+	frames[2, 40:] = 128
+	std, flat_fraction = validation.frame_stats(frames)
+
+	assert std[0] > 50 and std[1] == 0
+	assert flat_fraction[0] == 0 and flat_fraction[1] == 1
+	assert flat_fraction[2] == 24 / 64
+
+def test_validate_outputs_reports_each_failure(tmp_path):
+	zip_paths = transform(tmp_path, make_source(tmp_path))
+	noise = np.random.default_rng(0).integers(0, 255, size=(64, 64, 3), dtype=np.uint8)
+	truncated = noise.copy()
+	truncated[32:] = 128
+	preprocessor.replace_archive_members(zip_paths, {
+		"라면/000.webp": encode(np.full((64, 64, 3), 200, np.uint8)),
+		"라면/001.webp": encode(truncated),
+		"라면/002.webp": encode(noise[:32]),
+		"라면/003.webp": b"garbage",
+		"라면/004.webp": None,
+		"라면/extra.webp": encode(noise),
+	})
+	sources = list(preprocessor.member_digests(tmp_path / "src.zip"))
+	failures = validation.validate_outputs("k", sources, validation.archive_outputs("src.zip", SPECS, tmp_path),
+										   workers=2, chunksize=2)
+
+	reasons = {failure.member: failure.reason for failure in failures}
+	assert reasons.keys() == {"라면/000.jpg", "라면/001.jpg", "라면/002.jpg", "라면/003.jpg", "라면/004.jpg", "라면/extra.webp"}
+	assert reasons["라면/000.jpg"].startswith("near-blank")
+	assert reasons["라면/001.jpg"].startswith("flat bottom")
+	assert reasons["라면/002.jpg"].startswith("unexpected shape")
+	assert reasons["라면/003.jpg"] == "decode failed"
+	assert reasons["라면/004.jpg"] == "missing output"
+	assert reasons["라면/extra.webp"] == "orphan output"
+	assert {failure.member for failure in failures if not failure.hard} == {"라면/000.jpg", "라면/001.jpg"}
+
+def test_validate_and_requeue_repairs_archive(tmp_path):
+	src_path = make_source(tmp_path, broken=True)
+	zip_paths = transform(tmp_path, src_path)
+	preprocessor.replace_archive_members(zip_paths, {"라면/000.webp": b"garbage", "라면/001.webp": None})
+
+	failures = validation.validate_and_requeue("k", "src.zip", src_path, streaming=True, specs=SPECS,
+											   archive_root=tmp_path, manifest_root=tmp_path / "validation")
+
+	assert [(failure.member, failure.reason) for failure in failures] == [("라면/broken.jpg", "missing output")]
+	with zipfile.ZipFile(zip_paths[0]) as z:
+		assert sorted(z.namelist()) == [f"라면/{i:03d}.webp" for i in range(6)]
+		assert z.testzip() is None
+	lines = (tmp_path / "validation" / "src.failures.jsonl").read_text(encoding="utf-8").splitlines()
+	assert json.loads(lines[0]) == {"member": "라면/broken.jpg", "spec": "webp_64", "reason": "missing output", "hard": True}
+
+def test_validate_and_requeue_repairs_directory(tmp_path):
+	src_path = make_source(tmp_path)
+	spec_root = preprocessor.spec_dir(SPECS[0], tmp_path)
+	with zipfile.ZipFile(src_path) as z:
+		for info in z.infolist():
+			output_path = spec_root / validation.output_member(info.filename, SPECS[0])
+			output_path.parent.mkdir(parents=True, exist_ok=True)
+			output_path.write_bytes(preprocessor.transform_variants(z.read(info), SPECS)[0])
+	(spec_root / "라면/002.webp").write_bytes(encode(np.zeros((64, 64, 3), np.uint8)))
+	(spec_root / "라면/orphan.webp").write_bytes(b"x")
+
+	failures = validation.validate_and_requeue("k", "src.zip", src_path, streaming=False, specs=SPECS,
+											   transform_root=tmp_path, manifest_root=tmp_path)
+
+	assert [failure.reason for failure in failures] == ["orphan output"]
+	assert not (spec_root / "라면/orphan.webp").exists()
+	assert len(validation.validate_outputs("k", list(preprocessor.member_digests(src_path)),
+										   validation.dir_outputs(SPECS, tmp_path))) == 0
+
+def test_source_truncated():
+	data = make_food_jpeg(256, 192, seed=0)
+	assert not validation.source_truncated(data)
+	assert not validation.source_truncated(data + b"\x00" * 16)     # 0 패딩
+	assert not validation.source_truncated(data + b"trailer" * 8)    # EOI 뒤에 붙은 메타데이터
+	assert validation.source_truncated(data[:len(data) // 2])
+	assert validation.source_truncated(b"garbage")
+
+def plain_background_jpeg() -> bytes:
+	"""흰 배경 위 음식: 아래쪽 절반이 완전히 평탄한 온전한 원본"""
+	img = np.full((192, 256, 3), 255, np.uint8)
+	img[:96] = np.random.default_rng(0).integers(0, 255, size=(96, 256, 3), dtype=np.uint8)
+	return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+
+def test_validate_and_requeue_keeps_plain_background_image(tmp_path):
+	src_path = make_source(tmp_path)
+	data = plain_background_jpeg()
+	with zipfile.ZipFile(src_path, "a") as z:
+		z.writestr("라면/white.jpg", data)
+		z.writestr("라면/cut.jpg", data[:len(data) // 2])
+	zip_paths = transform(tmp_path, src_path)
+
+	failures = validation.validate_and_requeue("k", "src.zip", src_path, streaming=True, specs=SPECS,
+											   archive_root=tmp_path, manifest_root=tmp_path / "validation")
+
+	# 온전한 원본의 평탄한 아래쪽은 경고로만 남기고, 원본이 잘린 이미지만 결과에서 뺀다
+	by_member = {failure.member: failure for failure in failures}
+	assert by_member.keys() == {"라면/white.jpg", "라면/cut.jpg"}
+	assert not by_member["라면/white.jpg"].hard and by_member["라면/white.jpg"].reason.startswith("flat bottom")
+	assert by_member["라면/cut.jpg"].hard
+	with zipfile.ZipFile(zip_paths[0]) as z:
+		assert "라면/white.webp" in z.namelist() and "라면/cut.webp" not in z.namelist()